@@ -0,0 +1,127 @@
+import asyncio
+import queue
+import threading
+from metadata_cache import default_cache
+
+DEFAULT_CONCURRENCY = 8
+POLL_INTERVAL = 1.0  # Seconds between checks that the event loop is still there to finish a batch
+
+_END = object()
+
+
+class BatchFetcher:
+    # Runs its own event loop on a daemon thread so Tk callbacks and worker threads can
+    # hand it work without blocking. Results land in the shared metadata cache, which is
+    # what turns a later click in display_package_info into a cache hit.
+    def __init__(self, cache=None, concurrency=DEFAULT_CONCURRENCY):
+        self.cache = cache or default_cache()
+        self.concurrency = concurrency
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = {}
+        self.speculative = set()
+
+    async def fetch(self, package_name, speculative=False):
+        # Share one task per name so a prefetch and a batch never fetch the same package twice.
+        # A task a newer prefetch has cancelled is never shared: it would only raise CancelledError.
+        task = self.in_flight.get(package_name)
+        if task is None or task.cancelled() or _cancelling(task):
+            task = asyncio.ensure_future(self._fetch(package_name))
+            self.in_flight[package_name] = task
+            task.add_done_callback(lambda done: self._forget(package_name, done))
+            if speculative:
+                self.speculative.add(package_name)
+        elif not speculative:
+            # Somebody actually needs it now, so a newer prefetch must not cancel it
+            self.speculative.discard(package_name)
+        return package_name, await asyncio.shield(task)
+
+    async def _fetch(self, package_name):
+        async with self.semaphore:
+            # Once a request has started it is allowed to finish and fill the cache
+            self.speculative.discard(package_name)
+            try:
+                return await asyncio.to_thread(self.cache.get_package_json, package_name)
+            except Exception as e:
+                print(f"Could not fetch metadata for {package_name}: {e}")
+                return None
+
+    def _forget(self, package_name, task):
+        # Only while the name still refers to this task, not to one started after it was cancelled
+        if self.in_flight.get(package_name) is task:
+            del self.in_flight[package_name]
+            self.speculative.discard(package_name)
+
+    async def fetch_many(self, package_names):
+        # Yields (name, metadata) pairs in completion order
+        unique_names = list(dict.fromkeys(package_names))
+        for next_done in asyncio.as_completed([self.fetch(name) for name in unique_names]):
+            yield await next_done
+
+    def fetch_batch(self, package_names):
+        # Synchronous counterpart of fetch_many for callers outside the event loop
+        unique_names = list(dict.fromkeys(package_names))
+        results = queue.Queue()
+
+        async def drain():
+            # The end marker goes out however drain stops, so the caller never waits forever
+            try:
+                async for result in self.fetch_many(unique_names):
+                    results.put(result)
+            finally:
+                results.put(_END)
+
+        future = asyncio.run_coroutine_threadsafe(drain(), self.loop)
+        while True:
+            try:
+                result = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if not self.loop.is_running() and not future.done():
+                    # Closed before drain could run, or while it was waiting
+                    future.cancel()
+                    raise RuntimeError("the batch fetcher was closed before the batch finished")
+                continue
+            if result is _END:
+                break
+            yield result
+        future.result()  # Re-raises whatever stopped drain early
+
+    def prefetch(self, package_names):
+        # Fire and forget; a new prefetch drops queued names the previous one has not started
+        unique_names = list(dict.fromkeys(package_names))
+        self.loop.call_soon_threadsafe(self._schedule_prefetch, unique_names)
+
+    def _schedule_prefetch(self, package_names):
+        wanted = set(package_names)
+        for name in list(self.speculative):
+            if name not in wanted:
+                # Forgotten straight away, so a batch fetch scheduled before this runs starts afresh
+                self.speculative.discard(name)
+                task = self.in_flight.pop(name, None)
+                if task is not None:
+                    task.cancel()
+        for name in package_names:
+            asyncio.ensure_future(self.fetch(name, speculative=True))
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def _cancelling(task):
+    # Task.cancelling() is new in Python 3.11; before that a cancelled task is only seen once done
+    cancelling = getattr(task, 'cancelling', None)
+    return bool(cancelling and cancelling())
+
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+
+def default_fetcher():
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = BatchFetcher()
+        return _default_fetcher
@@ -0,0 +1,306 @@
+import io
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import zipfile
+import argparse
+import threading
+from functools import lru_cache
+from html import escape
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# A stand-in for pypi.org that serves a generated, reproducible corpus: search result
+# pages, /pypi/{name}/json and /pypi/{name}/{version}/json, the simple index (HTML and
+# JSON) and the wheel files themselves, with Range and ETag support. The same seed and
+# corpus size always give byte-identical responses, so timings taken against it can be
+# compared between runs. Every response waits `latency` seconds first, to stand in for
+# the round trip to the real index.
+
+SEARCH_PAGE_SIZE = 20
+_SYLLABLES = ['py', 'data', 'net', 'async', 'json', 'http', 'tool', 'kit', 'lib', 'flask', 'ml', 'graph',
+              'cloud', 'test', 'auth', 'cache', 'log', 'time', 'file', 'web', 'db', 'sql', 'api', 'cli',
+              'io', 'text', 'img', 'math', 'ui', 'dev', 'geo', 'stream', 'queue', 'crypto', 'yaml', 'xml']
+_WORDS = ['fast', 'simple', 'modern', 'tiny', 'robust', 'client', 'server', 'parser', 'toolkit',
+          'framework', 'utilities', 'bindings', 'wrapper', 'library', 'helpers', 'extension']
+_REQUIRES_PYTHON = [None, ">=3.6", ">=3.7", ">=3.8", ">=3.9", ">=3.10"]
+
+
+def _normalize(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+class Corpus:
+    # Generated once from the seed; per-package documents and wheels are built on demand
+    def __init__(self, size=2000, seed=0, max_versions=20, wheel_kb=16):
+        self.seed = seed
+        self.max_versions = max_versions
+        self.wheel_kb = wheel_kb
+        rng = random.Random(seed)
+        names = []
+        seen = set()
+        while len(names) < size:
+            parts = [rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 3))]
+            name = rng.choice(['-', '', '_']).join(parts)
+            if rng.random() < 0.3:
+                name += str(rng.randint(2, 9))
+            if _normalize(name) not in seen:
+                seen.add(_normalize(name))
+                names.append(name)
+        self.names = names
+        self.by_key = {_normalize(name): position for position, name in enumerate(names)}
+        self.alphabetical = sorted(range(size), key=lambda position: (names[position].lower(), position))
+
+    def _rng(self, position):
+        return random.Random(self.seed * 1000003 + position)
+
+    @lru_cache(maxsize=None)
+    def project(self, position):
+        # {name, summary, requires_python, versions (oldest first), requires_dist}
+        rng = self._rng(position)
+        name = self.names[position]
+        versions = []
+        major, minor, patch = 0, rng.randint(0, 5), 0
+        for _ in range(rng.randint(1, self.max_versions)):
+            roll = rng.random()
+            if roll < 0.1:
+                major, minor, patch = major + 1, 0, 0
+            elif roll < 0.5:
+                minor, patch = minor + 1, 0
+            else:
+                patch += 1
+            versions.append(f"{major}.{minor}.{patch}")
+        if rng.random() < 0.2:
+            versions.append(f"{major}.{minor + 1}.0rc1")
+        # Dependencies only point at earlier projects, so the graph has no cycles
+        dependencies = []
+        if position:
+            for other in rng.sample(range(position), min(position, rng.randint(0, 4))):
+                dependencies.append(f"{self.names[other]}>=0.{rng.randint(0, 3)}")
+        if position and rng.random() < 0.3:
+            dependencies.append(f"{self.names[rng.randrange(position)]}; extra == \"all\"")
+        summary = f"{rng.choice(_WORDS).capitalize()} {' '.join(rng.sample(_WORDS, 2))} for {name}"
+        return {'name': name, 'summary': summary, 'requires_python': rng.choice(_REQUIRES_PYTHON),
+                'versions': versions, 'requires_dist': dependencies}
+
+    def find(self, name):
+        return self.by_key.get(_normalize(name))
+
+    def wheel_filename(self, position, version):
+        return f"{re.sub(r'[-.]+', '_', self.names[position])}-{version}-py3-none-any.whl"
+
+    @lru_cache(maxsize=4096)
+    def wheel(self, position, version):
+        # A small but valid wheel; fixed timestamps keep its bytes (and sha256) stable
+        project = self.project(position)
+        module = re.sub(r'[-.]+', '_', project['name']).lower()
+        dist_info = f"{re.sub(r'[-.]+', '_', project['name'])}-{version}.dist-info"
+        metadata = ["Metadata-Version: 2.1", f"Name: {project['name']}", f"Version: {version}",
+                    f"Summary: {project['summary']}"]
+        if project['requires_python']:
+            metadata.append(f"Requires-Python: {project['requires_python']}")
+        metadata.extend(f"Requires-Dist: {requirement}" for requirement in project['requires_dist'])
+        padding = self._rng(position).randbytes(self.wheel_kb * 1024).hex()[:self.wheel_kb * 1024]
+        members = [
+            (f"{module}/__init__.py", f"__version__ = {version!r}\n_DATA = {padding!r}\n"),
+            (f"{dist_info}/METADATA", "\n".join(metadata) + "\n"),
+            (f"{dist_info}/WHEEL", "Wheel-Version: 1.0\nGenerator: fake_pypi\nRoot-Is-Purelib: true\nTag: py3-none-any\n"),
+            (f"{dist_info}/top_level.txt", f"{module}\n"),
+        ]
+        record = "".join(f"{path},,\n" for path, _ in members) + f"{dist_info}/RECORD,,\n"
+        members.append((f"{dist_info}/RECORD", record))
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for path, text in members:
+                info = zipfile.ZipInfo(path, date_time=(2020, 1, 1, 0, 0, 0))
+                info.external_attr = 0o644 << 16
+                archive.writestr(info, text)
+        return buffer.getvalue()
+
+    def file_entry(self, base_url, position, version):
+        data = self.wheel(position, version)
+        filename = self.wheel_filename(position, version)
+        return {'filename': filename, 'url': f"{base_url}/packages/{filename}", 'packagetype': 'bdist_wheel',
+                'size': len(data), 'digests': {'sha256': hashlib.sha256(data).hexdigest()},
+                'requires_python': self.project(position)['requires_python'], 'yanked': False}
+
+    def package_json(self, base_url, position, version=None):
+        project = self.project(position)
+        latest = version or next((v for v in reversed(project['versions']) if 'rc' not in v), project['versions'][-1])
+        info = {'name': project['name'], 'version': latest, 'summary': project['summary'],
+                'requires_python': project['requires_python'], 'requires_dist': project['requires_dist'] or None,
+                'package_url': f"{base_url}/project/{project['name']}/", 'home_page': "", 'author': "fake_pypi",
+                'license': "MIT"}
+        document = {'info': info, 'urls': [self.file_entry(base_url, position, latest)]}
+        if version is None:
+            document['releases'] = {v: [self.file_entry(base_url, position, v)] for v in project['versions']}
+        return document
+
+    def search(self, term):
+        term = _normalize(term.strip())
+        return [position for position in self.alphabetical if term in _normalize(self.names[position])]
+
+    def find_wheel(self, filename):
+        match = re.match(r'^(.+)-([^-]+)-py3-none-any\.whl$', filename)
+        if not match:
+            return None
+        position = self.find(match.group(1))
+        if position is None or match.group(2) not in self.project(position)['versions']:
+            return None
+        return position, match.group(2)
+
+
+class FakePyPI:
+    def __init__(self, corpus=None, latency=0.0, host="127.0.0.1", port=0):
+        self.corpus = corpus or Corpus()
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def request_count(self):
+        with self.lock:
+            return self.requests
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real index
+            # Headers and body go out as separate writes; with Nagle's algorithm the body would
+            # wait for the client's delayed ACK and add ~40 ms to every response
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                fake.route(self)
+
+        return Handler
+
+    def route(self, request):
+        parts = urlsplit(request.path)
+        path = unquote(parts.path)
+        segments = [segment for segment in path.split('/') if segment]
+        if segments[:1] == ['search']:
+            query = parse_qs(parts.query)
+            return self.search_page(request, query.get('q', [''])[0], int(query.get('page', ['1'])[0]))
+        if segments == ['simple']:
+            return self.simple_index(request)
+        if len(segments) == 2 and segments[0] == 'simple':
+            return self.simple_project(request, segments[1])
+        if len(segments) in (3, 4) and segments[0] == 'pypi' and segments[-1] == 'json':
+            return self.project_json(request, segments[1], segments[2] if len(segments) == 4 else None)
+        if len(segments) == 2 and segments[0] == 'packages':
+            return self.wheel_file(request, segments[1])
+        self.send(request, 404, b"Not Found")
+
+    def send(self, request, status, body, content_type="text/plain", headers=()):
+        request.send_response(status)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(body)
+
+    def search_page(self, request, term, page):
+        matches = self.corpus.search(term)
+        start = (page - 1) * SEARCH_PAGE_SIZE
+        if page > 1 and start >= len(matches):
+            return self.send(request, 404, b"Not Found")
+        snippets = []
+        for position in matches[start:start + SEARCH_PAGE_SIZE]:
+            project = self.corpus.project(position)
+            snippets.append(f'<a class="package-snippet" href="/project/{escape(project["name"])}/">'
+                            f'<span class="package-snippet__name">{escape(project["name"])}</span>'
+                            f'<span class="package-snippet__version">{project["versions"][-1]}</span>'
+                            f'<span class="package-snippet__description">{escape(project["summary"])}</span></a>')
+        body = f"<html><body><ul>{''.join(f'<li>{snippet}</li>' for snippet in snippets)}</ul></body></html>"
+        self.send(request, 200, body.encode('utf-8'), "text/html; charset=utf-8")
+
+    def simple_index(self, request):
+        if 'application/vnd.pypi.simple.v1+json' in request.headers.get('Accept', ''):
+            body = json.dumps({'meta': {'api-version': '1.0'}, 'projects': [{'name': name} for name in self.corpus.names]})
+            return self.send(request, 200, body.encode('utf-8'), 'application/vnd.pypi.simple.v1+json')
+        anchors = "".join(f'<a href="/simple/{_normalize(name)}/">{escape(name)}</a>\n' for name in self.corpus.names)
+        self.send(request, 200, f"<html><body>\n{anchors}</body></html>".encode('utf-8'), "text/html")
+
+    def simple_project(self, request, name):
+        position = self.corpus.find(name)
+        if position is None:
+            return self.send(request, 404, b"Not Found")
+        anchors = []
+        for version in self.corpus.project(position)['versions']:
+            entry = self.corpus.file_entry("", position, version)
+            requires_python = entry['requires_python']
+            attribute = f' data-requires-python="{escape(requires_python)}"' if requires_python else ""
+            anchors.append(f'<a href="/packages/{entry["filename"]}#sha256={entry["digests"]["sha256"]}"{attribute}>'
+                           f'{entry["filename"]}</a>\n')
+        self.send(request, 200, f"<html><body>\n{''.join(anchors)}</body></html>".encode('utf-8'), "text/html")
+
+    def project_json(self, request, name, version):
+        position = self.corpus.find(name)
+        if position is None or (version is not None and version not in self.corpus.project(position)['versions']):
+            return self.send(request, 404, b"Not Found")
+        etag = f'"{self.corpus.seed}-{position}-{version or "all"}"'
+        if request.headers.get('If-None-Match') == etag:
+            return self.send(request, 304, b"", headers=[('ETag', etag)])
+        body = json.dumps(self.corpus.package_json(self.url, position, version)).encode('utf-8')
+        self.send(request, 200, body, "application/json", headers=[('ETag', etag)])
+
+    def wheel_file(self, request, filename):
+        found = self.corpus.find_wheel(filename)
+        if found is None:
+            return self.send(request, 404, b"Not Found")
+        data = self.corpus.wheel(*found)
+        match = re.match(r'^bytes=(\d+)-$', request.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            if start >= len(data):
+                return self.send(request, 416, b"", headers=[('Content-Range', f"bytes */{len(data)}")])
+            return self.send(request, 206, data[start:], "application/octet-stream",
+                             headers=[('Content-Range', f"bytes {start}-{len(data) - 1}/{len(data)}")])
+        self.send(request, 200, data, "application/octet-stream", headers=[('Accept-Ranges', 'bytes')])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a generated PyPI stand-in, e.g. for "
+                                                 "PIPSEARCH_PYPI_URL=http://127.0.0.1:8080 python pipsearch_v5.py")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--corpus", type=int, default=2000, help="number of projects")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before every response")
+    args = parser.parse_args()
+
+    fake = FakePyPI(Corpus(args.corpus, args.seed), args.latency_ms / 1000, port=args.port)
+    print(f"Serving {args.corpus} projects on {fake.url}")
+    sys.stdout.flush()
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
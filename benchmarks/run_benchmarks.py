@@ -0,0 +1,421 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fake_pypi import Corpus, FakePyPI
+
+# Times the code paths behind the GUIs (search, versions, dependencies, import scanning,
+# installed packages, listbox population, installs) against fake_pypi.py on localhost.
+# The corpus, the trees and the names each benchmark uses all come from --seed, so two
+# runs with the same options do the same work and their numbers can be compared:
+#   python benchmarks/run_benchmarks.py --json before.json
+#   python benchmarks/run_benchmarks.py --compare before.json
+# Nothing outside a temporary directory is read or written; the pipsearch caches, index
+# and wheelhouse are pointed there through the environment before the project is imported.
+
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25  # A median this much slower than the baseline counts as a regression
+PYTHON_VERSION = "3.10"
+BATCH_SIZE = 20  # Packages per versions/dependencies measurement, like a page of search results
+
+
+class Timer:
+    # Runs each benchmark `repeat` times and keeps the median, min and max wall time plus the
+    # median number of requests the fake server received. setup(i), if given, prepares the
+    # i-th round outside the timed section and its return value is passed to func.
+    def __init__(self, server, repeat, only=None):
+        self.server = server
+        self.repeat = repeat
+        self.only = only
+        self.results = {}
+
+    def wanted(self, name):
+        return not self.only or any(name.startswith(prefix) for prefix in self.only)
+
+    def run(self, name, func, setup=None, repeat=None, items=1):
+        if not self.wanted(name):
+            return None
+        timings = []
+        requests = []
+        for round_number in range(repeat or self.repeat):
+            state = setup(round_number) if setup is not None else None
+            before = self.server.request_count()
+            start = time.perf_counter()
+            if setup is not None:
+                func(state)
+            else:
+                func()
+            timings.append(time.perf_counter() - start)
+            requests.append(self.server.request_count() - before)
+        result = {'median': statistics.median(timings), 'min': min(timings), 'max': max(timings),
+                  'rounds': len(timings), 'items': items, 'requests': statistics.median(requests)}
+        self.results[name] = result
+        print(f"{name:<28} {result['median'] * 1000:10.2f} ms  (min {result['min'] * 1000:.2f}, "
+              f"max {result['max'] * 1000:.2f})  {result['requests']:g} requests  x{items}")
+        return result
+
+    def skip(self, name, reason):
+        if self.wanted(name):
+            self.results[name] = {'skipped': reason}
+            print(f"{name:<28} skipped: {reason}")
+
+
+class NamePool:
+    # Hands out corpus names in a seeded order, each only once, so "cold" rounds never hit a
+    # cache filled by an earlier round
+    def __init__(self, corpus, seed):
+        self.names = list(corpus.names)
+        random.Random(seed).shuffle(self.names)
+        self.next = 0
+
+    def take(self, count):
+        if self.next + count > len(self.names):
+            raise SystemExit("The corpus is too small for this many rounds; use a larger --corpus")
+        names = self.names[self.next:self.next + count]
+        self.next += count
+        return names
+
+
+def write_metadata_directory(corpus, base_url, directory):
+    # The input package_index.build_from_directory expects, one /pypi/{name}/json per file
+    os.makedirs(directory, exist_ok=True)
+    for position, name in enumerate(corpus.names):
+        with open(os.path.join(directory, f"{position}.json"), 'w', encoding='utf-8') as file:
+            json.dump(corpus.package_json(base_url, position), file)
+
+
+def write_source_tree(root, corpus, seed, files):
+    # A project of `files` modules spread over nested packages, importing stdlib modules,
+    # corpus packages and each other, with enough code around the imports to make parsing count
+    rng = random.Random(seed)
+    stdlib = ['os', 'sys', 're', 'json', 'time', 'typing', 'logging', 'itertools', 'collections', 'pathlib']
+    modules = [name.replace('-', '_').lower() for name in corpus.names[:200]]
+    for number in range(files):
+        package = os.path.join(root, *[f"pkg{rng.randrange(8)}" for _ in range(rng.randint(0, 3))])
+        os.makedirs(package, exist_ok=True)
+        init = os.path.join(package, "__init__.py")
+        if not os.path.exists(init):
+            open(init, 'w').close()
+        lines = [f"import {name}" for name in rng.sample(stdlib, 3)]
+        lines += [f"from {name} import thing{number}" for name in rng.sample(modules, rng.randint(1, 4))]
+        lines.append(f"from . import module{rng.randrange(files)}")
+        for function in range(rng.randint(5, 20)):
+            lines += [
+                "",
+                f"def function_{function}(value, *args, **kwargs):",
+                f"    total = [item * {function} for item in range(value) if item % 3]",
+                "    try:",
+                f"        import {rng.choice(modules)}",
+                "    except ImportError:",
+                "        pass",
+                "    return sum(total), args, kwargs",
+            ]
+        with open(os.path.join(package, f"module{number}.py"), 'w', encoding='utf-8') as file:
+            file.write("\n".join(lines) + "\n")
+
+
+def write_site_packages(directory, corpus, count):
+    # count installed distributions in the .dist-info layout pip creates
+    os.makedirs(directory, exist_ok=True)
+    for position in range(min(count, len(corpus.names))):
+        project = corpus.project(position)
+        folder = f"{project['name'].replace('-', '_')}-{project['versions'][-1]}"
+        dist_info = os.path.join(directory, f"{folder}.dist-info")
+        os.makedirs(dist_info, exist_ok=True)
+        metadata = ["Metadata-Version: 2.1", f"Name: {project['name']}",
+                    f"Version: {project['versions'][-1]}", f"Summary: {project['summary']}"]
+        metadata += [f"Requires-Dist: {requirement}" for requirement in project['requires_dist']]
+        with open(os.path.join(dist_info, "METADATA"), 'w', encoding='utf-8') as file:
+            file.write("\n".join(metadata) + "\n")
+        with open(os.path.join(dist_info, "RECORD"), 'w', encoding='utf-8') as file:
+            file.write(f"{folder}.dist-info/METADATA,,\n{folder}.dist-info/RECORD,,\n")
+
+
+def search_terms(corpus, seed, count, length=4):
+    # Distinct name fragments that occur in the corpus, so every search has results
+    rng = random.Random(seed)
+    terms = []
+    for name in rng.sample(corpus.names, len(corpus.names)):
+        key = name.replace('-', '').replace('_', '').lower()
+        term = key[:length]
+        if len(term) == length and term not in terms:
+            terms.append(term)
+        if len(terms) == count:
+            break
+    return terms
+
+
+def run(args, workdir):
+    corpus = Corpus(args.corpus, args.seed)
+    # Every benchmark's names are drawn up front, so --only does not change what the others get
+    pool = NamePool(corpus, args.seed)
+    typos = [name[:2] + name[3:] + "x" for name in pool.take(args.repeat)]
+    typed = pool.take(args.repeat)
+    warm = pool.take(BATCH_SIZE)
+    versions_cold = [pool.take(BATCH_SIZE) for _ in range(args.repeat)]
+    dependencies_cold = [pool.take(BATCH_SIZE) for _ in range(args.repeat)]
+    batch_cold = [pool.take(BATCH_SIZE * 5) for _ in range(args.repeat)]
+    lock_roots = pool.take(3)
+    server = FakePyPI(corpus, latency=args.latency_ms / 1000.0).start()
+    os.environ.update({
+        'PIPSEARCH_PYPI_URL': server.url,
+        'PIPSEARCH_CACHE_DIR': os.path.join(workdir, "cache"),
+        'PIPSEARCH_INDEX': os.path.join(workdir, "index.sqlite3"),
+        'PIPSEARCH_WHEELHOUSE': os.path.join(workdir, "wheelhouse"),
+    })
+    # Imported only now: pypi_http reads PIPSEARCH_PYPI_URL at import time, and the default
+    # cache, index and wheelhouse are created on first use from the variables above
+    import pipsearch_core as core
+    from batch_fetch import BatchFetcher
+    from dist_scanner import InstalledSet
+    from fuzzy_index import FuzzyIndex
+    from import_scanner import ImportScanner
+    from live_search import PrefixResultCache
+    from lockfile import Lockfile, install_locked
+    from metadata_cache import default_cache
+    from package_index import default_index
+    from wheelhouse import Wheelhouse
+
+    timer = Timer(server, args.repeat, args.only)
+    print(f"fake PyPI at {server.url}: {len(corpus.names)} projects, {args.latency_ms:g} ms latency, "
+          f"{args.repeat} rounds")
+    try:
+        # Searches: PyPI's HTML pages while the local index is empty, then the local index
+        remote_terms = search_terms(corpus, args.seed, args.repeat, length=3)
+        timer.run("search_remote", lambda term: core.search(term, PYTHON_VERSION),
+                  setup=lambda i: remote_terms[i % len(remote_terms)])
+
+        metadata_dir = os.path.join(workdir, "metadata")
+        write_metadata_directory(corpus, server.url, metadata_dir)
+        timer.run("index_build", lambda: default_index().build_from_directory(metadata_dir),
+                  repeat=1, items=len(corpus.names))
+
+        local_terms = search_terms(corpus, args.seed + 1, args.repeat, length=3)
+        timer.run("search_local", lambda term: core.local_search(term, PYTHON_VERSION),
+                  setup=lambda i: local_terms[i % len(local_terms)])
+        timer.run("search_local_typo", lambda term: core.local_search(term, PYTHON_VERSION),
+                  setup=lambda i: typos[i])
+
+        def type_word(word):
+            # Every keystroke of the word, as the live search box sees them
+            cache = PrefixResultCache()
+            for end in range(1, len(word) + 1):
+                core.local_search(word[:end], PYTHON_VERSION, prefix_cache=cache)
+
+        timer.run("search_as_you_type", type_word, setup=lambda i: typed[i])
+
+        # Metadata: first sight of a package, then the memory tier, then the disk tier
+        cache = default_cache()
+
+        def versions(names):
+            for name in names:
+                core.available_versions(name, PYTHON_VERSION)
+
+        def dependencies(names):
+            for name in names:
+                core.dependencies(name)
+
+        def from_disk(names):
+            cache.clear_memory()
+            return names
+
+        timer.run("versions_cold", versions, setup=lambda i: versions_cold[i], items=BATCH_SIZE)
+        versions(warm)
+        timer.run("versions_warm", versions, setup=lambda i: warm, items=BATCH_SIZE)
+        timer.run("versions_disk", versions, setup=lambda i: from_disk(warm), items=BATCH_SIZE)
+        timer.run("dependencies_cold", dependencies, setup=lambda i: dependencies_cold[i], items=BATCH_SIZE)
+        timer.run("dependencies_warm", dependencies, setup=lambda i: warm, items=BATCH_SIZE)
+
+        def fetch_batch(names):
+            fetcher = BatchFetcher()
+            try:
+                for _ in fetcher.fetch_batch(names):
+                    pass
+            finally:
+                fetcher.close()
+
+        timer.run("metadata_batch_cold", fetch_batch, setup=lambda i: batch_cold[i], items=BATCH_SIZE * 5)
+
+        # Imports of a large source tree: no cache, an up-to-date cache, and a single file
+        tree = os.path.join(workdir, "tree")
+        write_source_tree(tree, corpus, args.seed, args.tree_files)
+        imports_cache = os.path.join(workdir, "imports.json")
+
+        def fresh_cache(i):
+            path = os.path.join(workdir, f"imports-cold-{i}.json")
+            if os.path.exists(path):
+                os.remove(path)
+            return path
+
+        timer.run("imports_tree_cold", lambda path: ImportScanner(path).scan(tree),
+                  setup=fresh_cache, items=args.tree_files)
+        ImportScanner(imports_cache).scan(tree)
+        timer.run("imports_tree_warm", lambda: ImportScanner(imports_cache).scan(tree), items=args.tree_files)
+        single_file = min(os.path.join(directory, name) for directory, _, files in os.walk(tree)
+                          for name in files if name.startswith("module"))
+        timer.run("imports_file", lambda path: ImportScanner(path).third_party_imports([single_file]),
+                  setup=fresh_cache)
+
+        # Installed packages: the full load pip_manager does at start-up, then an idle refresh
+        site = os.path.join(workdir, "site-packages")
+        write_site_packages(site, corpus, args.installed)
+
+        def load_installed():
+            installed = InstalledSet([site])
+            installed.refresh(force=True)
+            FuzzyIndex(installed.distributions.keys())
+            return installed
+
+        timer.run("installed_load", load_installed, items=args.installed)
+        loaded = load_installed()
+        timer.run("installed_refresh_unchanged", loaded.refresh, items=args.installed)
+
+        listbox_benchmarks(timer, args.listbox_rows)
+
+        # Installs from a lockfile into fresh targets: the first downloads, the rest link
+        if timer.wanted("install_lock_cold") or timer.wanted("install_lock_warm"):
+            # Locked for the running interpreter: install_locked refuses a lock made for another one
+            lock, missing, conflicts = core.lock(lock_roots)
+            if lock is None:
+                unresolved = missing + [str(dependency) for dependency, _, _ in conflicts]
+                timer.skip("install_lock", f"could not lock {', '.join(unresolved)}")
+            else:
+                lock_path = os.path.join(workdir, "bench.lock")
+                lock.save(lock_path)
+
+                def target_dir(label):
+                    return os.path.join(workdir, "targets", label)
+
+                def cold_install(target):
+                    shutil.rmtree(os.path.join(workdir, "wheelhouse-cold"), ignore_errors=True)
+                    wheelhouse = Wheelhouse(os.path.join(workdir, "wheelhouse-cold"))
+                    return install_locked(Lockfile.load(lock_path), target, wheelhouse=wheelhouse)
+
+                timer.run("install_lock_cold", cold_install, setup=lambda i: target_dir(f"cold-{i}"),
+                          items=len(lock.packages))
+                install_locked(lock, target_dir("prime"))
+                timer.run("install_lock_warm", lambda target: install_locked(Lockfile.load(lock_path), target),
+                          setup=lambda i: target_dir(f"warm-{i}"), items=len(lock.packages))
+    finally:
+        server.stop()
+    return timer.results
+
+
+def listbox_benchmarks(timer, rows):
+    # Filling the results list with every row, and drawing it: plain Tk Listbox against the
+    # VirtualListbox the GUIs use. Needs a display.
+    if not (timer.wanted("listbox_plain") or timer.wanted("listbox_virtual")):
+        return
+    try:
+        import tkinter as tk
+        from virtual_list import VirtualListbox
+        root = tk.Tk()
+    except Exception as e:
+        timer.skip("listbox_plain", f"no Tk display ({e})")
+        timer.skip("listbox_virtual", "no Tk display")
+        return
+    items = [f"package-{number}" for number in range(rows)]
+    try:
+        root.geometry("400x600")
+        plain = tk.Listbox(root)
+        plain.pack(side=tk.LEFT)
+        virtual = VirtualListbox(root)
+        virtual.pack(side=tk.LEFT)
+        root.update()
+
+        def fill_plain():
+            plain.delete(0, tk.END)
+            plain.insert(tk.END, *items)
+            root.update()
+
+        def fill_virtual():
+            virtual.set_items(items)
+            root.update()
+
+        timer.run("listbox_plain", fill_plain, items=rows)
+        timer.run("listbox_virtual", fill_virtual, items=rows)
+    finally:
+        root.destroy()
+
+
+def configuration(args):
+    return {'corpus': args.corpus, 'seed': args.seed, 'latency_ms': args.latency_ms, 'repeat': args.repeat,
+            'tree_files': args.tree_files, 'installed': args.installed, 'listbox_rows': args.listbox_rows}
+
+
+def compare(results, config, baseline_path, threshold):
+    # Prints each benchmark's median next to the baseline's; returns the names that got slower
+    with open(baseline_path, 'r', encoding='utf-8') as file:
+        baseline = json.load(file)
+    if baseline.get('config') != config:
+        print(f"Warning: {baseline_path} was recorded with different options: {baseline.get('config')}")
+    regressions = []
+    print(f"\n{'benchmark':<28} {'baseline':>12} {'now':>12} {'change':>9}")
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if 'median' not in result or not before or 'median' not in before:
+            continue
+        change = result['median'] / before['median'] - 1 if before['median'] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<28} {before['median'] * 1000:10.2f}ms {result['median'] * 1000:10.2f}ms "
+              f"{change:+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipsearch's hot paths against a local fake PyPI.")
+    parser.add_argument("--corpus", type=int, default=2000, help="number of projects on the fake index")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="delay before every response of the fake index")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="rounds per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the corpus and everything derived from it")
+    parser.add_argument("--tree-files", type=int, default=2000, help="modules in the source tree scanned for imports")
+    parser.add_argument("--installed", type=int, default=500, help="distributions in the fake site-packages")
+    parser.add_argument("--listbox-rows", type=int, default=100000, help="rows put into the listboxes")
+    parser.add_argument("--only", action="append", help="run only benchmarks whose name starts with this; may be repeated")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="compare against results written earlier with --json")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"slowdown that counts as a regression (default: {DEFAULT_THRESHOLD:.0%})")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary directory for inspection")
+    args = parser.parse_args()
+    args.repeat = max(1, args.repeat)
+
+    workdir = tempfile.mkdtemp(prefix="pipsearch-bench-")
+    try:
+        results = run(args, workdir)
+    finally:
+        if args.keep:
+            print(f"Files kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    config = configuration(args)
+    if args.json:
+        report = {'config': config, 'python': platform.python_version(), 'platform': platform.platform(),
+                  'created': time.strftime("%Y-%m-%dT%H:%M:%S"), 'results': results}
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+            file.write("\n")
+    if args.compare:
+        regressions = compare(results, config, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import re
+import sys
+import threading
+from functools import lru_cache
+from packaging import tags
+from packaging.specifiers import SpecifierSet, InvalidSpecifier
+from packaging.utils import parse_wheel_filename, InvalidWheelFilename
+from package_index import normalize_name
+
+# The combobox is free text: "3.12", "3.12.1", "3.12rc1" and "py3.12" all mean 3.12
+_PYTHON_VERSION = re.compile(r'^\s*(?:py(?:thon)?\s*)?(\d+)\.(\d+)')
+
+
+def parse_python_version(python_version):
+    # (major, minor), or None for no filtering at all: "Any" (the combobox default), None, and
+    # anything without a major.minor pair such as "3", "3.x" or "py3"
+    if not python_version or python_version == "Any":
+        return None
+    match = _PYTHON_VERSION.match(python_version)
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def format_python_version(python_version):
+    # "3.12" for anything parse_python_version understands, "Any" otherwise
+    parsed = parse_python_version(python_version)
+    return "Any" if parsed is None else f"{parsed[0]}.{parsed[1]}"
+
+
+@lru_cache(maxsize=32)
+def tag_ranks(python_version, platforms=None):
+    # {tag: priority}, lower is better, in the order pip prefers wheels
+    platforms = list(platforms) if platforms else list(tags.platform_tags())
+    interpreter = f"cp{python_version[0]}{python_version[1]}"
+    ordered = list(tags.cpython_tags(python_version=python_version, platforms=platforms))
+    ordered.extend(tags.compatible_tags(python_version=python_version, interpreter=interpreter, platforms=platforms))
+    ranks = {}
+    for rank, tag in enumerate(ordered):
+        ranks.setdefault(tag, rank)
+    return ranks
+
+
+@lru_cache(maxsize=32)
+def supported_tags(python_version, platforms=None):
+    # Tags pip would accept for a CPython of the given version on these platforms
+    # (the running host by default), as a frozenset for fast intersection
+    return frozenset(tag_ranks(python_version, platforms))
+
+
+def best_release_file(files, python_version="Any", platforms=None):
+    # The file pip would pick from one release's files: the most specific compatible wheel,
+    # otherwise the sdist. "Any" means the running interpreter here, since a file has to be chosen.
+    target = parse_python_version(python_version) or sys.version_info[:2]
+    ranks = tag_ranks(target, tuple(platforms) if platforms else None)
+    best, best_rank, sdist = None, None, None
+    for file in files:
+        if file.get('yanked'):
+            continue
+        if file.get('packagetype') == 'sdist':
+            sdist = sdist or file
+        elif file.get('packagetype') == 'bdist_wheel':
+            try:
+                _, _, _, file_tags = parse_wheel_filename(file['filename'])
+            except InvalidWheelFilename:
+                continue
+            rank = min((ranks[tag] for tag in file_tags if tag in ranks), default=None)
+            if rank is not None and (best_rank is None or rank < best_rank):
+                best, best_rank = file, rank
+    return best or sdist
+
+
+@lru_cache(maxsize=4096)
+def python_allowed(requires_python, python_version):
+    # Many releases share the same requires_python string, so evaluate each one once
+    if not requires_python:
+        return True
+    try:
+        specifier = SpecifierSet(requires_python)
+    except InvalidSpecifier:
+        return True
+    return specifier.contains(".".join(map(str, python_version)), prereleases=True)
+
+
+class CompatibilityTable:
+    # One row per release: its requires_python string, the set of wheel tag ids found in
+    # its files, and whether an sdist exists. Tags are interned so rows stay small.
+    def __init__(self, metadata):
+        self.tag_ids = {}
+        self.rows = {}
+        for version, files in metadata.get('releases', {}).items():
+            requires_python = None
+            wheel_tags = set()
+            has_sdist = False
+            for file in files:
+                if file.get('yanked'):
+                    continue
+                requires_python = requires_python or file.get('requires_python')
+                if file.get('packagetype') == 'bdist_wheel':
+                    try:
+                        _, _, _, file_tags = parse_wheel_filename(file['filename'])
+                    except InvalidWheelFilename:
+                        continue
+                    wheel_tags.update(self.tag_ids.setdefault(tag, len(self.tag_ids)) for tag in file_tags)
+                elif file.get('packagetype') == 'sdist':
+                    has_sdist = True
+            if wheel_tags or has_sdist:
+                self.rows[version] = (requires_python, frozenset(wheel_tags), has_sdist)
+
+    def installable(self, python_version, platforms=None):
+        # Versions that pip could install for this interpreter and platform, in one pass
+        target = parse_python_version(python_version)
+        if target is None:
+            return set(self.rows)
+        supported = supported_tags(target, tuple(platforms) if platforms else None)
+        supported_ids = {tag_id for tag, tag_id in self.tag_ids.items() if tag in supported}
+        return {
+            version for version, (requires_python, wheel_tags, has_sdist) in self.rows.items()
+            if python_allowed(requires_python, target) and (has_sdist or not wheel_tags.isdisjoint(supported_ids))
+        }
+
+    def filter_versions(self, versions, python_version, platforms=None):
+        if parse_python_version(python_version) is None:
+            return list(versions)
+        installable = self.installable(python_version, platforms)
+        return [version for version in versions if version in installable]
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def table_for(package_name, metadata):
+    releases = metadata.get('releases', {})
+    key = normalize_name(package_name)
+    with _tables_lock:
+        cached = _tables.get(key)
+        if cached is not None and cached[0] == len(releases):
+            return cached[1]
+    table = CompatibilityTable(metadata)
+    with _tables_lock:
+        _tables[key] = (len(releases), table)
+    return table
+
+
+def filter_search_results(results, python_version):
+    # Search rows carry the latest release's requires_python; rows without it are kept
+    target = parse_python_version(python_version)
+    if target is None:
+        return list(results)
+    return [result for result in results if python_allowed(result.get('requires_python'), target)]
+
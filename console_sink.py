@@ -0,0 +1,80 @@
+import os
+import threading
+import tkinter as tk
+
+DEFAULT_LOG_PATH = os.path.join(os.path.expanduser("~"), ".pipsearch", "console.log")
+MAX_LINES = 2000
+FLUSH_MS = 100  # At most ten widget updates per second however much is printed
+
+
+class ConsoleSink:
+    # A file-like stdout replacement for the console Text widget. write() only appends to a
+    # buffer under a lock, so any thread may print. The Tk thread drains the buffer every
+    # flush_ms with a single insert, then trims the widget to its last max_lines lines;
+    # trimmed lines are appended to log_path (or dropped when log_path is None).
+    def __init__(self, text_widget, max_lines=MAX_LINES, flush_ms=FLUSH_MS, log_path=DEFAULT_LOG_PATH):
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.flush_ms = flush_ms
+        self.log_path = log_path
+        self.log_file = None
+        self.pending = []
+        self.lock = threading.Lock()
+        self.text_widget.after(self.flush_ms, self._pump)
+
+    def write(self, message):
+        if message:
+            with self.lock:
+                self.pending.append(message)
+        return len(message)
+
+    def flush(self):
+        pass  # Output reaches the widget on the next pump
+
+    def _pump(self):
+        try:
+            self.drain()
+        finally:
+            self.text_widget.after(self.flush_ms, self._pump)
+
+    def drain(self):
+        # Must run on the Tk thread
+        with self.lock:
+            if not self.pending:
+                return
+            text = "".join(self.pending)
+            self.pending = []
+
+        lines = text.splitlines(keepends=True)
+        if len(lines) > self.max_lines:
+            # A burst bigger than the whole ring never needs to touch the widget
+            self.spill("".join(lines[:-self.max_lines]))
+            text = "".join(lines[-self.max_lines:])
+
+        self.text_widget.config(state=tk.NORMAL)
+        self.text_widget.insert(tk.END, text)
+        line_count = int(self.text_widget.index('end-1c').split('.')[0])
+        if line_count > self.max_lines:
+            cut = f"{line_count - self.max_lines + 1}.0"
+            self.spill(self.text_widget.get('1.0', cut))
+            self.text_widget.delete('1.0', cut)
+        self.text_widget.see(tk.END)
+        self.text_widget.config(state=tk.DISABLED)
+
+    def spill(self, text):
+        if self.log_path is None or not text:
+            return
+        try:
+            if self.log_file is None:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                self.log_file = open(self.log_path, 'a', encoding='utf-8')
+            self.log_file.write(text)
+            self.log_file.flush()
+        except OSError:
+            self.log_path = None  # Keep the console working even if the log cannot be written
+
+    def close(self):
+        self.drain()
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
@@ -0,0 +1,200 @@
+import os
+import sys
+from email.parser import HeaderParser
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+from package_index import normalize_name
+
+METADATA_SUFFIXES = ('.dist-info', '.egg-info')
+
+
+def _read_name_version(metadata_path):
+    # Name and Version are the first headers of METADATA/PKG-INFO, so stop as soon as both are seen
+    name = version = None
+    try:
+        with open(metadata_path, 'r', encoding='utf-8', errors='replace') as file:
+            for line in file:
+                if line.startswith('Name:'):
+                    name = line[5:].strip()
+                elif line.startswith('Version:'):
+                    version = line[8:].strip()
+                elif not line.strip():
+                    break  # End of the headers
+                if name and version:
+                    break
+    except OSError:
+        pass
+    return name, version
+
+
+class InstalledDistribution:
+    # Only project_name, version and location are read while scanning; the full metadata,
+    # requirements and file list are parsed the first time they are asked for. The
+    # attribute names match pkg_resources.Distribution for the fields the GUI uses.
+    def __init__(self, project_name, version, location, path):
+        self.project_name = project_name
+        self.version = version
+        self.location = location
+        self.path = path  # The .dist-info/.egg-info directory (or PKG-INFO file)
+
+    @property
+    def key(self):
+        return normalize_name(self.project_name)
+
+    def _read(self, filename):
+        path = self.path if os.path.isfile(self.path) else os.path.join(self.path, filename)
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    @cached_property
+    def metadata(self):
+        text = self._read('METADATA' if self.path.endswith('.dist-info') else 'PKG-INFO') or ""
+        return HeaderParser().parsestr(text)
+
+    @property
+    def summary(self):
+        return self.metadata.get('Summary', "")
+
+    @cached_property
+    def requires(self):
+        return self.metadata.get_all('Requires-Dist') or []
+
+    @cached_property
+    def files(self):
+        # Paths relative to location, from RECORD (wheels) or installed-files.txt (eggs)
+        record = self._read('RECORD')
+        if record is not None:
+            return [line.split(',')[0] for line in record.splitlines() if line]
+        installed = self._read('installed-files.txt')
+        if installed is not None:
+            base = os.path.relpath(self.path, self.location)
+            return [os.path.normpath(os.path.join(base, line)) for line in installed.splitlines() if line]
+        return []
+
+    @cached_property
+    def top_level(self):
+        text = self._read('top_level.txt')
+        return [line.strip() for line in text.splitlines() if line.strip()] if text else []
+
+    def __repr__(self):
+        return f"<InstalledDistribution {self.project_name} {self.version} ({self.location})>"
+
+
+def _from_entry(location, entry):
+    if entry.name.endswith('.dist-info'):
+        metadata_path = os.path.join(entry.path, 'METADATA')
+    elif entry.is_dir():
+        metadata_path = os.path.join(entry.path, 'PKG-INFO')
+    else:
+        metadata_path = entry.path  # A bare .egg-info file is the PKG-INFO itself
+    name, version = _read_name_version(metadata_path)
+    if not name:
+        # Fall back to the directory name, "{name}-{version}.dist-info"
+        stem = entry.name.rsplit('.', 1)[0]
+        name, _, version = stem.partition('-')
+        if not name:
+            return None
+    return InstalledDistribution(name, version or "", location, entry.path)
+
+
+def scan_path(location, previous=None):
+    # Returns {entry name: (mtime_ns, distribution)}. Entries whose mtime matches the
+    # previous scan of this path are reused instead of being read again.
+    previous = previous or {}
+    scanned = {}
+    try:
+        entries = list(os.scandir(location))
+    except OSError:
+        return scanned
+    for entry in entries:
+        if not entry.name.endswith(METADATA_SUFFIXES):
+            continue
+        try:
+            mtime = entry.stat().st_mtime_ns
+        except OSError:
+            continue
+        known = previous.get(entry.name)
+        if known is not None and known[0] == mtime:
+            scanned[entry.name] = known
+            continue
+        distribution = _from_entry(location, entry)
+        if distribution is not None:
+            scanned[entry.name] = (mtime, distribution)
+    return scanned
+
+
+def default_paths():
+    return [path for path in sys.path if path and os.path.isdir(path)]
+
+
+def _path_mtime(location):
+    try:
+        return os.stat(location).st_mtime_ns
+    except OSError:
+        return None
+
+
+class InstalledSet:
+    # The installed distributions of a list of paths, kept up to date incrementally.
+    # Installing, upgrading or removing a distribution adds or removes an entry in its
+    # site-packages directory, which changes the directory's mtime. has_changed() only
+    # stats the directories, so it is cheap enough to poll; refresh() rescans just the
+    # directories that changed and reports which projects were added, removed or changed.
+    def __init__(self, paths=None, max_workers=8):
+        self.paths = default_paths() if paths is None else list(paths)
+        self.max_workers = max_workers
+        self.path_mtimes = {}
+        self.entries = {}
+        self.distributions = {}
+
+    def stamp(self):
+        # {path: mtime}; equal stamps mean nothing was installed or removed in between
+        return {path: _path_mtime(path) for path in self.paths}
+
+    def has_changed(self):
+        return any(_path_mtime(path) != self.path_mtimes.get(path) for path in self.paths)
+
+    def refresh(self, force=False):
+        changed_paths = [path for path in self.paths
+                         if force or _path_mtime(path) != self.path_mtimes.get(path)]
+        if not changed_paths:
+            return set(), set(), set()
+
+        def rescan(path):
+            # Read the mtime first, so a change made during the scan is caught next time
+            mtime = _path_mtime(path)
+            return path, mtime, scan_path(path, self.entries.get(path))
+
+        if len(changed_paths) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(changed_paths))) as executor:
+                results = list(executor.map(rescan, changed_paths))
+        else:
+            results = [rescan(path) for path in changed_paths]
+        for path, mtime, entries in results:
+            self.path_mtimes[path] = mtime
+            self.entries[path] = entries
+
+        previous = self.distributions
+        self.distributions = self._merge()
+        added = self.distributions.keys() - previous.keys()
+        removed = previous.keys() - self.distributions.keys()
+        changed = {name for name in self.distributions.keys() & previous.keys()
+                   if self.distributions[name] is not previous[name]}
+        return added, removed, changed
+
+    def _merge(self):
+        # Like sys.path, the first path that provides a project wins
+        installed = {}
+        for path in self.paths:
+            for _, distribution in self.entries.get(path, {}).values():
+                installed.setdefault(distribution.key, distribution)
+        return {distribution.project_name: distribution for distribution in installed.values()}
+
+
+def scan(paths=None, max_workers=8):
+    installed = InstalledSet(paths, max_workers)
+    installed.refresh(force=True)
+    return installed.distributions
@@ -0,0 +1,226 @@
+import os
+import time
+import hashlib
+import itertools
+import threading
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import pypi_http
+from install_scheduler import QUEUED, RUNNING, DONE, FAILED
+from pip_runner import PipEvent, PROGRESS, PHASE, LINE, ERROR, DOWNLOADING, FINISHED, PROGRESS_INTERVAL
+from wheelhouse import link_or_copy, file_sha256, same_file
+
+DEFAULT_WORKERS = 4
+CHUNK_SIZE = 256 * 1024
+MAX_ATTEMPTS = 6  # Per file; every attempt resumes where the previous one stopped
+RETRY_DELAY = 1.0  # Seconds before the first retry, doubled after each one
+PART_SUFFIX = ".part"
+
+_job_ids = itertools.count(1)
+
+
+class ReleaseFile:
+    def __init__(self, filename, url, size=None, sha256=None, project=None, version=None):
+        self.filename = filename
+        self.url = url
+        self.size = size
+        self.sha256 = sha256
+        self.project = project
+        self.version = version
+
+    @classmethod
+    def from_pypi(cls, entry, base_url=pypi_http.PYPI_URL, project=None, version=None):
+        # One entry of "urls" or "releases" in the /pypi/{name}/json response; mirrors may
+        # give URLs relative to that response
+        return cls(entry['filename'], urljoin(base_url, entry['url']), entry.get('size'),
+                   entry.get('digests', {}).get('sha256'), project, version)
+
+    def __repr__(self):
+        return f"<ReleaseFile {self.filename}>"
+
+
+class DownloadJob:
+    def __init__(self, file, directory):
+        self.id = next(_job_ids)
+        self.file = file
+        self.path = os.path.join(directory, file.filename)
+        self.status = QUEUED
+        self.error = None
+        self.done = 0  # Bytes in the .part file so far
+        self.resumed_from = 0
+        self.digest = None  # sha256 of the first `done` bytes, updated as they arrive
+
+    def __repr__(self):
+        return f"<DownloadJob {self.id} {self.file.filename} {self.status}>"
+
+
+class DownloadError(Exception):
+    pass
+
+
+class Downloader:
+    # Fetches release files into a directory, several at a time. Each file is written to
+    # "<name>.part" and hashed while it streams in; after a dropped connection the transfer
+    # resumes with an HTTP Range request, carrying on with the same hash object, and a .part
+    # left by an earlier run is hashed once and resumed the same way. Only a file whose
+    # size and sha256 match the index is renamed into place. on_event gets PipEvents, so
+    # the GUIs can show downloads like pip's own progress.
+    def __init__(self, max_workers=DEFAULT_WORKERS, wheelhouse=None, on_event=None):
+        self.max_workers = max_workers
+        self.wheelhouse = wheelhouse
+        self.on_event = on_event
+        self.lock = threading.Lock()
+        self.jobs = []
+        self.last_progress = 0.0
+        self.last_done = 0
+        self.last_time = None
+
+    def download_all(self, files, directory):
+        # Blocks until every file is either in directory or failed; returns the jobs
+        os.makedirs(directory, exist_ok=True)
+        jobs = [DownloadJob(file, directory) for file in files]
+        with self.lock:
+            self.jobs = jobs
+            self.last_done, self.last_time = 0, time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            list(executor.map(self._run, jobs))
+        self._progress(force=True)
+        return jobs
+
+    def _run(self, job):
+        job.status = RUNNING
+        try:
+            source = self._fetch(job)
+        except (OSError, requests.RequestException, DownloadError) as e:
+            job.status = FAILED
+            job.error = str(e)
+            self._emit(PipEvent(ERROR, DOWNLOADING, job.file.filename, f"ERROR: {job.file.filename}: {e}"))
+            return
+        job.status = DONE
+        self._emit(PipEvent(PHASE, FINISHED, job.file.filename, f"{source} {job.path}"))
+
+    def _fetch(self, job):
+        file = job.file
+        if self._in_wheelhouse(file):
+            # The store only holds verified content, so its files are not hashed again
+            stored = self.wheelhouse.file_path(file.filename)
+            if not same_file(stored, job.path):
+                self._replace_with(stored, job.path)
+            job.done = file.size or os.path.getsize(job.path)
+            return "Found in the wheelhouse"
+        if os.path.exists(job.path) and self._matches(job.path, file):
+            job.done = os.path.getsize(job.path)
+            return "Already downloaded"
+
+        part = job.path + PART_SUFFIX
+        self._resume_state(job, part)
+        delay = RETRY_DELAY
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                self._stream(job, part)
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                self._emit(PipEvent(LINE, DOWNLOADING, file.filename,
+                                    f"Retrying {file.filename} from byte {job.done} in {delay:.0f}s: {e}"))
+                time.sleep(delay)
+                delay *= 2
+
+        if file.size is not None and job.done != file.size:
+            os.remove(part)
+            raise DownloadError(f"expected {file.size} bytes, got {job.done}")
+        if file.sha256 and job.digest.hexdigest() != file.sha256:
+            os.remove(part)
+            raise DownloadError("sha256 does not match the index")
+        os.replace(part, job.path)
+        if self.wheelhouse is not None:
+            self.wheelhouse.add(job.path, digest=job.digest.hexdigest())
+        return "Saved"
+
+    def _resume_state(self, job, part):
+        # The bytes of an interrupted earlier run are hashed once, so new bytes can be appended
+        job.digest = hashlib.sha256()
+        job.done = 0
+        try:
+            with open(part, 'rb') as existing:
+                for chunk in iter(lambda: existing.read(CHUNK_SIZE), b''):
+                    job.digest.update(chunk)
+                    job.done += len(chunk)
+        except OSError:
+            pass
+        if job.file.size is not None and job.done > job.file.size:
+            self._restart(job, part)
+        job.resumed_from = job.done
+
+    def _restart(self, job, part):
+        job.digest = hashlib.sha256()
+        job.done = 0
+        open(part, 'wb').close()
+
+    def _stream(self, job, part):
+        # Appends the rest of the file to part; raises on network errors, leaving job.done and
+        # job.digest consistent with what has been written so far
+        headers = {'Accept-Encoding': 'identity'}  # Byte offsets must refer to the file itself
+        if job.done:
+            headers['Range'] = f"bytes={job.done}-"
+        with pypi_http.get(job.file.url, headers=headers, stream=True) as response:
+            if response.status_code == 416:
+                # Nothing left past our offset: either the part is complete, or it is not this file
+                if job.file.size is None or job.done == job.file.size:
+                    return
+                self._restart(job, part)
+                raise requests.ConnectionError("range not satisfiable, starting over")
+            if response.status_code >= 500:
+                raise requests.ConnectionError(f"{response.status_code} from {response.url}")  # Worth retrying
+            response.raise_for_status()
+            if job.done and response.status_code != 206:
+                self._restart(job, part)  # The server ignored the Range header and sends everything
+            with open(part, 'ab') as out:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    out.write(chunk)
+                    job.digest.update(chunk)
+                    job.done += len(chunk)
+                    self._progress()
+
+    def _in_wheelhouse(self, file):
+        return (self.wheelhouse is not None and file.sha256 is not None
+                and self.wheelhouse.by_name.get(file.filename) == file.sha256
+                and os.path.exists(self.wheelhouse.file_path(file.filename)))
+
+    def _matches(self, path, file):
+        # A file left by an earlier run; only read when its size already matches
+        if file.size is not None and os.path.getsize(path) != file.size:
+            return False
+        return not file.sha256 or file_sha256(path) == file.sha256
+
+    def _replace_with(self, source, destination):
+        if os.path.lexists(destination):
+            os.remove(destination)
+        link_or_copy(source, destination)
+
+    def _progress(self, force=False):
+        # One event for all files together, at most once per PROGRESS_INTERVAL
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self.last_progress < PROGRESS_INTERVAL:
+                return
+            done = sum(job.done for job in self.jobs)
+            total = sum(job.file.size or 0 for job in self.jobs)
+            rate = None
+            if self.last_time is not None and now > self.last_time:
+                rate = (done - self.last_done) / (now - self.last_time)
+            self.last_progress = self.last_time = now
+            self.last_done = done
+            count = len(self.jobs)
+        self._emit(PipEvent(PROGRESS, DOWNLOADING, f"{count} file{'s' if count != 1 else ''}",
+                            done=done, total=total or None, rate=rate))
+
+    def _emit(self, event):
+        if self.on_event is not None:
+            self.on_event(event)
+
+
+def download_files(files, directory, max_workers=DEFAULT_WORKERS, wheelhouse=None, on_event=None):
+    return Downloader(max_workers, wheelhouse, on_event).download_all(files, directory)
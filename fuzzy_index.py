@@ -0,0 +1,141 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from package_index import normalize_name, default_index
+
+
+def trigrams(text):
+    padded = f"^{text}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    # Levenshtein distance restricted to the diagonal band |i - j| <= limit; anything
+    # further apart is reported as limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    too_far = limit + 1
+    previous = {j: j for j in range(min(len(b), limit) + 1)}
+    for i in range(1, len(a) + 1):
+        char_a = a[i - 1]
+        current = {}
+        low, high = max(0, i - limit), min(len(b), i + limit)
+        if low == 0:
+            current[0] = i
+        for j in range(max(1, low), high + 1):
+            current[j] = min(previous.get(j, too_far) + 1,
+                             current.get(j - 1, too_far) + 1,
+                             previous.get(j - 1, too_far) + (char_a != b[j - 1]))
+        if min(current.values()) > limit:
+            return too_far
+        previous = current
+    return min(previous.get(len(b), too_far), too_far)
+
+
+class FuzzyIndex:
+    # Names are stored once, sorted, and referred to by position. Each trigram maps to a
+    # packed array of positions, which keeps ~600k PyPI names in a few tens of MB.
+    def __init__(self, names):
+        pairs = sorted({normalize_name(name): name for name in names}.items())
+        self.keys = [key for key, _ in pairs]
+        self.names = [name for _, name in pairs]
+        postings = {}
+        for position, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array('I')
+                posting.append(position)
+        self.postings = postings
+
+    def __len__(self):
+        return len(self.keys)
+
+    def prefix(self, query):
+        # Every name starting with query, in sorted order, found by bisecting the sorted keys
+        query = normalize_name(query.strip())
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + "\uffff", start)
+        return self.names[start:end]
+
+    def substring(self, query):
+        # Every name containing query, in sorted order. Names containing it also contain each
+        # of its trigrams, so only the shortest posting list has to be checked.
+        query = normalize_name(query.strip())
+        if not query:
+            return list(self.names)
+        if len(query) < 3:
+            return [self.names[position] for position, key in enumerate(self.keys) if query in key]
+        grams = [query[i:i + 3] for i in range(len(query) - 2)]
+        rarest = min((self.postings.get(gram, ()) for gram in grams), key=len)
+        return [self.names[position] for position in rarest if query in self.keys[position]]
+
+    def search(self, query, limit=10, max_distance=2, candidates=200):
+        query = normalize_name(query.strip())
+        if not query:
+            return []
+
+        ranked = {}
+        # Exact and prefix matches come straight from the sorted keys
+        start = bisect_left(self.keys, query)
+        for position in range(start, min(start + limit, len(self.keys))):
+            if not self.keys[position].startswith(query):
+                break
+            ranked[position] = (0 if self.keys[position] == query else 1, 0, len(self.keys[position]))
+
+        # Short queries get fewer typos, otherwise "bs" matches half of PyPI
+        max_distance = min(max_distance, len(query) // 4)
+        if len(ranked) >= limit or max_distance == 0:
+            return [self.names[position] for position in sorted(ranked, key=ranked.get)[:limit]]
+
+        # Every name within max_distance edits still shares one of the query's
+        # 3 * max_distance + 1 rarest trigrams, so those postings are enough to find it.
+        # An edit changes at most three trigrams, so a match also shares all but
+        # 3 * max_distance of them. Every name found is scored by trigram similarity
+        # (shared / all distinct trigrams), and only then are the `candidates` most similar
+        # ones checked with the much slower edit distance.
+        query_grams = trigrams(query)
+        grams = sorted(query_grams, key=lambda gram: len(self.postings.get(gram, ())))
+        found = set()
+        for gram in grams[:3 * max_distance + 1]:
+            found.update(self.postings.get(gram, ()))
+        min_shared = len(query_grams) - 3 * max_distance
+
+        scored = []
+        for position in found:
+            if position in ranked:
+                continue
+            key = self.keys[position]
+            if len(key) < len(query) - max_distance:
+                continue
+            padded = f"^{key}$"
+            shared = sum(gram in padded for gram in query_grams)
+            if shared < min_shared:
+                continue
+            scored.append((shared / (len(query_grams) + len(key) - shared), -position))
+
+        for _, position in heapq.nlargest(candidates, scored):
+            position = -position
+            key = self.keys[position]
+            # Names that merely start with a typo'd query still count ("beautifulsop" -> "beautifulsoup4")
+            distance = min(edit_distance(query, key, max_distance),
+                           edit_distance(query, key[:len(query)], max_distance) + 1)
+            if distance <= max_distance:
+                ranked[position] = (2, distance, len(key))
+
+        best = sorted(ranked, key=lambda position: (ranked[position], self.keys[position]))
+        return [self.names[position] for position in best[:limit]]
+
+
+_default_fuzzy = None
+_default_fuzzy_lock = threading.Lock()
+
+
+def default_fuzzy_index():
+    # Built from every name in the local package index on first use
+    global _default_fuzzy
+    with _default_fuzzy_lock:
+        if _default_fuzzy is None:
+            _default_fuzzy = FuzzyIndex(default_index().all_names())
+        return _default_fuzzy
@@ -0,0 +1,248 @@
+import os
+import ast
+import sys
+import json
+import hashlib
+import argparse
+import sysconfig
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".pipsearch", "imports.json")
+CACHE_FORMAT = 2  # 2: full dotted import names instead of top-level names only
+SKIP_DIRS = {'.git', '.hg', '.svn', '.tox', '.nox', '.venv', 'venv', 'env', '__pycache__',
+             'node_modules', 'site-packages', 'build', 'dist', '.mypy_cache', '.pytest_cache'}
+MAX_CACHE_ENTRIES = 200000  # Beyond this, entries not seen in the latest scan are dropped on save
+POOL_THRESHOLD = 64  # Fewer uncached files than this are parsed in-process
+CHUNK_SIZE = 32
+
+_SIMPLE_STATEMENTS = (ast.Expr, ast.Assign, ast.AugAssign, ast.AnnAssign, ast.Return, ast.Pass,
+                      ast.Raise, ast.Assert, ast.Delete, ast.Global, ast.Nonlocal, ast.Break, ast.Continue)
+
+
+def stdlib_modules_in(directories):
+    # Every module and package in the given standard library directories (site-packages is no identifier)
+    names = set()
+    for directory in directories:
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            name = entry.name
+            if entry.is_dir():
+                if name.isidentifier() and name != '__pycache__':
+                    names.add(name)
+            elif name.endswith('.py'):
+                names.add(name[:-3])
+            elif name.endswith(('.so', '.pyd')):
+                names.add(name.split('.')[0])
+    return names
+
+
+def _stdlib_module_names():
+    # sys.stdlib_module_names is new in Python 3.10; older interpreters list their Lib directory,
+    # plus lib-dynload (POSIX) or DLLs (Windows) for the extension modules
+    names = getattr(sys, 'stdlib_module_names', None)
+    if names is None:
+        paths = sysconfig.get_paths()
+        directories = {paths['stdlib'], paths['platstdlib']}
+        directories |= {os.path.join(directory, 'lib-dynload') for directory in set(directories)}
+        directories.add(os.path.join(sys.base_prefix, 'DLLs'))
+        names = stdlib_modules_in(sorted(directories))
+    return frozenset(names) | frozenset(sys.builtin_module_names) | {'__future__'}
+
+
+STDLIB_MODULES = _stdlib_module_names()
+
+
+def _import_statements(statements):
+    # Imports are statements, so only statement bodies need visiting, never expressions;
+    # that skips most of the tree ast.walk would go through
+    stack = list(statements)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            yield node
+        elif not isinstance(node, _SIMPLE_STATEMENTS):
+            for field in ('body', 'orelse', 'finalbody', 'handlers', 'cases'):
+                children = getattr(node, field, None)
+                if children:
+                    stack.extend(children)
+
+
+def top_level_name(module):
+    return module.partition('.')[0]
+
+
+def imports_from_source(source, filename="<unknown>"):
+    # Dotted names of absolute imports; relative imports (level > 0) are always local.
+    # "from a.b import c" gives both a.b and a.b.c, since c may be a submodule: for a
+    # namespace package (google.*, azure.*) that is what tells its distributions apart.
+    if (b'import' if isinstance(source, bytes) else 'import') not in source:
+        return []
+    try:
+        tree = ast.parse(source, filename=filename)
+    except (SyntaxError, ValueError):
+        return []
+    names = set()
+    for node in _import_statements(tree.body):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names.add(alias.name)
+        elif node.level == 0 and node.module:
+            names.add(node.module)
+            names.update(f"{node.module}.{alias.name}" for alias in node.names if alias.name != '*')
+    return sorted(names)
+
+
+def _parse(item):
+    # Runs in the worker processes
+    digest, path, source = item
+    return digest, imports_from_source(source, path)
+
+
+def iter_python_files(root):
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = [name for name in subdirectories
+                             if name not in SKIP_DIRS and not name.startswith('.') and not name.endswith('.egg-info')]
+        for name in files:
+            if name.endswith('.py'):
+                yield os.path.join(directory, name)
+
+
+def local_module_names(paths, root=None):
+    # Anything importable from inside the project itself: every module file, and every
+    # directory between the scan root and a Python file
+    names = set()
+    for path in paths:
+        names.add(os.path.splitext(os.path.basename(path))[0])
+        if root is not None:
+            names.update(os.path.relpath(os.path.dirname(path), root).split(os.sep))
+    names.discard(os.curdir)
+    return names
+
+
+def sibling_module_names(directory):
+    # What a script can import from its own directory: modules, packages, and namespace
+    # directories with Python files somewhere below them, as the tree scan counts them
+    names = set()
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return names
+    for entry in entries:
+        if entry.name.endswith('.py') and entry.is_file():
+            names.add(entry.name[:-3])
+        elif entry.is_dir() and entry.name not in SKIP_DIRS and not entry.name.startswith('.'):
+            if os.path.isfile(os.path.join(entry.path, '__init__.py')) or next(iter_python_files(entry.path), None):
+                names.add(entry.name)
+    return names
+
+
+class ImportScanner:
+    # Finds the third-party packages a source tree imports. Files are identified by the
+    # sha1 of their content, so a rescan only parses files that changed since any earlier
+    # scan (of any tree), and large batches of changed files are parsed in a process pool.
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, max_workers=None):
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.cache = self._load()
+        self.seen = set()
+        self.dirty = False
+
+    def _load(self):
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('format') != CACHE_FORMAT:
+            return {}  # Written by an older version; every file is parsed again
+        return data.get('imports', {})
+
+    def save(self):
+        with self.lock:
+            if not self.cache_path or not self.dirty:
+                return
+            if len(self.cache) > MAX_CACHE_ENTRIES:
+                self.cache = {digest: self.cache[digest] for digest in self.seen if digest in self.cache}
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            temporary = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump({'format': CACHE_FORMAT, 'imports': self.cache}, file)
+            os.replace(temporary, self.cache_path)
+            self.dirty = False
+
+    def imports_by_file(self, paths):
+        # {path: [dotted imports]}, parsing only files whose content is not cached yet
+        results = {}
+        misses = []
+        for path in paths:
+            try:
+                with open(path, 'rb') as file:
+                    source = file.read()
+            except OSError:
+                continue
+            digest = hashlib.sha1(source).hexdigest()
+            self.seen.add(digest)
+            cached = self.cache.get(digest)
+            if cached is not None:
+                results[path] = cached
+            else:
+                misses.append((digest, path, source))
+
+        if len(misses) >= POOL_THRESHOLD and self.max_workers != 1 and (os.cpu_count() or 1) > 1:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                parsed = list(executor.map(_parse, misses, chunksize=CHUNK_SIZE))
+        else:
+            parsed = [_parse(item) for item in misses]
+
+        with self.lock:
+            for (digest, path, _), (_, imports) in zip(misses, parsed):
+                self.cache[digest] = imports
+                results[path] = imports
+            self.dirty = self.dirty or bool(misses)
+        return results
+
+    def third_party_imports(self, paths, root=None, dotted=False):
+        # Top-level names, or with dotted=True every dotted name imported from them, which is
+        # what ModuleIndex needs to tell the providers of a namespace package apart
+        paths = list(paths)
+        found = set()
+        for imports in self.imports_by_file(paths).values():
+            found.update(imports)
+        local = local_module_names(paths, root)
+        self.save()
+        found = {name for name in found if top_level_name(name) not in STDLIB_MODULES and top_level_name(name) not in local}
+        return sorted(found if dotted else {top_level_name(name) for name in found})
+
+    def scan(self, root, dotted=False):
+        return self.third_party_imports(iter_python_files(root), root, dotted)
+
+
+def scan_project(root, cache_path=DEFAULT_CACHE_PATH, dotted=False):
+    return ImportScanner(cache_path).scan(root, dotted)
+
+
+def scan_file(path, cache_path=DEFAULT_CACHE_PATH, dotted=False):
+    # A single script; modules next to it count as local
+    local = sibling_module_names(os.path.dirname(path) or os.curdir)
+    return [name for name in ImportScanner(cache_path).third_party_imports([path], dotted=dotted)
+            if top_level_name(name) not in local]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the third-party packages a source tree imports.")
+    parser.add_argument("root", help="project directory to scan")
+    parser.add_argument("--no-cache", action="store_true", help="parse every file, without reading or writing the cache")
+    args = parser.parse_args()
+    for name in ImportScanner(None if args.no_cache else DEFAULT_CACHE_PATH).scan(args.root):
+        print(name)
+
+
+if __name__ == "__main__":
+    main()
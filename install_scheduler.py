@@ -0,0 +1,240 @@
+import itertools
+import threading
+from pip_runner import PipRun, PipEvent, PHASE, INSTALLING
+from wheelhouse import only_wheels
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+_job_ids = itertools.count(1)
+
+
+class InstallJob:
+    def __init__(self, requirement, target="", after=()):
+        self.id = next(_job_ids)
+        self.requirement = requirement
+        self.target = target
+        self.after = list(after)
+        self.status = QUEUED
+        self.error = None
+        self.cancel_requested = False
+        self.run_alone = False
+
+    def __repr__(self):
+        return f"<InstallJob {self.id} {self.requirement} {self.status}>"
+
+
+class InstallScheduler:
+    # Jobs are coalesced per target directory into one pip invocation, and at most one pip
+    # process ever writes to a given target. max_workers bounds pip processes overall.
+    # A job only becomes runnable once every job listed in its `after` has finished.
+    # on_progress gets every job state change; on_event gets (jobs, PipEvent) while pip runs.
+    # With a wheelhouse, each batch is first downloaded into it (files already there are not
+    # fetched again) and then installed from it, without the index unless a source
+    # distribution has to be built. Batches of plain wheels (Wheelhouse.linkable) for a target
+    # directory are hard-linked into it instead of being unpacked by pip.
+    def __init__(self, max_workers=2, max_batch=50, on_progress=None, on_event=None, wheelhouse=None):
+        self.max_workers = max_workers
+        self.max_batch = max_batch
+        self.on_progress = on_progress
+        self.on_event = on_event
+        self.wheelhouse = wheelhouse
+        self.condition = threading.Condition()
+        self.queue = []
+        self.busy_targets = set()
+        self.running = {}
+        self.worker_count = 0
+
+    def submit(self, requirement, target="", after=()):
+        job = InstallJob(requirement, target, after)
+        with self.condition:
+            self.queue.append(job)
+            self._ensure_workers()
+            self.condition.notify_all()
+        self._report(job)
+        return job
+
+    def cancel(self, job):
+        run = None
+        with self.condition:
+            if job.status in FINISHED_STATES:
+                return
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                self.queue.remove(job)
+                job.status = CANCELLED
+            else:
+                run = self.running.get(job.target)
+            self.condition.notify_all()
+        if run is not None:
+            run.terminate()
+        if job.status == CANCELLED:
+            self._report(job)
+
+    def cancel_all(self):
+        with self.condition:
+            jobs = list(self.queue) + [job for batch in self._running_batches() for job in batch]
+        for job in jobs:
+            self.cancel(job)
+
+    def wait(self):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.queue and not self.busy_targets)
+
+    def _running_batches(self):
+        return [run.jobs for run in self.running.values()]
+
+    def _ensure_workers(self):
+        # Called with the condition held; workers exit once the queue drains
+        while self.worker_count < self.max_workers:
+            self.worker_count += 1
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def _work(self):
+        while True:
+            with self.condition:
+                orphans = self._fail_orphans()
+                batch = self._take_batch()
+                while batch is None and not orphans:
+                    if not self.queue:
+                        self.worker_count -= 1
+                        return
+                    self.condition.wait()
+                    orphans = self._fail_orphans()
+                    batch = self._take_batch()
+            for job in orphans:
+                self._report(job)
+            if batch is not None:
+                self._run_batch(batch)
+
+    def _take_batch(self):
+        # Called with the condition held
+        batch = []
+        for job in self.queue:
+            if not self._is_ready(job):
+                continue
+            if not batch:
+                if job.target in self.busy_targets:
+                    continue
+                batch.append(job)
+                if job.run_alone:
+                    break
+            elif job.target == batch[0].target and not job.run_alone:
+                batch.append(job)
+            if len(batch) >= self.max_batch:
+                break
+        if not batch:
+            return None
+        for job in batch:
+            self.queue.remove(job)
+            job.status = RUNNING
+        self.busy_targets.add(batch[0].target)
+        return batch
+
+    def _is_ready(self, job):
+        return all(dependency.status == DONE for dependency in job.after)
+
+    def _fail_orphans(self):
+        # A job whose prerequisite failed or was cancelled can never run
+        orphans = [job for job in self.queue
+                   if any(dependency.status in (FAILED, CANCELLED) for dependency in job.after)]
+        for job in orphans:
+            self.queue.remove(job)
+            job.status = FAILED
+            job.error = "a prerequisite did not install"
+        if orphans:
+            self.condition.notify_all()
+        return orphans
+
+    def _run_batch(self, batch):
+        target = batch[0].target
+        for job in batch:
+            self._report(job)
+
+        error = None
+        try:
+            returncode, run = self._install(batch)
+        except Exception as e:
+            # The worker thread must still finish the batch, or wait() never returns
+            returncode, run, error = None, None, f"Could not install: {e}"
+
+        with self.condition:
+            self.running.pop(target, None)
+            self.busy_targets.discard(target)
+            cancelled = any(job.cancel_requested for job in batch)
+            requeue = []
+            for job in batch:
+                if job.cancel_requested:
+                    job.status = CANCELLED
+                elif returncode == 0:
+                    job.status = DONE
+                elif cancelled:
+                    # Collateral of cancelling a neighbour in the same pip run
+                    requeue.append(job)
+                elif len(batch) > 1:
+                    # pip gives up on the whole batch if one requirement fails; retry alone to find out which
+                    job.run_alone = True
+                    requeue.append(job)
+                else:
+                    job.status = FAILED
+                    job.error = run.error if run is not None else error or "pip was not started"
+            for job in requeue:
+                job.status = QUEUED
+            self.queue[:0] = requeue
+            self.condition.notify_all()
+
+        for job in batch:
+            self._report(job)
+
+    def _start(self, batch, run):
+        # Starts run unless a job of the batch has been cancelled, and lets cancel() find it
+        with self.condition:
+            if any(job.cancel_requested for job in batch):
+                return False
+            run.start()
+            run.jobs = batch
+            self.running[batch[0].target] = run
+            return True
+
+    def _pip(self, batch, args):
+        run = PipRun(args, on_event=lambda event: self._report_event(batch, event))
+        if not self._start(batch, run):
+            return None, None
+        return run.wait(), run
+
+    def _install(self, batch):
+        # Returns (pip's return code, the last PipRun), or (None, None) when cancelled before starting
+        target = batch[0].target
+        requirements = [job.requirement for job in batch]
+        if self.wheelhouse is None:
+            return self._pip(batch, ["install"] + requirements + (["--target", target] if target else []))
+
+        run, paths = self.wheelhouse.download(requirements, on_event=lambda event: self._report_event(batch, event),
+                                              start=lambda run: self._start(batch, run))
+        if run is None or run.returncode != 0:
+            return (None, None) if run is None else (run.returncode, run)
+        try:
+            if target and paths and all(self.wheelhouse.linkable(path) for path in paths):
+                self._report_event(batch, PipEvent(PHASE, INSTALLING, None, f"Linking {len(paths)} wheels into {target}"))
+                try:
+                    self.wheelhouse.link_into(paths, target)
+                except OSError as e:
+                    run.error = f"Could not install into {target}: {e}"
+                    return 1, run
+                return 0, run
+            return self._pip(batch, self.wheelhouse.install_args(requirements, target, offline=only_wheels(paths)))
+        finally:
+            self.wheelhouse.release(paths)
+
+    def _report(self, job):
+        if self.on_progress is not None:
+            self.on_progress(job)
+
+    def _report_event(self, jobs, event):
+        if self.on_event is not None:
+            self.on_event(jobs, event)
@@ -0,0 +1,67 @@
+import threading
+
+
+class LatestSearchRunner:
+    # Runs searches one at a time on a single worker thread. A term submitted while another
+    # is running replaces any term still waiting, so rapid typing never queues more than one
+    # backend query. Every submission gets a generation number; callers compare it against
+    # is_current() before touching the UI, which drops results that arrive after a newer term.
+    def __init__(self, run):
+        self.run = run
+        self.condition = threading.Condition()
+        self.pending = None
+        self.generation = 0
+        self.thread = None
+
+    def submit(self, *args):
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, args)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._work, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+            return self.generation
+
+    def cancel(self):
+        # Forget the waiting term and make whatever is running stale
+        with self.condition:
+            self.generation += 1
+            self.pending = None
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def _work(self):
+        while True:
+            with self.condition:
+                if not self.condition.wait_for(lambda: self.pending is not None, timeout=30):
+                    self.thread = None
+                    return
+                generation, args = self.pending
+                self.pending = None
+            try:
+                self.run(*args, generation=generation)
+            except Exception as e:
+                print(f"Search failed: {e}")
+
+
+class PrefixResultCache:
+    # Remembers the last complete (untruncated) result set. When the user keeps typing,
+    # "reque" -> "reques", every match for the longer term is already in that set, so it
+    # can be narrowed locally instead of asking the backend again.
+    def __init__(self):
+        self.term = None
+        self.results = None
+
+    def remember(self, term, results, complete):
+        if complete:
+            self.term, self.results = term.lower(), results
+        else:
+            self.term, self.results = None, None
+
+    def candidates(self, term):
+        term = term.lower()
+        if self.term is not None and term.startswith(self.term):
+            return self.results
+        return None
@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import argparse
+from packaging.utils import parse_wheel_filename, InvalidWheelFilename
+from compat import parse_python_version, supported_tags
+from downloader import Downloader, ReleaseFile
+from install_scheduler import DONE
+from pip_runner import run_pip, PipEvent, PHASE, PROGRESS, INSTALLING
+from wheelhouse import default_wheelhouse, only_wheels
+
+LOCK_FORMAT = 1
+DEFAULT_LOCK_NAME = "pipsearch.lock"
+
+
+class Lockfile:
+    # The outcome of one resolution: what was asked for, and for every pinned project the
+    # exact file to install with its URL, size and sha256. Installing from it needs neither
+    # the resolver nor any metadata request.
+    def __init__(self, requested, python_version, packages):
+        self.requested = list(requested)
+        self.python_version = python_version
+        self.packages = packages  # [{'name', 'version', 'filename', 'url', 'size', 'sha256'}]
+
+    @classmethod
+    def from_files(cls, requested, python_version, files):
+        packages = [{'name': file.project, 'version': file.version, 'filename': file.filename,
+                     'url': file.url, 'size': file.size, 'sha256': file.sha256} for file in files]
+        return cls(requested, python_version, sorted(packages, key=lambda package: package['name'].lower()))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if data.get('format') != LOCK_FORMAT:
+            raise ValueError(f"{path} is not a pipsearch lockfile of format {LOCK_FORMAT}")
+        return cls(data['requested'], data.get('python_version'), data['packages'])
+
+    def save(self, path):
+        # Sorted and indented so that lockfiles diff well under version control
+        data = {'format': LOCK_FORMAT, 'requested': self.requested,
+                'python_version': self.python_version, 'packages': self.packages}
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=2, sort_keys=True)
+            file.write("\n")
+        os.replace(temporary, path)
+
+    def pins(self):
+        return [f"{package['name']}=={package['version']}" for package in self.packages]
+
+    def release_files(self):
+        return [ReleaseFile(package['filename'], package['url'], package.get('size'), package['sha256'],
+                            package['name'], package['version']) for package in self.packages]
+
+
+def incompatibility(lock, python_version=None, platforms=None):
+    # Why the lock's files cannot be installed for this interpreter (python_version as
+    # (major, minor), the running one by default), or None. link_into checks no tags at all,
+    # so this is the only thing between a 3.12 lock and a 3.8 environment.
+    running = tuple(python_version or sys.version_info[:2])
+    locked = parse_python_version(lock.python_version)
+    if locked is not None and locked != running:
+        return f"The lockfile was made for Python {locked[0]}.{locked[1]}, this is Python {running[0]}.{running[1]}"
+    supported = supported_tags(running, tuple(platforms) if platforms else None)
+    unsupported = []
+    for package in lock.packages:
+        if not package['filename'].endswith('.whl'):
+            continue
+        try:
+            _, _, _, file_tags = parse_wheel_filename(package['filename'])
+        except InvalidWheelFilename:
+            unsupported.append(package['filename'])
+            continue
+        if not file_tags & supported:
+            unsupported.append(package['filename'])
+    if unsupported:
+        return f"Not installable on this platform: {', '.join(unsupported)}"
+    return None
+
+
+def install_locked(lock, target="", on_event=None, wheelhouse=None, max_workers=4):
+    # Returns None on success, otherwise what went wrong. Files already in the wheelhouse are
+    # used as they are; missing ones are downloaded straight into it and checked against the
+    # lockfile's sha256. Plain wheels (Wheelhouse.linkable) for a target directory are
+    # hard-linked from the store, anything else goes to pip as file paths with --no-deps,
+    # so pip resolves nothing either. A source distribution keeps the index reachable for
+    # its build backend. Nothing is installed from a lock made for another Python or platform.
+    problem = incompatibility(lock)
+    if problem is not None:
+        return problem
+    wheelhouse = wheelhouse or default_wheelhouse()
+    files = lock.release_files()
+    unhashed = [file.filename for file in files if not file.sha256]
+    if unhashed:
+        return f"No sha256 in the lockfile for {', '.join(unhashed)}"
+    with wheelhouse.in_use(file.filename for file in files):
+        return _install_files(files, target, on_event, wheelhouse, max_workers)
+
+
+def _install_files(files, target, on_event, wheelhouse, max_workers):
+    jobs = Downloader(max_workers, wheelhouse, on_event).download_all(files, wheelhouse.files_dir)
+    wheelhouse.evict(keep={file.sha256 for file in files})
+    failed = [job for job in jobs if job.status != DONE]
+    if failed:
+        return "; ".join(f"{job.file.filename}: {job.error}" for job in failed)
+
+    paths = [job.path for job in jobs]
+    if target and all(wheelhouse.linkable(path) for path in paths):
+        if on_event is not None:
+            on_event(PipEvent(PHASE, INSTALLING, None, f"Linking {len(paths)} wheels into {target}"))
+        try:
+            wheelhouse.link_into(paths, target)
+        except OSError as e:
+            return f"Could not install into {target}: {e}"
+        return None
+
+    args = ["install"] + (["--no-index"] if only_wheels(paths) else []) + ["--no-deps"] + paths
+    if target:
+        args.extend(["--target", target])
+    run = run_pip(args, on_event=on_event)
+    return None if run.returncode == 0 else run.error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Install the exact files listed in a pipsearch lockfile.")
+    parser.add_argument("lockfile", nargs="?", default=DEFAULT_LOCK_NAME, help=f"default: {DEFAULT_LOCK_NAME}")
+    parser.add_argument("--target", default="", help="install into this directory instead of the current environment")
+    args = parser.parse_args()
+
+    lock = Lockfile.load(args.lockfile)
+    print(f"Installing {len(lock.packages)} locked packages for {', '.join(lock.requested)}...")
+
+    def report(event):
+        if event.kind != PROGRESS:
+            print(event.describe())
+
+    error = install_locked(lock, args.target, on_event=report)
+    print("Done." if error is None else f"Failed: {error}")
+
+
+if __name__ == "__main__":
+    main()
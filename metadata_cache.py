@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from urllib.parse import urlencode
+import requests
+import pypi_http
+from package_index import normalize_name
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pipsearch", "cache")
+RELEASE_TTL = 30 * 24 * 3600
+GONE = (404, 410)  # The only errors that mean the cached data no longer exists
+
+
+class MetadataCache:
+    # Two tiers: a size-bounded in-memory LRU in front of a directory of JSON entries.
+    # Package metadata is revalidated with ETag/Last-Modified once it is older than max_age,
+    # and at most once per session; search pages simply expire after search_ttl. When a
+    # request for an expired entry fails, the stale entry is served without asking again for
+    # retry_after seconds, so working offline does not mean waiting on the network every time.
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_memory_bytes=64 * 1024 * 1024,
+                 max_age=600, search_ttl=300, retry_after=60):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_age = max_age
+        self.search_ttl = search_ttl
+        self.retry_after = retry_after
+
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+        self.key_locks = {}  # key -> [Lock, callers using it]; dropped when the last one is done
+        self.revalidated = set()
+        self.retry_at = {}  # key -> time before which a failed key is served stale without a request
+
+    def get_package_json(self, package_name):
+        key = f"json/{normalize_name(package_name)}"
+        url = f"{pypi_http.PYPI_URL}/pypi/{package_name}/json"
+        entry = self._get(key, url, self.max_age, revalidate=True)
+        if entry is None:
+            return None
+        return entry['data']
+
+    def get_release_json(self, package_name, version):
+        # Published releases do not change, so these never need revalidating
+        key = f"json/{normalize_name(package_name)}/{version}"
+        url = f"{pypi_http.PYPI_URL}/pypi/{package_name}/{version}/json"
+        entry = self._get(key, url, RELEASE_TTL, revalidate=False)
+        if entry is None:
+            return None
+        return entry['data']
+
+    def get_search_page(self, search_term, page=1):
+        key = f"search/{search_term.strip().lower()}/{page}"
+        url = f"{pypi_http.PYPI_URL}/search/?{urlencode({'q': search_term, 'page': page})}"
+        entry = self._get(key, url, self.search_ttl, revalidate=False, as_json=False)
+        if entry is None:
+            return None
+        return entry['data']
+
+    def invalidate(self, package_name):
+        key = f"json/{normalize_name(package_name)}"
+        with self.lock:
+            entry = self.memory.pop(key, None)
+            if entry is not None:
+                self.memory_bytes -= entry['size']
+            self.revalidated.discard(key)
+            self.retry_at.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear_memory(self):
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+
+    def _get(self, key, url, ttl, revalidate, as_json=True):
+        # One lock per key so concurrent callers for the same package share a single request
+        with self.lock:
+            slot = self.key_locks.get(key)
+            if slot is None:
+                slot = self.key_locks[key] = [threading.Lock(), 0]
+            slot[1] += 1
+        try:
+            with slot[0]:
+                return self._fetch(key, url, ttl, revalidate, as_json)
+        finally:
+            with self.lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    del self.key_locks[key]
+
+    def _fetch(self, key, url, ttl, revalidate, as_json):
+        entry = self._lookup(key)
+        now = time.time()
+        if entry is not None:
+            if now - entry['fetched_at'] < ttl or key in self.revalidated:
+                return entry
+            if now < self.retry_at.get(key, 0):
+                return entry
+
+        headers = {}
+        if entry is not None and revalidate:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+            elif not entry.get('etag'):
+                headers['If-Modified-Since'] = formatdate(entry['fetched_at'], usegmt=True)
+
+        try:
+            response = pypi_http.get(url, headers=headers)
+        except requests.RequestException as e:
+            print(f"Could not reach {url}: {e}")
+            # Offline: stale data is better than nothing
+            return self._stale(key, entry, now)
+
+        if response.status_code == 304 and entry is not None:
+            entry['fetched_at'] = now
+        elif response.status_code == 200:
+            try:
+                data = response.json() if as_json else response.text
+            except ValueError:
+                # A captive portal or proxy error page, not PyPI; never cache it
+                print(f"{url} did not answer with JSON")
+                return self._stale(key, entry, now)
+            entry = {
+                'data': data,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': now,
+                'size': len(response.content),
+            }
+        elif response.status_code in GONE:
+            return None
+        else:
+            # 429, 5xx and the like say nothing about the data; keep serving what we have
+            if entry is not None:
+                print(f"{url} answered {response.status_code}; using cached data")
+            return self._stale(key, entry, now)
+
+        if revalidate:
+            self.revalidated.add(key)
+        self.retry_at.pop(key, None)
+        self._store(key, entry)
+        return entry
+
+    def _stale(self, key, entry, now):
+        # The request failed: serve what we have and leave the server alone for a while
+        if entry is not None:
+            self.retry_at[key] = now + self.retry_after
+        return entry
+
+    def _lookup(self, key):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                return entry
+
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _store(self, key, entry):
+        self._remember(key, entry)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, path)
+
+    def _remember(self, key, entry):
+        with self.lock:
+            previous = self.memory.pop(key, None)
+            if previous is not None:
+                self.memory_bytes -= previous['size']
+            self.memory[key] = entry
+            self.memory_bytes += entry['size']
+            # Evict least recently used entries until we are back under budget
+            while self.memory_bytes > self.max_memory_bytes and len(self.memory) > 1:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_bytes -= evicted['size']
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.json")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MetadataCache(os.environ.get("PIPSEARCH_CACHE_DIR", DEFAULT_CACHE_DIR))
+        return _default_cache
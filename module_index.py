@@ -0,0 +1,180 @@
+import json
+import argparse
+import threading
+import dist_scanner
+from package_index import default_index
+
+INSTALLED = 'installed'
+
+# Import names that differ from the project that provides them and cannot be learned
+# without the project being installed
+KNOWN_ALIASES = {
+    'attr': 'attrs',
+    'bs4': 'beautifulsoup4',
+    'cv2': 'opencv-python',
+    'dateutil': 'python-dateutil',
+    'dns': 'dnspython',
+    'docx': 'python-docx',
+    'dotenv': 'python-dotenv',
+    'fitz': 'PyMuPDF',
+    'gi': 'PyGObject',
+    'git': 'GitPython',
+    'jose': 'python-jose',
+    'jwt': 'PyJWT',
+    'magic': 'python-magic',
+    'MySQLdb': 'mysqlclient',
+    'OpenSSL': 'pyOpenSSL',
+    'PIL': 'Pillow',
+    'pptx': 'python-pptx',
+    'psycopg2': 'psycopg2-binary',
+    'serial': 'pyserial',
+    'sklearn': 'scikit-learn',
+    'skimage': 'scikit-image',
+    'slugify': 'python-slugify',
+    'usb': 'pyusb',
+    'win32api': 'pywin32',
+    'win32con': 'pywin32',
+    'wx': 'wxPython',
+    'yaml': 'PyYAML',
+    'zmq': 'pyzmq',
+}
+
+# Top-level names that careless packages install but that nobody means to import from them
+IGNORED_MODULES = {'test', 'tests', 'testing', 'doc', 'docs', 'example', 'examples', 'benchmarks', 'scripts'}
+
+
+def top_level_modules(distribution):
+    # top_level.txt when the distribution ships it, otherwise the first component of each RECORD path
+    names = set(distribution.top_level)
+    if not names:
+        for path in distribution.files:
+            first = path.replace('\\', '/').split('/')[0]
+            if not first or first in ('..', '__pycache__') or first.endswith(('.dist-info', '.egg-info', '.data', '.pth')):
+                continue
+            if '/' in path.replace('\\', '/'):
+                names.add(first)
+            elif first.endswith('.py'):
+                names.add(first[:-3])
+            elif first.endswith(('.so', '.pyd')):
+                names.add(first.split('.')[0])
+    return {name for name in names if name.isidentifier() and name not in IGNORED_MODULES}
+
+
+class ModuleIndex:
+    # Maps top-level import names to the distributions that provide them. The mapping for
+    # installed distributions is stored in the package index database, next to the PyPI
+    # project list, and is only rebuilt when a site-packages directory has changed since
+    # the last build. A lookup is then a primary-key query plus a dict lookup.
+    def __init__(self, index=None, installed=None):
+        self.index = index or default_index()
+        self.installed = installed or dist_scanner.InstalledSet()
+        self.lock = threading.Lock()
+        self.checked = False
+
+    def refresh(self, force=False):
+        # Cheap when nothing changed: one stat per site-packages directory
+        with self.lock:
+            stamp = json.dumps(self.installed.stamp(), sort_keys=True)
+            if not force and self.index.get_meta('modules_stamp') == stamp:
+                self.checked = True
+                return False
+            self.installed.refresh(force=True)
+            rows = set()
+            for distribution in self.installed.distributions.values():
+                for module in top_level_modules(distribution):
+                    rows.add((module, distribution.project_name))
+            self.index.set_modules(INSTALLED, sorted(rows))
+            self.index.set_meta('modules_stamp', stamp)
+            self.checked = True
+            return True
+
+    def lookup(self, module):
+        # Every known provider, best first: installed, well-known alias, same-named PyPI project.
+        # Several installed distributions can share a namespace package (google, azure); for a
+        # dotted name (import_scanner's dotted=True) the one whose RECORD has the deepest part of
+        # it comes first, otherwise by name.
+        if not self.checked:
+            self.refresh()
+        top_level = module.partition('.')[0]
+        providers = [name for name, _ in self.index.modules_for(top_level)]
+        if len(providers) > 1 and '.' in module:
+            providers.sort(key=lambda name: -self._provided_depth(name, module))
+        alias = KNOWN_ALIASES.get(top_level)
+        if alias and alias not in providers:
+            providers.append(alias)
+        if not providers:
+            same_name = self.index.get(top_level)
+            if same_name is not None:
+                providers.append(same_name['name'])
+        return providers
+
+    def _provided_depth(self, project_name, module):
+        # How many components of the dotted name the distribution's RECORD goes down to
+        if not self.installed.distributions:
+            self.installed.refresh()
+        distribution = self.installed.distributions.get(project_name)
+        if distribution is None:
+            return 0
+        files = [file.replace('\\', '/') for file in distribution.files]
+        parts = module.split('.')
+        for depth in range(len(parts), 1, -1):
+            path = '/'.join(parts[:depth])
+            if any(file.startswith((path + '/', path + '.')) for file in files):
+                return depth
+        return 1
+
+    def distribution_for(self, module):
+        # Falls back to the top-level import name itself, which is right for most projects
+        providers = self.lookup(module)
+        return providers[0] if providers else module.partition('.')[0]
+
+    def distributions_for(self, modules):
+        # Several imports can come from one distribution (google.*, win32api/win32con). For a
+        # top level with several providers only the most specific dotted names are looked up:
+        # "google" and "google.cloud" say nothing about which google-cloud-* is meant.
+        self.refresh()
+        modules = list(dict.fromkeys(modules))
+        prefixes = {module.rsplit('.', depth)[0] for module in modules for depth in range(1, module.count('.') + 1)}
+        by_top_level = {}
+        for module in modules:
+            by_top_level.setdefault(module.partition('.')[0], []).append(module)
+        distributions = []
+        for top_level, dotted in by_top_level.items():
+            if len(self.lookup(top_level)) > 1:
+                chosen = [self.distribution_for(module) for module in dotted if module not in prefixes]
+            else:
+                chosen = [self.distribution_for(top_level)]
+            for distribution in chosen:
+                if distribution not in distributions:
+                    distributions.append(distribution)
+        return distributions
+
+
+_default_module_index = None
+_default_module_index_lock = threading.Lock()
+
+
+def default_module_index():
+    global _default_module_index
+    with _default_module_index_lock:
+        if _default_module_index is None:
+            _default_module_index = ModuleIndex()
+        return _default_module_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show which distributions provide the given import names.")
+    parser.add_argument("modules", nargs="*", help="top-level import names, e.g. yaml PIL sklearn")
+    parser.add_argument("--rebuild", action="store_true", help="rescan installed distributions first")
+    args = parser.parse_args()
+
+    modules = default_module_index()
+    if modules.refresh(force=args.rebuild):
+        print(f"Indexed modules of {len(modules.installed.distributions)} installed distributions.")
+    for module in args.modules:
+        providers = modules.lookup(module)
+        print(f"{module}: {', '.join(providers) if providers else f'unknown (pip would be asked for {module})'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import os
+import re
+import json
+import sqlite3
+import argparse
+import threading
+import pypi_http
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".pipsearch", "index.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS packages (
+    name TEXT PRIMARY KEY,
+    display_name TEXT NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    version TEXT NOT NULL DEFAULT '',
+    requires_python TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS modules (
+    module TEXT NOT NULL,
+    name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (module, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Substring matches come from a trigram full-text index kept in sync with packages by
+# triggers; add_many upserts, so a package keeps its rowid when it is updated
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS packages_fts USING fts5(
+    name, summary, content='packages', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS packages_fts_insert AFTER INSERT ON packages BEGIN
+    INSERT INTO packages_fts (rowid, name, summary) VALUES (new.rowid, new.name, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS packages_fts_delete AFTER DELETE ON packages BEGIN
+    INSERT INTO packages_fts (packages_fts, rowid, name, summary) VALUES ('delete', old.rowid, old.name, old.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS packages_fts_update AFTER UPDATE ON packages BEGIN
+    INSERT INTO packages_fts (packages_fts, rowid, name, summary) VALUES ('delete', old.rowid, old.name, old.summary);
+    INSERT INTO packages_fts (rowid, name, summary) VALUES (new.rowid, new.name, new.summary);
+END;
+"""
+
+MIN_SUBSTRING_LENGTH = 3  # Shorter terms only match name prefixes; trigrams need three characters
+
+
+def normalize_name(name):
+    # PEP 503 normalization, so "Foo_Bar" and "foo-bar" are the same project
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+class PackageIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The GUIs query from worker threads, so the connection is shared behind a lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.fts = self._create_fts()
+
+    def _create_fts(self):
+        # False when this SQLite lacks FTS5 or its trigram tokenizer (before 3.34); search() then scans
+        existed = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'packages_fts'").fetchone()
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            return False
+        if not existed:
+            # An index built before the full-text table existed
+            with self.conn:
+                self.conn.execute("INSERT INTO packages_fts (packages_fts) VALUES ('rebuild')")
+        return True
+
+    def close(self):
+        self.conn.close()
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM packages").fetchone()[0]
+
+    def is_empty(self):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM packages LIMIT 1").fetchone() is None
+
+    def add(self, name, summary="", version="", requires_python=""):
+        self.add_many([(name, summary, version, requires_python)])
+
+    def add_many(self, rows):
+        rows = [
+            (normalize_name(name), name, summary or "", version or "", requires_python or "")
+            for name, summary, version, requires_python in rows
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO packages (name, display_name, summary, version, requires_python) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET display_name = excluded.display_name, "
+                "summary = excluded.summary, version = excluded.version, requires_python = excluded.requires_python",
+                rows,
+            )
+
+    def all_names(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT display_name FROM packages")]
+
+    def get(self, name):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT display_name, summary, version, requires_python FROM packages WHERE name = ?",
+                (normalize_name(name),),
+            ).fetchone()
+        if row is None:
+            return None
+        return self._row_to_dict(row)
+
+    def matches_substrings(self, term):
+        # Whether search(term) returns substring matches too, i.e. a superset of every longer term's results
+        term = term.strip()
+        return not self.fts or min(len(term), len(normalize_name(term))) >= MIN_SUBSTRING_LENGTH
+
+    def search(self, term, limit=100, offset=0):
+        # Exact name first, then name prefix, then name substring, then summary matches.
+        # Only the matching rows are ranked: name prefixes come from the primary key, substrings
+        # from the trigram index, so a keystroke never scans the whole table.
+        term = term.strip()
+        if not term:
+            return []
+        key = normalize_name(term)
+        name_pattern = "%" + escape_like(key) + "%"
+        if not self.fts:
+            candidates = ("SELECT rowid FROM packages WHERE name LIKE ? ESCAPE '\\' OR lower(summary) LIKE ? ESCAPE '\\'",
+                          (name_pattern, "%" + escape_like(term.lower()) + "%"))
+        elif self.matches_substrings(term):
+            candidates = ("SELECT rowid FROM packages_fts WHERE packages_fts MATCH ?",
+                          (f"name : {fts_phrase(key)} OR summary : {fts_phrase(term)}",))
+        else:
+            # The next key after every name starting with key, for a range scan on the primary key
+            candidates = ("SELECT rowid FROM packages WHERE name >= ? AND name < ?", (key, key + "\uffff"))
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT display_name, summary, version, requires_python FROM packages "
+                f"WHERE rowid IN ({candidates[0]}) "
+                "ORDER BY CASE "
+                "  WHEN name = ? THEN 0 "
+                "  WHEN name LIKE ? ESCAPE '\\' THEN 1 "
+                "  WHEN name LIKE ? ESCAPE '\\' THEN 2 "
+                "  ELSE 3 END, length(name), name "
+                "LIMIT ? OFFSET ?",
+                candidates[1] + (key, name_pattern[1:], name_pattern, limit, offset),
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def refine(self, results, term, limit=100):
+        # Same matching and ordering as search(), applied to an earlier, broader result set
+        term = term.strip()
+        lowered = term.lower()
+        key = normalize_name(term)
+        ranked = []
+        for result in results:
+            name = normalize_name(result['name'])
+            if name == key:
+                rank = 0
+            elif name.startswith(key):
+                rank = 1
+            elif key in name:
+                rank = 2
+            elif lowered in result['summary'].lower():
+                rank = 3
+            else:
+                continue
+            ranked.append(((rank, len(name), name), result))
+        ranked.sort(key=lambda item: item[0])
+        return [result for _, result in ranked[:limit]]
+
+    def set_modules(self, source, rows):
+        # Replaces every (module, distribution) row that came from this source
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM modules WHERE source = ?", (source,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO modules (module, name, source) VALUES (?, ?, ?)",
+                [(module, name, source) for module, name in rows],
+            )
+
+    def modules_for(self, module):
+        # Distributions providing a top-level module, as (name, source) pairs
+        with self.lock:
+            return self.conn.execute("SELECT name, source FROM modules WHERE module = ? ORDER BY name",
+                                     (module,)).fetchall()
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _row_to_dict(self, row):
+        display_name, summary, version, requires_python = row
+        return {
+            'name': display_name,
+            'summary': summary,
+            'version': version,
+            'requires_python': requires_python,
+        }
+
+    def build_from_directory(self, directory):
+        # Expects one /pypi/{name}/json document per file, e.g. requests.json
+        rows = []
+        for entry in os.scandir(directory):
+            if not entry.name.endswith(".json") or not entry.is_file():
+                continue
+            with open(entry.path, 'r', encoding='utf-8') as file:
+                try:
+                    data = json.load(file)
+                except ValueError:
+                    print(f"Skipping invalid metadata file {entry.path}")
+                    continue
+            row = metadata_to_row(data)
+            if row:
+                rows.append(row)
+        self.add_many(rows)
+        return len(rows)
+
+    def build_from_simple_index(self, base_url, limit=None):
+        # base_url is the server root: names come from /simple/, metadata from /pypi/{name}/json
+        base_url = base_url.rstrip("/")
+        response = pypi_http.get(f"{base_url}/simple/", headers={'Accept': 'application/vnd.pypi.simple.v1+json'})
+        response.raise_for_status()
+        names = parse_simple_index(response)
+        if limit:
+            names = names[:limit]
+
+        rows = []
+        for name in names:
+            response = pypi_http.get(f"{base_url}/pypi/{name}/json")
+            if response.status_code == 200:
+                row = metadata_to_row(response.json())
+            else:
+                # Still make the name searchable even without metadata
+                row = (name, "", "", "")
+            if row:
+                rows.append(row)
+        self.add_many(rows)
+        return len(rows)
+
+
+def escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def fts_phrase(text):
+    # A string literal for an FTS5 query; with the trigram tokenizer a phrase matches substrings
+    return '"' + text.replace('"', '""') + '"'
+
+
+def metadata_to_row(data):
+    info = data.get('info') or {}
+    name = info.get('name')
+    if not name:
+        return None
+    return (name, info.get('summary') or "", info.get('version') or "", info.get('requires_python') or "")
+
+
+def parse_simple_index(response):
+    if response.headers.get('Content-Type', '').startswith('application/vnd.pypi.simple.v1+json'):
+        return [project['name'] for project in response.json().get('projects', [])]
+    # PEP 503 HTML: one anchor per project
+    return re.findall(r"<a[^>]*>([^<]+)</a>", response.text)
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def default_index():
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = PackageIndex(os.environ.get("PIPSEARCH_INDEX", DEFAULT_INDEX_PATH))
+        return _default_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local package index used by pipsearch.")
+    parser.add_argument("--index", default=os.environ.get("PIPSEARCH_INDEX", DEFAULT_INDEX_PATH),
+                        help="Path of the index database")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-dir", help="Directory of /pypi/{name}/json metadata files")
+    source.add_argument("--from-simple", help="Root URL of a simple-index server")
+    parser.add_argument("--limit", type=int, help="Only index the first N projects from the simple index")
+    args = parser.parse_args()
+
+    index = PackageIndex(args.index)
+    if args.from_dir:
+        added = index.build_from_directory(args.from_dir)
+    else:
+        added = index.build_from_simple_index(args.from_simple, limit=args.limit)
+    print(f"Indexed {added} packages into {args.index} ({index.count()} total).")
+
+
+if __name__ == "__main__":
+    main()
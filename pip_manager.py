@@ -1,14 +1,26 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import pkg_resources
-import subprocess
 import os
 import threading
+from bisect import bisect_left
+from fuzzy_index import FuzzyIndex
+from package_index import normalize_name
+from virtual_list import VirtualListbox
+import dist_scanner
+from ui_dispatch import UIDispatcher
+from pip_runner import PROGRESS, PHASE, UNINSTALLING
+import pipsearch_core as core
+
+POLL_MS = 2000  # How often site-packages is checked for changes made outside the GUI
+
+UNINSTALL = 'uninstall'
+REINSTALL = 'reinstall'
 
 class PipPackageManagerGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Pip Package Manager")
+        self.ui = UIDispatcher(root)  # Worker threads post widget updates here
 
         # Search bar
         self.search_label = tk.Label(root, text="Search for a package:")
@@ -20,16 +32,21 @@ class PipPackageManagerGUI:
         self.search_button = tk.Button(root, text="Search", command=self.search_packages)
         self.search_button.pack(pady=5)
 
-        # Results list
-        self.results_listbox = tk.Listbox(root, width=60, height=15)
-        self.results_listbox.pack(pady=5)
+        # Results list; only the visible rows are handed to Tk
+        self.results_frame = tk.Frame(root)
+        self.results_frame.pack(pady=5)
+        self.results_listbox = VirtualListbox(self.results_frame, width=60, height=15, selectmode=tk.EXTENDED)
+        self.results_listbox.pack(side=tk.LEFT)
+        self.results_scrollbar = tk.Scrollbar(self.results_frame, orient=tk.VERTICAL, command=self.results_listbox.yview)
+        self.results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results_listbox.config(yscrollcommand=self.results_scrollbar.set)
         self.results_listbox.bind('<<ListboxSelect>>', self.display_package_info)
 
         # Action buttons
-        self.uninstall_button = tk.Button(root, text="Uninstall Selected Package", command=self.uninstall_selected_package)
+        self.uninstall_button = tk.Button(root, text="Uninstall Selected Packages", command=self.uninstall_selected_package)
         self.uninstall_button.pack(pady=5)
 
-        self.reinstall_button = tk.Button(root, text="Reinstall Selected Package", command=self.reinstall_selected_package)
+        self.reinstall_button = tk.Button(root, text="Reinstall Selected Packages", command=self.reinstall_selected_package)
         self.reinstall_button.pack(pady=5)
 
         self.open_path_button = tk.Button(root, text="Open Package File Path", command=self.open_package_path)
@@ -47,24 +64,81 @@ class PipPackageManagerGUI:
         self.status_label.pack(fill=tk.X, side=tk.BOTTOM, ipady=2)
 
         self.installed_packages = {}
+        self.installed_set = dist_scanner.InstalledSet()
+        self.listed_keys = []  # Normalized names of the listbox rows, in order, while it shows every package
+        self.showing_all = True
+        self.operations = []  # (action, package names) waiting for pip
+        self.operation_lock = threading.Lock()
+        self.operation_thread = None
         self.load_installed_packages()
+        self.root.after(POLL_MS, self.poll_installed_packages)
 
     def load_installed_packages(self):
-        self.installed_packages = {pkg.project_name: pkg for pkg in pkg_resources.working_set}
+        # Reads each dist-info directly; summary, requirements and files are parsed lazily
+        self.installed_set.refresh(force=True)
+        self.installed_packages = dict(self.installed_set.distributions)
+        self.name_index = FuzzyIndex(self.installed_packages.keys())
         self.update_results_listbox()
 
+    def refresh_installed_packages(self):
+        # Rescans only the directories that changed and patches only the affected rows
+        added, removed, changed = self.installed_set.refresh()
+        if not (added or removed or changed):
+            return added, removed, changed
+        self.installed_packages = dict(self.installed_set.distributions)
+        if added or removed:
+            self.name_index = FuzzyIndex(self.installed_packages.keys())
+
+        if self.showing_all:
+            # Patch rows in place, so the scroll position and selection survive
+            for package_name in removed:
+                key = normalize_name(package_name)
+                position = bisect_left(self.listed_keys, key)
+                if position < len(self.listed_keys) and self.listed_keys[position] == key:
+                    del self.listed_keys[position]
+                    self.results_listbox.delete(position)
+            for package_name in added:
+                key = normalize_name(package_name)
+                position = bisect_left(self.listed_keys, key)
+                self.listed_keys.insert(position, key)
+                self.results_listbox.insert(position, package_name)
+        else:
+            self.results_listbox.set_items(self.matching_packages(self.search_entry.get()))
+        return added, removed, changed
+
+    def poll_installed_packages(self):
+        # Catches installs and uninstalls done outside the GUI; only stats the site-packages directories
+        if self.installed_set.has_changed():
+            added, removed, changed = self.refresh_installed_packages()
+            if added or removed or changed:
+                self.status_label.config(text=f"Package list updated: {len(added)} added, "
+                                              f"{len(removed)} removed, {len(changed)} changed.")
+        self.root.after(POLL_MS, self.poll_installed_packages)
+
     def update_results_listbox(self):
-        self.results_listbox.delete(0, tk.END)
-        for package_name in sorted(self.installed_packages.keys()):
-            self.results_listbox.insert(tk.END, package_name)
+        # The name index is already sorted, so nothing is re-sorted here
+        self.listed_keys = list(self.name_index.keys)
+        self.showing_all = True
+        self.results_listbox.set_items(self.name_index.names)
+
+    def matching_packages(self, search_term):
+        # Names starting with the term come first, then the ones that merely contain it
+        matches = self.name_index.prefix(search_term)
+        starts = set(matches)
+        matches += [package_name for package_name in self.name_index.substring(search_term) if package_name not in starts]
+        if not matches:
+            # Nothing contains the term as typed; fall back to typo-tolerant matches
+            matches = self.name_index.search(search_term)
+        return matches
 
     def search_packages(self):
-        search_term = self.search_entry.get().lower()
-        self.results_listbox.delete(0, tk.END)
+        search_term = self.search_entry.get().strip()
+        if not search_term:
+            self.update_results_listbox()
+            return
 
-        for package_name in sorted(self.installed_packages.keys()):
-            if search_term in package_name.lower():
-                self.results_listbox.insert(tk.END, package_name)
+        self.showing_all = False
+        self.results_listbox.set_items(self.matching_packages(search_term))
 
         if not self.results_listbox.size():
             messagebox.showinfo("No Results", "No packages found matching your search.")
@@ -84,38 +158,87 @@ class PipPackageManagerGUI:
             else:
                 self.package_info_text.insert(tk.END, "Package not found.")
 
-    def uninstall_selected_package(self):
+    def selected_packages(self):
+        selection = self.results_listbox.curselection()
+        if selection:
+            return [self.results_listbox.get(index) for index in selection]
         selected_package = self.results_listbox.get(tk.ACTIVE)
-        if selected_package:
-            self.status_label.config(text=f"Uninstalling {selected_package}...")
-            threading.Thread(target=self.uninstall_package, args=(selected_package,)).start()
+        return [selected_package] if selected_package else []
+
+    def uninstall_selected_package(self):
+        selected_packages = self.selected_packages()
+        if selected_packages:
+            self.status_label.config(text=f"Uninstalling {len(selected_packages)} package(s)...")
+            self.queue_operation(UNINSTALL, selected_packages)
         else:
             messagebox.showwarning("Selection Error", "Please select a package to uninstall.")
 
-    def uninstall_package(self, package_name):
-        command = ["pip", "uninstall", "-y", package_name]
-        try:
-            subprocess.check_call(command)
-            self.status_label.config(text=f"Successfully uninstalled {package_name}.")
-            self.load_installed_packages()  # Refresh the package list
-        except subprocess.CalledProcessError:
-            self.status_label.config(text=f"Failed to uninstall {package_name}.")
-
     def reinstall_selected_package(self):
-        selected_package = self.results_listbox.get(tk.ACTIVE)
-        if selected_package:
-            self.status_label.config(text=f"Reinstalling {selected_package}...")
-            threading.Thread(target=self.reinstall_package, args=(selected_package,)).start()
+        selected_packages = self.selected_packages()
+        if selected_packages:
+            self.status_label.config(text=f"Reinstalling {len(selected_packages)} package(s)...")
+            self.queue_operation(REINSTALL, selected_packages)
         else:
             messagebox.showwarning("Selection Error", "Please select a package to reinstall.")
 
-    def reinstall_package(self, package_name):
-        command = ["pip", "install", "--force-reinstall", package_name]
+    def queue_operation(self, action, package_names):
+        # Requests made while pip is busy wait here and are merged into the next batch
+        with self.operation_lock:
+            self.operations.append((action, package_names))
+            if self.operation_thread is None:
+                self.operation_thread = threading.Thread(target=self.run_operations, daemon=True)
+                self.operation_thread.start()
+
+    def run_operations(self):
         try:
-            subprocess.check_call(command)
-            self.status_label.config(text=f"Successfully reinstalled {package_name}.")
-        except subprocess.CalledProcessError:
-            self.status_label.config(text=f"Failed to reinstall {package_name}.")
+            while True:
+                with self.operation_lock:
+                    if not self.operations:
+                        self.operation_thread = None
+                        break
+                    # Consecutive requests for the same action become one pip run
+                    action = self.operations[0][0]
+                    package_names = []
+                    while self.operations and self.operations[0][0] == action:
+                        for package_name in self.operations.pop(0)[1]:
+                            if package_name not in package_names:
+                                package_names.append(package_name)
+                try:
+                    self.run_operation(action, package_names)
+                except Exception as e:
+                    # One failed batch must not stop the ones queued behind it
+                    self.ui.set_status(self.status_label, f"Failed to {action} {', '.join(package_names)}: {e}")
+        finally:
+            # Even if this thread dies, the next request must be able to start a new one
+            with self.operation_lock:
+                if self.operation_thread is threading.current_thread():
+                    self.operation_thread = None
+            # One rescan for everything that ran, patching only the rows that changed
+            self.ui.post(self.refresh_installed_packages)
+
+    def run_operation(self, action, package_names):
+        verb = "Uninstalling" if action == UNINSTALL else "Reinstalling"
+        finished = set()
+
+        def report(event):
+            # pip announces each existing installation it removes, which gives the batch's progress
+            if event.kind == PHASE and event.phase == UNINSTALLING:
+                finished.add(event.package)
+                self.ui.set_status(self.status_label,
+                                   f"{verb} {len(finished)} of {len(package_names)}: {event.package}")
+            elif event.kind == PROGRESS:
+                self.ui.set_status(self.status_label, event.describe())
+
+        if action == UNINSTALL:
+            run = core.uninstall(package_names, on_event=report)
+        else:
+            run = core.reinstall(package_names, on_event=report)
+
+        done = "uninstalled" if action == UNINSTALL else "reinstalled"
+        if run.returncode == 0:
+            self.ui.set_status(self.status_label, f"Successfully {done} {len(package_names)} package(s).")
+        else:
+            self.ui.set_status(self.status_label, f"Failed to {action} {', '.join(package_names)}: {run.error}")
 
     def open_package_path(self):
         selected_package = self.results_listbox.get(tk.ACTIVE)
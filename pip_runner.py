@@ -0,0 +1,193 @@
+import re
+import sys
+import time
+import threading
+import subprocess
+from collections import deque
+from importlib import metadata
+
+# Phases of a pip run, in the order pip normally goes through them
+COLLECTING = 'collecting'
+DOWNLOADING = 'downloading'
+BUILDING = 'building'
+INSTALLING = 'installing'
+UNINSTALLING = 'uninstalling'
+FINISHED = 'finished'
+
+# Event kinds
+PHASE = 'phase'
+PROGRESS = 'progress'
+LINE = 'line'
+ERROR = 'error'
+
+PROGRESS_INTERVAL = 0.1  # Seconds between progress events for one run
+OUTPUT_TAIL = 200  # Lines of output kept for error reports
+
+_SIZE_UNITS = {'bytes': 1, 'kb': 1000, 'mb': 1000 ** 2, 'gb': 1000 ** 3}
+
+_PATTERNS = [
+    (re.compile(r'^(?:Collecting|Processing) (\S+)'), COLLECTING),
+    (re.compile(r'^\s*Downloading (\S+)(?: \((?P<size>[\d.]+ \w+)\))?'), DOWNLOADING),
+    (re.compile(r'^\s*Building wheel for (\S+)'), BUILDING),  # Not "Building wheels for collected packages:"
+    (re.compile(r'^Installing collected packages: (.+)'), INSTALLING),
+    (re.compile(r'^\s*(?:Found existing installation|Attempting uninstall): (\S+)'), UNINSTALLING),
+    (re.compile(r'^Successfully (?:installed|uninstalled) (.+)'), FINISHED),
+]
+_RAW_PROGRESS = re.compile(r'^Progress (\d+) of (\d+)$')
+
+
+def parse_size(text):
+    # pip prints sizes like "62 kB" or "15.1 MB" (decimal units)
+    number, _, unit = text.partition(' ')
+    return int(float(number) * _SIZE_UNITS.get(unit.lower(), 1))
+
+
+def format_size(size):
+    for unit in ('GB', 'MB', 'kB'):
+        if size >= _SIZE_UNITS[unit.lower()]:
+            return f"{size / _SIZE_UNITS[unit.lower()]:.1f} {unit}"
+    return f"{size} bytes"
+
+
+class PipEvent:
+    def __init__(self, kind, phase=None, package=None, text="", done=None, total=None, rate=None):
+        self.kind = kind
+        self.phase = phase
+        self.package = package
+        self.text = text
+        self.done = done  # Bytes downloaded so far
+        self.total = total  # Bytes expected, when pip knows
+        self.rate = rate  # Bytes per second over the last interval
+
+    def describe(self):
+        if self.kind == PROGRESS:
+            amount = format_size(self.done)
+            if self.total:
+                amount += f" of {format_size(self.total)}"
+            if self.rate:
+                amount += f" ({format_size(int(self.rate))}/s)"
+            return f"Downloading {self.package}: {amount}"
+        return self.text
+
+    def __repr__(self):
+        return f"<PipEvent {self.kind} {self.phase} {self.package}>"
+
+
+def _raw_progress_supported():
+    # pip 24.1 added --progress-bar raw, which prints "Progress <done> of <total>" lines
+    try:
+        major, minor = (int(part) for part in metadata.version('pip').split('.')[:2])
+    except (metadata.PackageNotFoundError, ValueError):
+        return False
+    return (major, minor) >= (24, 1)
+
+
+_progress_option = None
+
+
+def progress_option():
+    global _progress_option
+    if _progress_option is None:
+        _progress_option = ["--progress-bar", "raw"] if _raw_progress_supported() else []
+    return _progress_option
+
+
+class PipRun:
+    # Runs `python -m pip <args>` and turns its output into PipEvents as it is produced.
+    # stdout is read on the calling thread and stderr on a helper thread, so neither pipe
+    # can fill up and stall pip. Phase changes, errors and every output line are delivered
+    # straight away; download progress at most once per PROGRESS_INTERVAL.
+    def __init__(self, args, on_event=None):
+        self.args = list(args)
+        self.on_event = on_event
+        self.process = None
+        self.returncode = None
+        self.output = deque(maxlen=OUTPUT_TAIL)
+        self.error = None
+        self.phase = None
+        self.package = None
+        self.lock = threading.Lock()
+        self.last_progress = 0.0
+        self.last_done = 0
+        self.last_time = None
+
+    def command(self):
+        command = [sys.executable, "-m", "pip"] + self.args
+        if self.args and self.args[0] in ('install', 'download', 'wheel'):
+            command.extend(progress_option())
+        return command
+
+    def start(self):
+        self.process = subprocess.Popen(self.command(), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        text=True, bufsize=1)
+        return self
+
+    def wait(self):
+        if self.process is None:
+            self.start()
+        stderr_reader = threading.Thread(target=self._read, args=(self.process.stderr, True), daemon=True)
+        stderr_reader.start()
+        self._read(self.process.stdout, False)
+        stderr_reader.join()
+        self.returncode = self.process.wait()
+        if self.returncode == 0:
+            self._emit(PipEvent(PHASE, FINISHED, self.package, "pip finished"))
+        elif self.error is None:
+            self.error = self.output[-1] if self.output else f"pip exited with {self.returncode}"
+        return self.returncode
+
+    def terminate(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+    def _read(self, stream, is_stderr):
+        for line in iter(stream.readline, ''):
+            self._handle(line.strip(), is_stderr)
+        stream.close()
+
+    def _handle(self, line, is_stderr):
+        if not line:
+            return
+        match = _RAW_PROGRESS.match(line)
+        if match:
+            self._progress(int(match.group(1)), int(match.group(2)))
+            return
+
+        with self.lock:
+            self.output.append(line)
+        if line.startswith("ERROR:"):
+            self.error = line[len("ERROR:"):].strip()
+            self._emit(PipEvent(ERROR, self.phase, self.package, line))
+            return
+        if not is_stderr:
+            for pattern, phase in _PATTERNS:
+                match = pattern.match(line)
+                if match:
+                    self.phase, self.package = phase, match.group(1)
+                    size = match.groupdict().get('size')
+                    total = parse_size(size) if size else None
+                    self.last_done, self.last_time = 0, time.monotonic()
+                    self._emit(PipEvent(PHASE, phase, self.package, line, total=total))
+                    return
+        self._emit(PipEvent(LINE, self.phase, self.package, line))
+
+    def _progress(self, done, total):
+        now = time.monotonic()
+        if done != total and now - self.last_progress < PROGRESS_INTERVAL:
+            return
+        rate = None
+        if self.last_time is not None and now > self.last_time:
+            rate = (done - self.last_done) / (now - self.last_time)
+        self.last_progress = self.last_time = now
+        self.last_done = done
+        self._emit(PipEvent(PROGRESS, DOWNLOADING, self.package, done=done, total=total or None, rate=rate))
+
+    def _emit(self, event):
+        if self.on_event is not None:
+            self.on_event(event)
+
+
+def run_pip(args, on_event=None):
+    run = PipRun(args, on_event)
+    run.wait()
+    return run
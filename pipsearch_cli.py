@@ -0,0 +1,228 @@
+import sys
+import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pipsearch_core as core
+from batch_fetch import BatchFetcher
+from install_scheduler import DONE, FAILED
+from lockfile import DEFAULT_LOCK_NAME
+from package_index import normalize_name
+
+# Headless front end over pipsearch_core for CI and build servers. Package names come from
+# the command line, a file or stdin, are processed concurrently, and every result is written
+# as one JSON object per line, in completion order. Diagnostics go to stderr.
+
+DEFAULT_JOBS = 16
+
+_output = sys.stdout
+_output_lock = threading.Lock()
+
+
+def emit(record):
+    line = json.dumps(record, default=str)
+    with _output_lock:
+        _output.write(line + "\n")
+        _output.flush()
+
+
+def read_names(args):
+    if args.names:
+        lines = args.names
+    elif args.file:
+        with open(args.file, 'r', encoding='utf-8') as file:
+            lines = file.read().splitlines()
+    else:
+        lines = sys.stdin.read().splitlines()
+    # One name or requirement per line; blank lines and comments are skipped like in requirements files
+    names = (line.split('#', 1)[0].strip() for line in lines)
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def metadata_records(names, args, describe):
+    # Metadata is fetched concurrently on the batch fetcher's event loop; each record is
+    # built as soon as its package arrives
+    failures = 0
+    fetcher = BatchFetcher(concurrency=args.jobs)
+    try:
+        for name, metadata in fetcher.fetch_batch(names):
+            if metadata is None:
+                failures += 1
+                emit({'name': name, 'error': "not found"})
+                continue
+            try:
+                emit(describe(name, metadata))
+            except Exception as e:
+                failures += 1
+                emit({'name': name, 'error': str(e)})
+    finally:
+        fetcher.close()
+    return failures
+
+
+def threaded_records(names, args, describe):
+    failures = 0
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {executor.submit(describe, name): name for name in names}
+        for future in as_completed(futures):
+            try:
+                emit(future.result())
+            except Exception as e:
+                failures += 1
+                emit({'name': futures[future], 'error': str(e)})
+    return failures
+
+
+def run_info(names, args):
+    def describe(name, metadata):
+        return core.package_info(name, args.python_version, metadata)
+    return metadata_records(names, args, describe)
+
+
+def run_versions(names, args):
+    def describe(name, metadata):
+        versions, preferred = core.available_versions(name, args.python_version, metadata)
+        return {'name': name, 'preferred_version': preferred, 'versions': versions}
+    return metadata_records(names, args, describe)
+
+
+def run_deps(names, args):
+    def describe(name, metadata):
+        return {'name': name, 'requires_dist': core.dependencies(name, metadata)}
+    return metadata_records(names, args, describe)
+
+
+def run_search(names, args):
+    def describe(term):
+        return {'query': term, 'results': core.search(term, args.python_version, limit=args.limit)}
+    return threaded_records(names, args, describe)
+
+
+def run_resolve(names, args):
+    def describe(requirement):
+        resolution = core.resolve(requirement, args.python_version)
+        return {
+            'name': requirement,
+            'pins': resolution.pins,
+            'conflicts': [conflict_record(conflict) for conflict in resolution.conflicts],
+            'missing': [str(dependency) for dependency in resolution.missing],
+        }
+    return threaded_records(names, args, describe)
+
+
+def conflict_record(conflict):
+    dependency, parent, pinned = conflict
+    return {'requirement': str(dependency), 'parent': str(parent), 'pinned': str(pinned)}
+
+
+def run_lock(names, args):
+    # Nothing is written unless every requirement resolved to a release file
+    lock, missing, conflicts = core.lock(names, args.python_version)
+    for pin in missing:
+        emit({'name': pin, 'error': "no compatible release file"})
+    for conflict in conflicts:
+        emit(dict(conflict_record(conflict), error="conflict"))
+    if lock is None:
+        return len(missing) + len(conflicts)
+    for package in lock.packages:
+        emit(package)
+    lock.save(args.output)
+    return 0
+
+
+def run_install(names, args):
+    if args.lock:
+        # Straight from the lockfile: no resolution, no metadata requests
+        try:
+            error = core.install_lock(args.lock, args.target or "")
+        except (OSError, ValueError, KeyError) as e:
+            error = f"unreadable lockfile: {e}"
+        emit({'lock': args.lock, 'status': DONE if error is None else FAILED, 'error': error})
+        return 0 if error is None else 1
+
+    def report(job):
+        record = {'name': job.requirement, 'job': job.id, 'status': job.status}
+        if job.error:
+            record['error'] = job.error
+        emit(record)
+
+    jobs = core.install(names, args.target or "", on_progress=report, max_workers=args.jobs)
+    return sum(1 for job in jobs if job.status != DONE)
+
+
+def run_download(names, args):
+    if not args.dest:
+        emit({'error': "download needs --dest"})
+        return 1
+    jobs, missing, conflicts = core.download(names, args.dest, args.python_version, max_workers=args.jobs)
+    for pin in missing:
+        emit({'name': pin, 'error': "no compatible release file"})
+    for conflict in conflicts:
+        emit(dict(conflict_record(conflict), error="conflict"))
+    for job in jobs:
+        record = {'file': job.file.filename, 'status': job.status, 'path': job.path, 'bytes': job.done}
+        if job.resumed_from:
+            record['resumed_from'] = job.resumed_from
+        if job.error:
+            record['error'] = job.error
+        emit(record)
+    return len(missing) + len(conflicts) + sum(1 for job in jobs if job.status != DONE)
+
+
+def run_installed(names, args):
+    installed = core.installed_distributions()
+    wanted = {normalize_name(name) for name in names}
+    for distribution in sorted(installed.values(), key=lambda distribution: distribution.key):
+        if not wanted or distribution.key in wanted:
+            emit({'name': distribution.project_name, 'version': distribution.version,
+                  'location': distribution.location})
+    return 0
+
+
+COMMANDS = {
+    'info': (run_info, "metadata, versions and dependencies of each package"),
+    'versions': (run_versions, "versions installable on --python-version, newest first"),
+    'deps': (run_deps, "requirements declared by the latest release"),
+    'search': (run_search, "search the local index (or PyPI) for each term"),
+    'resolve': (run_resolve, "resolve each requirement to a full set of pins"),
+    'lock': (run_lock, "resolve the requirements and write every pinned file with its sha256 to --output"),
+    'install': (run_install, "install every requirement, reporting each job state change, or everything in --lock"),
+    'download': (run_download, "download the release files of the resolved requirements into --dest"),
+    'installed': (run_installed, "list installed distributions (all of them when no names are given)"),
+}
+
+
+def main():
+    global _output
+    parser = argparse.ArgumentParser(description="Query PyPI and install packages without the GUI. "
+                                                 "Prints one JSON object per line.")
+    parser.add_argument("command", choices=COMMANDS,
+                        help="; ".join(f"{name}: {help_text}" for name, (_, help_text) in COMMANDS.items()))
+    parser.add_argument("names", nargs="*", help="package names or requirements; read from --file or stdin when omitted")
+    parser.add_argument("--file", help="read names from this file, one per line")
+    parser.add_argument("--python-version", default="Any", help="target Python version, e.g. 3.9 (default: Any)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="concurrent requests or pip processes")
+    parser.add_argument("--limit", type=int, default=core.SEARCH_LIMIT, help="results per search term")
+    parser.add_argument("--target", help="install into this directory instead of the current environment")
+    parser.add_argument("--dest", help="directory the download command saves files to")
+    parser.add_argument("--output", default=DEFAULT_LOCK_NAME, help=f"lockfile the lock command writes (default: {DEFAULT_LOCK_NAME})")
+    parser.add_argument("--lock", help="install the files listed in this lockfile instead of resolving names")
+    args = parser.parse_args()
+    args.jobs = max(1, args.jobs)
+
+    run, _ = COMMANDS[args.command]
+    if (args.command == 'installed' and not args.names and not args.file) or (args.command == 'install' and args.lock):
+        names = []
+    else:
+        names = read_names(args)
+    # The library reports problems with print(); keep stdout for the JSON records
+    _output, sys.stdout = sys.stdout, sys.stderr
+    try:
+        failures = run(names, args)
+    finally:
+        sys.stdout = _output
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
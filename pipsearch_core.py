@@ -0,0 +1,204 @@
+import sys
+import threading
+import pypi_http
+from package_index import default_index
+from compat import filter_search_results, table_for, best_release_file, format_python_version
+from fuzzy_index import default_fuzzy_index
+from search_stream import SearchStream
+from metadata_cache import default_cache
+from batch_fetch import default_fetcher
+from install_scheduler import InstallScheduler
+from resolver import resolver_for
+from version_index import index_for
+from pip_runner import run_pip
+from wheelhouse import default_wheelhouse, only_wheels
+from downloader import Downloader, ReleaseFile
+from lockfile import Lockfile, install_locked
+import dist_scanner
+
+# Everything the GUIs and pipsearch_cli.py can do, without tkinter. Functions return plain
+# data (dicts, lists, None when PyPI has nothing) and are safe to call from any thread.
+
+FUZZY_MIN_RESULTS = 5  # Below this many direct hits, add typo-tolerant suggestions
+SEARCH_LIMIT = 100  # Rows fetched from the local index per search
+
+
+def local_search(search_term, python_version="Any", index=None, prefix_cache=None, limit=SEARCH_LIMIT):
+    # Served from the on-disk index built by package_index.py, no network needed.
+    # Returns (results, stream); stream is None once every match has been returned.
+    index = index or default_index()
+    previous = prefix_cache.candidates(search_term) if prefix_cache is not None else None
+    if previous is not None:
+        # The term only grew, so narrow the last complete result set instead of querying
+        stream = None
+        results = index.refine(previous, search_term, limit=limit)
+    else:
+        stream = SearchStream(search_term, index=index, page_size=limit)
+        results = stream.next_page()
+    complete = stream is None or stream.exhausted
+    if prefix_cache is not None:
+        # A prefix-only result set for a short term cannot be narrowed to a longer term's results
+        prefix_cache.remember(search_term, list(results), complete and index.matches_substrings(search_term))
+
+    if len(results) < FUZZY_MIN_RESULTS:
+        # Probably a typo; fill up with the closest names ("beautifulsop" -> "beautifulsoup4")
+        seen = {result['name'] for result in results}
+        for package_name in default_fuzzy_index().search(search_term):
+            suggestion = index.get(package_name)
+            if suggestion and suggestion['name'] not in seen:
+                results.append(suggestion)
+    return filter_search_results(results, python_version), None if complete else stream
+
+
+def search(search_term, python_version="Any", limit=SEARCH_LIMIT):
+    # Local index when one has been built, PyPI's search pages otherwise
+    index = default_index()
+    if not index.is_empty():
+        return local_search(search_term, python_version, index, limit=limit)[0]
+    stream = SearchStream(search_term)
+    results = []
+    while len(results) < limit and not stream.exhausted:
+        results.extend(filter_search_results(stream.next_page(), python_version))
+    return results[:limit]
+
+
+def package_metadata(package_name):
+    return default_cache().get_package_json(package_name)
+
+
+def dependencies(package_name, metadata=None):
+    # requires_dist of the latest release; None when the package could not be fetched
+    metadata = metadata or package_metadata(package_name)
+    if metadata is None:
+        return None
+    return metadata.get('info', {}).get('requires_dist') or []
+
+
+def available_versions(package_name, python_version="Any", metadata=None):
+    # (versions installable on python_version newest first, preferred version), or None
+    metadata = metadata or package_metadata(package_name)
+    if metadata is None:
+        return None
+    index = index_for(package_name, metadata)  # Parsed once per package, PEP 440 ordering
+    versions = table_for(package_name, metadata).filter_versions(index.newest_first(), python_version)
+    if not versions:
+        return [], None
+    # Prefer the newest stable release over a pre-release
+    stable = index.latest_stable()
+    return versions, stable if stable in versions else versions[0]
+
+
+def package_info(package_name, python_version="Any", metadata=None):
+    metadata = metadata or package_metadata(package_name)
+    if metadata is None:
+        return None
+    info = metadata.get('info', {})
+    versions, preferred = available_versions(package_name, python_version, metadata)
+    return {
+        'name': info.get('name') or package_name,
+        'version': info.get('version'),
+        'summary': info.get('summary') or "",
+        'url': info.get('package_url') or f"https://pypi.org/project/{package_name}/",
+        'requires_python': info.get('requires_python'),
+        'preferred_version': preferred,
+        'versions': versions,
+        'requires_dist': dependencies(package_name, metadata),
+    }
+
+
+def resolve(requirements, python_version="Any"):
+    # "Any" resolves for the running interpreter
+    if isinstance(requirements, str):
+        requirements = [requirements]
+    python_version = format_python_version(python_version)
+    return resolver_for(None if python_version == "Any" else python_version).resolve(list(requirements))
+
+
+def install(requirements, target="", on_progress=None, on_event=None, max_workers=2):
+    # Blocks until every requirement has been installed, failed or been cancelled
+    scheduler = InstallScheduler(max_workers=max_workers, on_progress=on_progress, on_event=on_event,
+                                 wheelhouse=default_wheelhouse())
+    jobs = [scheduler.submit(requirement, target) for requirement in requirements]
+    scheduler.wait()
+    return jobs
+
+
+def release_files(requirements, python_version="Any"):
+    # The file pip would download for every pin of the resolved requirements.
+    # Returns (ReleaseFiles, missing, conflicts): missing are the requirements the resolver found
+    # no release for plus the pins nothing suitable was found for, conflicts are the resolver's
+    # (requirement, parent, pinned version). Either one means the files are not the full set.
+    resolution = resolve(requirements, python_version)
+    pins = resolution.pins
+    metadata = dict(default_fetcher().fetch_batch(pins))
+    files, missing = [], list(resolution.missing)
+    for name, version in sorted(pins.items()):
+        releases = (metadata.get(name) or {}).get('releases', {})
+        best = best_release_file(releases.get(version, []), python_version)
+        if best is None:
+            missing.append(f"{name}=={version}")
+        else:
+            files.append(ReleaseFile.from_pypi(best, f"{pypi_http.PYPI_URL}/pypi/{name}/json", name, version))
+    return files, missing, resolution.conflicts
+
+
+def download(requirements, directory, python_version="Any", on_event=None, max_workers=4):
+    # Downloads the resolved requirement set into directory; returns (DownloadJobs, missing,
+    # conflicts) as release_files does. Nothing is downloaded unless the resolution is complete.
+    files, missing, conflicts = release_files(requirements, python_version)
+    if missing or conflicts:
+        return [], missing, conflicts
+    downloader = Downloader(max_workers=max_workers, wheelhouse=default_wheelhouse(), on_event=on_event)
+    return downloader.download_all(files, directory), missing, conflicts
+
+
+def lock(requirements, python_version="Any"):
+    # Resolves once and records the chosen file of every pin; returns (Lockfile, missing, conflicts)
+    # as release_files does. The Lockfile is None unless the resolution is complete: a lock that
+    # silently lacks a package would install a broken environment every time.
+    if isinstance(requirements, str):
+        requirements = [requirements]
+    files, missing, conflicts = release_files(requirements, python_version)
+    if missing or conflicts:
+        return None, missing, conflicts
+    python_version = format_python_version(python_version)
+    if python_version == "Any":
+        python_version = f"{sys.version_info[0]}.{sys.version_info[1]}"  # The files were chosen for this one
+    return Lockfile.from_files(requirements, python_version, files), missing, conflicts
+
+
+def install_lock(path, target="", on_event=None):
+    # No resolution and no metadata requests: only files missing from the wheelhouse are fetched
+    return install_locked(Lockfile.load(path), target, on_event=on_event, wheelhouse=default_wheelhouse())
+
+
+def uninstall(package_names, on_event=None):
+    return run_pip(["uninstall", "-y"] + list(package_names), on_event=on_event)
+
+
+def reinstall(package_names, on_event=None):
+    # Only files missing from the wheelhouse are downloaded; the reinstall itself is offline
+    # unless a source distribution has to be built
+    wheelhouse = default_wheelhouse()
+    run, paths = wheelhouse.download(package_names, on_event=on_event)
+    if run.returncode != 0:
+        return run
+    try:
+        return run_pip(wheelhouse.install_args(package_names, offline=only_wheels(paths)) + ["--force-reinstall"],
+                       on_event=on_event)
+    finally:
+        wheelhouse.release(paths)
+
+
+_installed = None
+_installed_lock = threading.Lock()
+
+
+def installed_distributions():
+    # {project name: InstalledDistribution}, rescanning only site-packages directories that changed
+    global _installed
+    with _installed_lock:
+        if _installed is None:
+            _installed = dist_scanner.InstalledSet()
+        _installed.refresh()
+        return dict(_installed.distributions)
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import requests
+import pypi_http
+from compat import table_for, parse_python_version
 import subprocess
 import threading
 import os
@@ -61,14 +62,18 @@ class PipSearchGUI:
 
     def perform_search(self, search_term, python_version):
         # Use the PyPI API to search for packages
-        url = f"https://pypi.org/pypi/{search_term}/json"
-        response = requests.get(url)
+        url = f"{pypi_http.PYPI_URL}/pypi/{search_term}/json"
+        response = pypi_http.get(url)
 
         self.results_listbox.delete(0, tk.END)
 
         if response.status_code == 200:
             package_data = response.json()
             package_name = package_data['info']['name']
+            # Only list the package if some release installs on the chosen Python
+            if parse_python_version(python_version) and not table_for(package_name, package_data).installable(python_version):
+                self.status_label.config(text=f"{package_name} has no release for Python {python_version}.")
+                return
             self.results_listbox.insert(tk.END, package_name)
             self.status_label.config(text=f"Found {package_name}.")
         else:
@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import requests
+import pypi_http
+from package_index import default_index
+from compat import filter_search_results
+from ui_dispatch import UIDispatcher
 import subprocess
 import threading
 import os
@@ -9,6 +12,7 @@ class PipSearchGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Pip Package Search Engine")
+        self.ui = UIDispatcher(root)  # Worker threads post widget updates here
 
         # Search bar
         self.search_label = tk.Label(root, text="Search for a package:")
@@ -76,11 +80,16 @@ class PipSearchGUI:
             messagebox.showwarning("Input Error", "Please enter a package name.")
 
     def perform_search(self, search_term, python_version):
+        index = default_index()
+        if not index.is_empty():
+            self.perform_local_search(index, search_term, python_version)
+            return
+
         # Use the PyPI API to search for packages containing or similar to the search term
-        url = f"https://pypi.org/pypi?%3Aaction=search&term={search_term}&submit=search"
-        response = requests.get(url)
+        url = f"{pypi_http.PYPI_URL}/pypi?%3Aaction=search&term={search_term}&submit=search"
+        response = pypi_http.get(url)
 
-        self.results_listbox.delete(0, tk.END)
+        self.ui.post(self.results_listbox.delete, 0, tk.END)
 
         if response.status_code == 200:
             # Parse the HTML response to extract package names (requires BeautifulSoup)
@@ -95,16 +104,36 @@ class PipSearchGUI:
                 summary_element = project.find('span', class_='package-snippet__description')
                 summary = summary_element.text.strip() if summary_element else "No summary available"
 
-                self.results_listbox.insert(tk.END, package_name)
+                self.ui.insert(self.results_listbox, package_name)
                 self.package_data[package_name] = {
                     'url': project['href'],
                     'summary': summary
                 }
 
-            self.status_label.config(text=f"Found {len(search_results)} packages.")
+            self.ui.set_status(self.status_label, f"Found {len(search_results)} packages.")
         else:
-            self.status_label.config(text="No package found.")
-
+            self.ui.set_status(self.status_label, "No package found.")
+
+
+    def perform_local_search(self, index, search_term, python_version):
+        # Served from the on-disk index built by package_index.py, no network needed
+        results = filter_search_results(index.search(search_term), python_version)
+
+        self.ui.post(self.results_listbox.delete, 0, tk.END)
+        for result in results:
+            package_name = result['name']
+            self.ui.insert(self.results_listbox, package_name)
+            self.package_data[package_name] = {
+                'url': f"https://pypi.org/project/{package_name}/",
+                'summary': result['summary'] or "No summary available",
+                'version': result['version'],
+                'requires_python': result['requires_python']
+            }
+
+        if results:
+            self.ui.set_status(self.status_label, f"Found {len(results)} packages.")
+        else:
+            self.ui.set_status(self.status_label, "No package found.")
 
     def select_directory(self):
         self.download_dir = filedialog.askdirectory()
@@ -131,10 +160,11 @@ class PipSearchGUI:
         
         try:
             subprocess.check_call(command)
-            self.status_label.config(text=f"Successfully installed {package_name}")
-            self.fetch_dependencies(package_name)  # Fetch dependencies after installation
+            self.ui.set_status(self.status_label, f"Successfully installed {package_name}")
+            # Still on the install thread, so the request does not block Tk
+            self.fetch_dependencies(package_name.split('==')[0])
         except subprocess.CalledProcessError:
-            self.status_label.config(text=f"Failed to install {package_name}")
+            self.ui.set_status(self.status_label, f"Failed to install {package_name}")
 
 
     def display_package_info(self, event):
@@ -156,8 +186,8 @@ class PipSearchGUI:
 
     def fetch_package_details(self, package_name):
         # Use PyPI API to fetch detailed info about the selected package
-        url = f"https://pypi.org/pypi/{package_name}/json"
-        response = requests.get(url)
+        url = f"{pypi_http.PYPI_URL}/pypi/{package_name}/json"
+        response = pypi_http.get(url)
 
         if response.status_code == 200:
             package_info = response.json().get('info', {})
@@ -171,12 +201,17 @@ class PipSearchGUI:
             self.package_info_text.insert(tk.END, "Error fetching package details.")
 
     def fetch_dependencies(self, package_name):
-        # Fetch dependencies for the installed package
-        url = f"https://pypi.org/pypi/{package_name}/json"
-        response = requests.get(url)
+        # Fetch dependencies for the installed package; blocks, so call it from a worker thread
+        url = f"{pypi_http.PYPI_URL}/pypi/{package_name}/json"
+        response = pypi_http.get(url)
 
+        dependencies = None
         if response.status_code == 200:
-            dependencies = response.json().get('info', {}).get('requires_dist', [])
+            dependencies = response.json().get('info', {}).get('requires_dist') or []
+        self.ui.post(self.show_dependencies, dependencies)
+
+    def show_dependencies(self, dependencies):
+        if dependencies is not None:
             self.dependencies_text.delete(1.0, tk.END)
 
             if dependencies:
@@ -1,15 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import requests
+import pypi_http
+from package_index import default_index
+from compat import filter_search_results
+from ui_dispatch import UIDispatcher
+import pipsearch_core as core
+from import_scanner import scan_file
 import subprocess
 import threading
 from bs4 import BeautifulSoup
-import ast
 
 class PipSearchGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Pip Package Search Engine")
+        self.ui = UIDispatcher(root)  # Worker threads post widget updates here
 
         # Search bar
         self.search_label = tk.Label(root, text="Search for a package:")
@@ -89,10 +94,15 @@ class PipSearchGUI:
             messagebox.showwarning("Input Error", "Please enter a package name.")
 
     def perform_search(self, search_term, python_version):
-        url = f"https://pypi.org/pypi?%3Aaction=search&term={search_term}&submit=search"
-        response = requests.get(url)
+        index = default_index()
+        if not index.is_empty():
+            self.perform_local_search(index, search_term, python_version)
+            return
 
-        self.results_listbox.delete(0, tk.END)
+        url = f"{pypi_http.PYPI_URL}/pypi?%3Aaction=search&term={search_term}&submit=search"
+        response = pypi_http.get(url)
+
+        self.ui.post(self.results_listbox.delete, 0, tk.END)
 
         if response.status_code == 200:
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -103,15 +113,35 @@ class PipSearchGUI:
                 summary_element = project.find('span', class_='package-snippet__description')
                 summary = summary_element.text.strip() if summary_element else "No summary available"
 
-                self.results_listbox.insert(tk.END, package_name)
+                self.ui.insert(self.results_listbox, package_name)
                 self.package_data[package_name] = {
                     'url': project['href'],
                     'summary': summary
                 }
 
-            self.status_label.config(text=f"Found {len(search_results)} packages.")
+            self.ui.set_status(self.status_label, f"Found {len(search_results)} packages.")
+        else:
+            self.ui.set_status(self.status_label, "No package found.")
+
+    def perform_local_search(self, index, search_term, python_version):
+        # Served from the on-disk index built by package_index.py, no network needed
+        results = filter_search_results(index.search(search_term), python_version)
+
+        self.ui.post(self.results_listbox.delete, 0, tk.END)
+        for result in results:
+            package_name = result['name']
+            self.ui.insert(self.results_listbox, package_name)
+            self.package_data[package_name] = {
+                'url': f"https://pypi.org/project/{package_name}/",
+                'summary': result['summary'] or "No summary available",
+                'version': result['version'],
+                'requires_python': result['requires_python']
+            }
+
+        if results:
+            self.ui.set_status(self.status_label, f"Found {len(results)} packages.")
         else:
-            self.status_label.config(text="No package found.")
+            self.ui.set_status(self.status_label, "No package found.")
 
     def select_directory(self):
         self.download_dir = filedialog.askdirectory()
@@ -127,18 +157,8 @@ class PipSearchGUI:
                 self.dependencies_listbox.insert(tk.END, dep)
 
     def get_imports(self, file_path):
-        with open(file_path, 'r') as file:
-            node = ast.parse(file.read(), filename=file_path)
-            imports = set()
-            for n in ast.walk(node):
-                if isinstance(n, ast.Import):
-                    for alias in n.names:
-                        imports.add(alias.name)  # Use 'name' instead of 'id'
-                elif isinstance(n, ast.ImportFrom):
-                    imports.add(n.module)  # Add the module name for 'from ... import ...'
-                    for alias in n.names:
-                        imports.add(alias.name)  # Use 'name' instead of 'id'
-            return imports
+        # Third-party top-level imports only; stdlib, relative and sibling-module imports are dropped
+        return scan_file(file_path)
 
     def install_selected_package(self):
         selected_package = self.results_listbox.get(tk.ACTIVE)
@@ -164,10 +184,11 @@ class PipSearchGUI:
 
         try:
             subprocess.check_call(command)
-            self.status_label.config(text=f"Successfully installed {package_name}")
-            self.fetch_dependencies(package_name)
+            self.ui.set_status(self.status_label, f"Successfully installed {package_name}")
+            # Still on the install thread, so the request does not block Tk
+            self.fetch_dependencies(package_name.split('==')[0])
         except subprocess.CalledProcessError:
-            self.status_label.config(text=f"Failed to install {package_name}")
+            self.ui.set_status(self.status_label, f"Failed to install {package_name}")
 
     def display_package_info(self, event):
         selection = event.widget.curselection()
@@ -184,23 +205,21 @@ class PipSearchGUI:
             self.fetch_available_versions(package_name)
 
     def fetch_available_versions(self, package_name):
-        url = f"https://pypi.org/pypi/{package_name}/json"
-        response = requests.get(url)
+        available = core.available_versions(package_name, self.python_version_combobox.get())
 
-        if response.status_code == 200:
-            versions = response.json().get('releases', {}).keys()
-            self.version_combobox['values'] = sorted(versions)
+        if available is not None:
+            self.version_combobox['values'] = available[0]  # Newest first
             self.version_combobox.set("")  # Reset the selection
         else:
             self.version_combobox['values'] = []
             messagebox.showerror("Error", "Could not fetch available versions.")
 
     def fetch_dependencies(self, package_name):
-        url = f"https://pypi.org/pypi/{package_name}/json"
-        response = requests.get(url)
+        # Blocks on PyPI, so call it from a worker thread; only the listbox update runs on Tk
+        self.ui.post(self.show_dependencies, core.dependencies(package_name))
 
-        if response.status_code == 200:
-            dependencies = response.json().get('info', {}).get('requires_dist', [])
+    def show_dependencies(self, dependencies):
+        if dependencies is not None:
             self.dependencies_listbox.delete(0, tk.END)
             for dep in dependencies:
                 self.dependencies_listbox.insert(tk.END, dep)
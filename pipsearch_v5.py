@@ -1,35 +1,40 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import requests
-import subprocess
+from package_index import default_index, normalize_name
+from compat import filter_search_results
+from fuzzy_index import default_fuzzy_index
+from live_search import LatestSearchRunner, PrefixResultCache
+from search_stream import SearchStream
+from batch_fetch import default_fetcher
+from install_scheduler import InstallScheduler, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+from wheelhouse import default_wheelhouse
+from lockfile import DEFAULT_LOCK_NAME
+import pipsearch_core as core
+from ui_dispatch import UIDispatcher
+from console_sink import ConsoleSink
+from pip_runner import PROGRESS, PHASE, LINE
+from import_scanner import scan_file, scan_project
+from module_index import default_module_index
 import threading
-from bs4 import BeautifulSoup
-import ast
 import sys
 import io
 
-class OutputRedirector:
-    def __init__(self, text_widget):
-        self.text_widget = text_widget
-
-    def write(self, message):
-        self.text_widget.config(state=tk.NORMAL)  # Enable the widget for writing
-        self.text_widget.insert(tk.END, message)
-        self.text_widget.see(tk.END)  # Scroll to the end
-        self.text_widget.config(state=tk.DISABLED)  # Disable it again
-
-    def flush(self):
-        pass  # Needed for Python 3 compatibility
+INSTALLED_COLOR = "dark green"  # Search results installed during this session
+PREFETCH_TOP_N = 20  # Search results whose metadata is fetched before anyone clicks
+PREFETCH_NEIGHBOURS = 5  # Rows around the selection that are warmed as well
+SEARCH_DEBOUNCE_MS = 250  # Quiet time after the last keystroke before searching
+LOAD_MORE_THRESHOLD = 0.9  # Fetch the next page once the view reaches this far down the list
 
 class PipSearchGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Pip Package Search Engine")
+        self.ui = UIDispatcher(root)  # Worker threads post widget updates here
 
         # Redirect output
         self.output_text = tk.Text(root, height=10, wrap='word', state=tk.NORMAL)
         self.output_text.grid(row=0, column=0, columnspan=4, padx=10, pady=5, sticky='nsew')
-        sys.stdout = OutputRedirector(self.output_text)
+        sys.stdout = ConsoleSink(self.output_text)  # Buffered; safe to print from any thread
 
         # Make console output read-only
         self.output_text.config(state=tk.DISABLED)
@@ -46,6 +51,7 @@ class PipSearchGUI:
 
         self.search_entry = tk.Entry(root, width=40)
         self.search_entry.grid(row=1, column=1, padx=5, pady=5)
+        self.search_entry.bind('<KeyRelease>', self.on_search_key)
 
         self.search_button = tk.Button(root, text="Search", command=self.search_packages)
         self.search_button.grid(row=1, column=2, padx=5, pady=5)
@@ -61,7 +67,12 @@ class PipSearchGUI:
         # Results list
         self.results_listbox = tk.Listbox(root, width=60, height=10)
         self.results_listbox.grid(row=3, column=0, columnspan=3, padx=10, pady=5, sticky='ew')
+        self.results_scrollbar = tk.Scrollbar(root, orient=tk.VERTICAL, command=self.results_listbox.yview)
+        self.results_scrollbar.grid(row=3, column=3, pady=5, sticky='nsw')
+        self.results_listbox.config(yscrollcommand=self.on_results_scrolled)
         self.results_listbox.bind('<<ListboxSelect>>', self.display_package_info)
+        for scroll_event in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.results_listbox.bind(scroll_event, lambda event: self.root.after_idle(self.prefetch_visible))
 
         # Version selection
         self.version_label = tk.Label(root, text="Select version (optional):")
@@ -74,10 +85,29 @@ class PipSearchGUI:
         self.install_button = tk.Button(root, text="Install Selected Package", command=self.install_selected_package)
         self.install_button.grid(row=4, column=2, padx=5, pady=5)
 
+        # Button to download the release files of the selected package and its dependencies
+        self.download_button = tk.Button(root, text="Download Files", command=self.download_selected_package)
+        self.download_button.grid(row=4, column=3, padx=5, pady=5)
+
         # Install all dependencies button
         self.install_all_button = tk.Button(root, text="Install All Dependencies", command=self.install_all_dependencies)
         self.install_all_button.grid(row=5, column=2, padx=5, pady=5)
 
+        # Resolve the full dependency tree of the selected package
+        self.resolve_button = tk.Button(root, text="Resolve Dependency Tree", command=self.resolve_selected_package)
+        self.resolve_button.grid(row=5, column=0, padx=5, pady=5)
+
+        # Cancel queued and running installs
+        self.cancel_installs_button = tk.Button(root, text="Cancel Installs", command=self.cancel_installs)
+        self.cancel_installs_button.grid(row=5, column=1, padx=5, pady=5)
+
+        # Lockfiles: freeze a resolution, and install one again without resolving
+        self.save_lock_button = tk.Button(root, text="Save Lockfile", command=self.save_lockfile)
+        self.save_lock_button.grid(row=5, column=3, padx=5, pady=5)
+
+        self.install_lock_button = tk.Button(root, text="Install from Lockfile", command=self.install_from_lockfile)
+        self.install_lock_button.grid(row=6, column=3, padx=5, pady=5)
+
         # Detailed package info
         self.package_info_label = tk.Label(root, text="Package Info:")
         self.package_info_label.grid(row=6, column=0, padx=5, pady=5, sticky='w')
@@ -107,52 +137,186 @@ class PipSearchGUI:
         self.download_dir = ""
         self.package_data = {}
         self.all_dependencies = []  # Store all dependencies found
+        self.details_package = None  # Whose dependencies and versions the widgets should show
+        self.install_scheduler = InstallScheduler(max_workers=2, on_progress=self.report_install_progress,
+                                                  on_event=self.report_pip_event, wheelhouse=default_wheelhouse())
+        self.search_runner = LatestSearchRunner(self.perform_search)
+        self.prefix_cache = PrefixResultCache()
+        self.search_after_id = None
+        self.last_search = None
+        self.search_stream = None  # Source of further result pages for the current term
+        self.search_python_version = "Any"
+        self.search_generation = None
+        self.loading_more = False
+        self.shown_names = set()
 
         # Button to select a .py file
         self.select_file_button = tk.Button(root, text="Select .py File", command=self.select_python_file)
         self.select_file_button.grid(row=9, column=2, padx=5, pady=5)
 
+        self.select_project_button = tk.Button(root, text="Scan Project Folder", command=self.select_project_folder)
+        self.select_project_button.grid(row=9, column=3, padx=5, pady=5)
+
         # Adjust grid weights
         for i in range(10):
             root.grid_rowconfigure(i, weight=1)
 
+        # Build the fuzzy name index in the background so the first search does not wait for it
+        if not default_index().is_empty():
+            threading.Thread(target=default_fuzzy_index, daemon=True).start()
+
     def search_packages(self):
         search_term = self.search_entry.get()
         python_version = self.python_version_combobox.get()
 
         if search_term:
-            self.status_label.config(text="Searching...")
-            print("Searching for packages...")
-            threading.Thread(target=self.perform_search, args=(search_term, python_version)).start()
+            self.start_search(search_term, python_version)
         else:
             messagebox.showwarning("Input Error", "Please enter a package name.")
 
-    def perform_search(self, search_term, python_version):
-        url = f"https://pypi.org/pypi?%3Aaction=search&term={search_term}&submit=search"
-        response = requests.get(url)
+    def on_search_key(self, event):
+        # Debounce: only search once typing pauses
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.search_as_you_type)
 
-        self.results_listbox.delete(0, tk.END)
+    def search_as_you_type(self):
+        self.search_after_id = None
+        search_term = self.search_entry.get().strip()
+        python_version = self.python_version_combobox.get()
+        if not search_term:
+            self.search_runner.cancel()
+            self.last_search = None
+            return
+        if (search_term, python_version) == self.last_search:
+            return  # e.g. arrow keys or shift, nothing changed
+        self.start_search(search_term, python_version)
+
+    def start_search(self, search_term, python_version):
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        self.last_search = (search_term, python_version)
+
+        self.status_label.config(text="Searching...")
+        print("Searching for packages...")
+        self.search_runner.submit(search_term, python_version)
+
+    def perform_search(self, search_term, python_version, generation=None):
+        index = default_index()
+        if not index.is_empty():
+            self.perform_local_search(index, search_term, python_version, generation)
+            return
 
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            search_results = soup.find_all('a', class_='package-snippet')
+        stream = SearchStream(search_term)
+        found = []
+        for result in stream.iter_next_page():
+            if generation is not None and not self.search_runner.is_current(generation):
+                return  # A newer term was typed while this page was loading
+            if not found:
+                self.start_results(stream, python_version, generation)
+            # Rows appear one by one while the page is parsed
+            self.show_result(result)
+            found.append(result['name'])
+
+        if not found:
+            if generation is not None and not self.search_runner.is_current(generation):
+                return
+            self.start_results(None, python_version, generation)
+            print("No package found.")
+            self.set_status("No package found.")
+            return
+
+        self.prefetch_metadata(found)
+        print(f"Found {len(found)} packages.")
+        self.set_status(f"Found {len(found)} packages.")
 
-            for project in search_results:
-                package_name = project.find('span', class_='package-snippet__name').text.strip()
-                summary_element = project.find('span', class_='package-snippet__description')
-                summary = summary_element.text.strip() if summary_element else "No summary available"
+    def perform_local_search(self, index, search_term, python_version, generation=None):
+        # Served from the on-disk index built by package_index.py, no network needed
+        results, stream = core.local_search(search_term, python_version, index, self.prefix_cache)
+        complete = stream is None
+        if generation is not None and not self.search_runner.is_current(generation):
+            return
 
-                self.results_listbox.insert(tk.END, package_name)
-                self.package_data[package_name] = {
-                    'url': project['href'],
-                    'summary': summary
-                }
+        self.start_results(stream, python_version, generation)
+        self.show_results(results)
 
-            print(f"Found {len(search_results)} packages.")
-            self.status_label.config(text=f"Found {len(search_results)} packages.")
+        self.prefetch_metadata([result['name'] for result in results])
+        if results:
+            more = "" if complete else "+"
+            print(f"Found {len(results)}{more} packages.")
+            self.set_status(f"Found {len(results)}{more} packages.")
         else:
             print("No package found.")
-            self.status_label.config(text="No package found.")
+            self.set_status("No package found.")
+
+    def start_results(self, stream, python_version, generation):
+        # Clear the list for a new term and remember where further pages come from
+        self.ui.post(self.results_listbox.delete, 0, tk.END)
+        self.shown_names = set()
+        self.search_stream = stream
+        self.search_python_version = python_version
+        self.search_generation = generation
+
+    def show_result(self, result):
+        self.show_results([result])
+
+    def show_results(self, results):
+        # Safe from worker threads: the rows reach the listbox as one bulk insert
+        package_names = []
+        for result in results:
+            package_name = result['name']
+            package_names.append(package_name)
+            self.shown_names.add(package_name)
+            self.package_data[package_name] = {
+                'url': result.get('url') or f"https://pypi.org/project/{package_name}/",
+                'summary': result['summary'] or "No summary available",
+                'version': result.get('version'),
+                'requires_python': result.get('requires_python')
+            }
+        if package_names:
+            self.ui.insert(self.results_listbox, *package_names)
+
+    def set_status(self, text):
+        self.ui.set_status(self.status_label, text)
+
+    def on_results_scrolled(self, first, last):
+        self.results_scrollbar.set(first, last)
+        if float(last) >= LOAD_MORE_THRESHOLD and self.search_stream is not None and not self.loading_more:
+            self.loading_more = True
+            threading.Thread(target=self.load_more_results, args=(self.search_stream, self.search_generation),
+                             daemon=True).start()
+
+    def load_more_results(self, stream, generation):
+        try:
+            results = filter_search_results(stream.iter_next_page(), self.search_python_version)
+            if generation is not None and not self.search_runner.is_current(generation):
+                return
+            if stream is not self.search_stream:
+                return
+            # Fuzzy suggestions may already be listed
+            self.show_results([result for result in results if result['name'] not in self.shown_names])
+            if stream.exhausted:
+                self.search_stream = None
+            shown = len(self.shown_names)
+            self.set_status(f"Found {shown}{'' if stream.exhausted else '+'} packages.")
+        finally:
+            self.loading_more = False
+
+    def prefetch_metadata(self, package_names):
+        # Warm the metadata cache in the background so clicking a result is a cache hit
+        default_fetcher().prefetch(package_names[:PREFETCH_TOP_N])
+
+    def prefetch_visible(self, selected_index=None):
+        first_visible = self.results_listbox.nearest(0)
+        last_visible = self.results_listbox.nearest(self.results_listbox.winfo_height())
+        start, end = first_visible, last_visible
+        if selected_index is not None:
+            start = max(0, min(start, selected_index - PREFETCH_NEIGHBOURS))
+            end = max(end, selected_index + PREFETCH_NEIGHBOURS)
+        package_names = self.results_listbox.get(start, end)
+        if package_names:
+            default_fetcher().prefetch(package_names)
 
     def select_directory(self):
         self.download_dir = filedialog.askdirectory()
@@ -162,23 +326,32 @@ class PipSearchGUI:
     def select_python_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("Python Files", "*.py")])
         if file_path:
-            dependencies = self.get_imports(file_path)
+            # Import names (yaml, PIL) are mapped to the distributions pip needs (PyYAML, Pillow)
+            dependencies = default_module_index().distributions_for(self.get_imports(file_path))
             self.dependencies_listbox.delete(0, tk.END)
             self.all_dependencies = dependencies  # Store dependencies
-            for dep in dependencies:
-                self.dependencies_listbox.insert(tk.END, dep)
+            self.dependencies_listbox.insert(tk.END, *dependencies)
 
     def get_imports(self, file_path):
-        with open(file_path, 'r') as file:
-            node = ast.parse(file.read(), filename=file_path)
-            imports = set()
-            for n in ast.walk(node):
-                if isinstance(n, ast.Import):
-                    for alias in n.names:
-                        imports.add(alias.name)  # Use 'name' instead of 'id'
-                elif isinstance(n, ast.ImportFrom):
-                    imports.add(n.module)
-            return imports
+        # Third-party top-level imports only; stdlib, relative and sibling-module imports are dropped
+        return scan_file(file_path, dotted=True)
+
+    def select_project_folder(self):
+        project_dir = filedialog.askdirectory()
+        if project_dir:
+            self.status_label.config(text=f"Scanning imports in {project_dir}...")
+            threading.Thread(target=self.scan_project_imports, args=(project_dir,), daemon=True).start()
+
+    def scan_project_imports(self, project_dir):
+        # Unchanged files come from the content-hash cache; the rest are parsed in a process pool
+        dependencies = default_module_index().distributions_for(scan_project(project_dir, dotted=True))
+        self.ui.post(self.show_project_imports, project_dir, dependencies)
+
+    def show_project_imports(self, project_dir, dependencies):
+        self.dependencies_listbox.delete(0, tk.END)
+        self.all_dependencies = dependencies
+        self.dependencies_listbox.insert(tk.END, *dependencies)
+        self.status_label.config(text=f"Found {len(dependencies)} third-party distributions imported in {project_dir}")
 
     def install_selected_package(self):
         selection = self.results_listbox.curselection()
@@ -188,33 +361,154 @@ class PipSearchGUI:
             if version:
                 package_name = f"{package_name}=={version}"
 
-            threading.Thread(target=self.install_package, args=(package_name,)).start()
+            self.install_package(package_name)
         else:
             messagebox.showwarning("Selection Error", "Please select a package to install.")
 
+    def download_selected_package(self):
+        selection = self.results_listbox.curselection()
+        if not selection:
+            messagebox.showwarning("Selection Error", "Please select a package to download.")
+            return
+        if not self.download_dir:
+            messagebox.showwarning("No Directory", "Please select a download directory first.")
+            return
+        package_name = self.results_listbox.get(selection[0])
+        version = self.version_combobox.get()
+        if version:
+            package_name = f"{package_name}=={version}"
+        python_version = self.python_version_combobox.get()
+
+        self.status_label.config(text=f"Resolving {package_name} for download...")
+        threading.Thread(target=self.download_files, args=(package_name, self.download_dir, python_version),
+                         daemon=True).start()
+
+    def download_files(self, requirement, directory, python_version):
+        # Files download in parallel; an interrupted download resumes from its .part file next time
+        jobs, missing, conflicts = core.download(requirement, directory, python_version,
+                                                 on_event=lambda event: self.report_pip_event(None, event))
+        if missing or conflicts:
+            for pin in missing:
+                print(f"Not downloaded, no compatible release file for {pin}")
+            for dependency, parent, pinned in conflicts:
+                print(f"Not downloaded, {parent} needs {dependency} but {pinned} was pinned")
+            self.set_status(f"Could not resolve {requirement} for download")
+            return
+        failed = [job for job in jobs if job.status != DONE]
+        if failed:
+            self.set_status(f"Downloaded {len(jobs) - len(failed)} of {len(jobs)} files, {len(failed)} failed")
+        else:
+            self.set_status(f"Downloaded {len(jobs)} files to {directory}")
+
+    def save_lockfile(self):
+        selection = self.results_listbox.curselection()
+        if not selection:
+            messagebox.showwarning("Selection Error", "Please select a package to lock.")
+            return
+        package_name = self.results_listbox.get(selection[0])
+        version = self.version_combobox.get()
+        if version:
+            package_name = f"{package_name}=={version}"
+        path = filedialog.asksaveasfilename(defaultextension=".lock", initialfile=DEFAULT_LOCK_NAME)
+        if path:
+            self.status_label.config(text=f"Locking {package_name}...")
+            threading.Thread(target=self.write_lockfile, args=(package_name, self.python_version_combobox.get(), path),
+                             daemon=True).start()
+
+    def write_lockfile(self, requirement, python_version, path):
+        lock, missing, conflicts = core.lock(requirement, python_version)
+        if lock is None:
+            for pin in missing:
+                print(f"Not locked, no compatible release file for {pin}")
+            for dependency, parent, pinned in conflicts:
+                print(f"Not locked, {parent} needs {dependency} but {pinned} was pinned")
+            self.set_status(f"Could not lock {requirement}")
+            return
+        lock.save(path)
+        print(f"Locked {requirement}:")
+        for pin in lock.pins():
+            print(f"  {pin}")
+        self.set_status(f"Locked {len(lock.packages)} packages to {path}")
+
+    def install_from_lockfile(self):
+        path = filedialog.askopenfilename(filetypes=[("Lockfiles", "*.lock"), ("All Files", "*")])
+        if path:
+            self.status_label.config(text=f"Installing from {path}...")
+            threading.Thread(target=self.install_lockfile, args=(path, self.download_dir), daemon=True).start()
+
+    def install_lockfile(self, path, target):
+        # Skips resolution and metadata queries; cached files are installed straight from the wheelhouse
+        try:
+            error = core.install_lock(path, target, on_event=lambda event: self.report_pip_event(None, event))
+        except (OSError, ValueError, KeyError) as e:
+            error = f"Unreadable lockfile: {e}"
+        if error is None:
+            print(f"Installed everything in {path}")
+            self.set_status(f"Installed from {path}")
+        else:
+            print(f"Failed to install from {path}: {error}")
+            self.set_status(f"Failed to install from {path}")
+
     def install_all_dependencies(self):
         if not self.all_dependencies:
             messagebox.showwarning("No Dependencies", "No dependencies found to install.")
             return
 
+        # Queued together, so the scheduler folds them into as few pip runs as possible
         for dep in self.all_dependencies:
-            threading.Thread(target=self.install_package, args=(dep,)).start()
+            self.install_package(dep)
 
     def install_package(self, package_name):
-        self.status_label.config(text=f"Installing {package_name}...")
-        print(f"Installing {package_name}...")
-        try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", package_name, "--target", self.download_dir])
-            self.status_label.config(text=f"Successfully installed {package_name}")
-            self.fetch_available_versions(package_name)  # Refresh versions after installation
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to install {package_name}: {e.output}")
-            self.status_label.config(text=f"Failed to install {package_name}")
+        return self.install_scheduler.submit(package_name, self.download_dir)
+
+    def cancel_installs(self):
+        self.install_scheduler.cancel_all()
+
+    def report_install_progress(self, job):
+        # Called by the install scheduler for every job state change
+        if job.status == QUEUED:
+            print(f"Queued {job.requirement} for installation.")
+        elif job.status == RUNNING:
+            self.set_status(f"Installing {job.requirement}...")
+            print(f"Installing {job.requirement}...")
+        elif job.status == DONE:
+            self.set_status(f"Successfully installed {job.requirement}")
+            print(f"Successfully installed {job.requirement}")
+            self.ui.post(self.show_installed, job.requirement.split('==')[0])
+        elif job.status == FAILED:
+            print(f"Failed to install {job.requirement}: {job.error}")
+            self.set_status(f"Failed to install {job.requirement}")
+        elif job.status == CANCELLED:
+            print(f"Cancelled installation of {job.requirement}")
+            self.set_status(f"Cancelled {job.requirement}")
+
+    def show_installed(self, package_name):
+        # On the Tk thread. Versions are refreshed only if the details pane still shows this
+        # package; refreshing another would replace the user's selection.
+        key = normalize_name(package_name)
+        for index, name in enumerate(self.results_listbox.get(0, tk.END)):
+            if normalize_name(name) == key:
+                self.results_listbox.itemconfig(index, foreground=INSTALLED_COLOR)
+        if self.details_package is not None and normalize_name(self.details_package) == key:
+            self.fetch_available_versions(self.details_package)
+
+    def report_pip_event(self, jobs, event):
+        # Called from the pip reader threads; the console and the status bar both buffer, so this stays cheap
+        if event.kind == PROGRESS:
+            self.set_status(event.describe())
+        elif event.kind == PHASE:
+            print(event.text)
+            self.set_status(event.describe())
+        elif event.kind == LINE:
+            print(f"  {event.text}")
+        else:
+            print(event.text)
 
     def display_package_info(self, event):
         selection = event.widget.curselection()
         if selection:
             package_name = event.widget.get(selection[0])
+            self.prefetch_visible(selection[0])
             info = self.package_data.get(package_name)
             self.package_info_text.delete(1.0, tk.END)
 
@@ -228,33 +522,73 @@ class PipSearchGUI:
                 self.package_info_text.insert(tk.END, "No additional information available.")
 
     def fetch_dependencies(self, package_name):
-        url = f"https://pypi.org/pypi/{package_name}/json"
-        response = requests.get(url)
+        # Called on the Tk thread; the request runs on a worker and only the listbox update comes back
+        self.details_package = package_name
+        threading.Thread(target=self.load_dependencies, args=(package_name,), daemon=True).start()
+
+    def load_dependencies(self, package_name):
+        self.ui.post(self.show_dependencies, package_name, core.dependencies(package_name))
 
-        if response.status_code == 200:
-            dependencies = response.json().get('info', {}).get('requires_dist', [])
-            if dependencies is None:  # Check if dependencies are None
-                dependencies = []  # Set to an empty list if None
+    def show_dependencies(self, package_name, dependencies):
+        if package_name != self.details_package:
+            return  # Another package was selected while this one loaded
+        if dependencies is not None:
             self.dependencies_listbox.delete(0, tk.END)
-            for dep in dependencies:
-                self.dependencies_listbox.insert(tk.END, dep)
+            self.dependencies_listbox.insert(tk.END, *dependencies)
         else:
             print("Could not fetch dependencies.")
             messagebox.showerror("Error", "Could not fetch dependencies.")
 
     def fetch_available_versions(self, package_name):
-        url = f"https://pypi.org/pypi/{package_name}/json"
-        response = requests.get(url)
+        # Like fetch_dependencies; the combobox is read here, on the Tk thread
+        self.details_package = package_name
+        threading.Thread(target=self.load_available_versions,
+                         args=(package_name, self.python_version_combobox.get()), daemon=True).start()
 
-        if response.status_code == 200:
-            versions = sorted(response.json().get('releases', {}).keys(), key=lambda x: list(map(int, x.split('.'))), reverse=True)
+    def load_available_versions(self, package_name, python_version):
+        self.ui.post(self.show_available_versions, package_name, core.available_versions(package_name, python_version))
+
+    def show_available_versions(self, package_name, available):
+        if package_name != self.details_package:
+            return
+        if available is not None:
+            versions, preferred = available
             self.version_combobox['values'] = versions
-            if versions:
-                self.version_combobox.current(0)  # Set to the newest version by default
+            self.version_combobox.set(preferred or "")  # The newest stable release rather than a pre-release
         else:
             print("Could not fetch versions.")
             messagebox.showerror("Error", "Could not fetch versions.")
 
+    def resolve_selected_package(self):
+        selection = self.results_listbox.curselection()
+        if selection:
+            package_name = self.results_listbox.get(selection[0])
+            version = self.version_combobox.get()
+            if version:
+                package_name = f"{package_name}=={version}"
+            python_version = self.python_version_combobox.get()
+
+            self.status_label.config(text=f"Resolving {package_name}...")
+            threading.Thread(target=self.resolve_dependencies, args=(package_name, python_version)).start()
+        else:
+            messagebox.showwarning("Selection Error", "Please select a package to resolve.")
+
+    def resolve_dependencies(self, requirement, python_version):
+        # "Any" resolves for the interpreter running the GUI
+        resolution = core.resolve(requirement, python_version)
+
+        print(f"Dependency tree for {requirement}:")
+        for line in resolution.tree_lines():
+            print(f"  {line}")
+        for dependency, parent, pinned in resolution.conflicts:
+            print(f"Conflict: {parent} needs {dependency} but {pinned} was pinned")
+        for dependency in resolution.missing:
+            print(f"No compatible release found for {dependency}")
+
+        self.ui.post(self.dependencies_listbox.delete, 0, tk.END)
+        self.ui.insert(self.dependencies_listbox, *resolution.pin_lines())
+        self.set_status(f"Resolved {len(resolution.pins)} packages for {requirement}")
+
     def search_dependency_in_main(self, event):
         selection = event.widget.curselection()
         if selection:
@@ -0,0 +1,66 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PYPI_URL = os.environ.get("PIPSEARCH_PYPI_URL", "https://pypi.org").rstrip("/")
+
+# (connect, read) in seconds; override from the environment on slow proxied networks
+CONNECT_TIMEOUT = float(os.environ.get("PIPSEARCH_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("PIPSEARCH_READ_TIMEOUT", "30"))
+
+# How many hosts keep a pool, and how many connections each host may hold open
+POOL_HOSTS = int(os.environ.get("PIPSEARCH_POOL_HOSTS", "4"))
+MAX_CONNECTIONS_PER_HOST = int(os.environ.get("PIPSEARCH_MAX_CONNECTIONS_PER_HOST", "10"))
+
+USER_AGENT = "pipsearch (+https://github.com/DocEnilno/PIPSEARCH)"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    session = requests.Session()
+    # Only retry failed connects; a read that already started is the caller's problem
+    retries = Retry(total=2, connect=2, read=0, backoff_factor=0.2, allowed_methods=["GET", "HEAD"])
+    # pool_block makes callers wait for a free connection instead of opening extra ones
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                          pool_block=True, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        'User-Agent': USER_AGENT,
+        'Accept-Encoding': 'gzip, deflate',
+    })
+    return session
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def configure(connect_timeout=None, read_timeout=None, max_connections_per_host=None, pool_hosts=None):
+    global CONNECT_TIMEOUT, READ_TIMEOUT, MAX_CONNECTIONS_PER_HOST, POOL_HOSTS, _session
+    if connect_timeout is not None:
+        CONNECT_TIMEOUT = connect_timeout
+    if read_timeout is not None:
+        READ_TIMEOUT = read_timeout
+    if max_connections_per_host is not None:
+        MAX_CONNECTIONS_PER_HOST = max_connections_per_host
+    if pool_hosts is not None:
+        POOL_HOSTS = pool_hosts
+    # Pool sizes are fixed when the adapter is built, so start over with a fresh session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get(url, **kwargs):
+    kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+    return get_session().get(url, **kwargs)
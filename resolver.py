@@ -0,0 +1,221 @@
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from packaging.markers import default_environment
+from packaging.requirements import Requirement, InvalidRequirement
+from packaging.specifiers import SpecifierSet, InvalidSpecifier
+from metadata_cache import default_cache
+from package_index import normalize_name
+from version_index import index_for
+
+
+def marker_environment(python_version=None, **overrides):
+    # The running interpreter's environment, retargeted at another Python if asked
+    environment = default_environment()
+    if python_version and python_version != "Any":
+        parts = python_version.split(".")
+        environment['python_version'] = ".".join(parts[:2])
+        environment['python_full_version'] = python_version if len(parts) > 2 else f"{python_version}.0"
+        if platform.python_implementation() == "CPython":
+            environment['implementation_version'] = environment['python_full_version']
+    environment.update(overrides)
+    return environment
+
+
+class Node:
+    def __init__(self, name, version):
+        self.name = name
+        self.version = version
+        self.extras = set()
+        self.children = []  # (Requirement, child Node) in metadata order
+
+    def __repr__(self):
+        return f"<Node {self.name}=={self.version}>"
+
+
+class Resolution:
+    def __init__(self, roots, nodes, conflicts, missing):
+        self.roots = roots
+        self.nodes = nodes
+        self.conflicts = conflicts
+        self.missing = missing
+
+    @property
+    def pins(self):
+        return {node.name: node.version for node in self.nodes.values()}
+
+    def pin_lines(self):
+        return [f"{name}=={version}" for name, version in sorted(self.pins.items(), key=lambda item: item[0].lower())]
+
+    def tree_lines(self):
+        lines = []
+        for root in self.roots:
+            self._walk(root, "", set(), lines)
+        return lines
+
+    def _walk(self, node, indent, seen, lines):
+        extras = f"[{','.join(sorted(node.extras))}]" if node.extras else ""
+        repeated = " (see above)" if node.name in seen else ""
+        lines.append(f"{indent}{node.name}{extras}=={node.version}{repeated}")
+        if repeated:
+            return
+        seen.add(node.name)
+        for _, child in node.children:
+            self._walk(child, indent + "  ", seen, lines)
+
+
+class Resolver:
+    # Walks the dependency graph breadth first. Metadata for each level is fetched
+    # concurrently, then pins are chosen in order, like pip's legacy resolver: the first
+    # requirement seen for a project picks its version and later ones are checked against it.
+    # Parsed release metadata is memoized on the resolver, so resolving jupyter after
+    # notebook only fetches what notebook did not already need. Failed fetches are not
+    # memoized: the next resolve() asks again, and this one reports the project as missing.
+    def __init__(self, python_version=None, cache=None, max_workers=16, allow_prereleases=False):
+        self.python_version = python_version
+        self.environment = marker_environment(python_version)
+        self.cache = cache or default_cache()
+        self.allow_prereleases = allow_prereleases
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.releases = {}  # normalized name -> (VersionIndex, {version: requires_python or False if yanked})
+        self.requirements = {}  # (normalized name, version) -> [Requirement]
+
+    def resolve(self, requirements):
+        requirements = [Requirement(r) if isinstance(r, str) else r for r in requirements]
+        nodes = {}
+        conflicts = []
+        missing = []
+        roots = []
+
+        frontier = [(None, requirement) for requirement in requirements]
+        while frontier:
+            names = {normalize_name(requirement.name) for _, requirement in frontier}
+            list(self.executor.map(self._load_releases, names))
+
+            chosen = []
+            next_frontier = []
+            for parent, requirement in frontier:
+                key = normalize_name(requirement.name)
+                node = nodes.get(key)
+                if node is None:
+                    version = self._choose(key, requirement.specifier)
+                    if version is None:
+                        missing.append(str(requirement))
+                        continue
+                    node = nodes[key] = Node(requirement.name, version)
+                    chosen.append(node)
+                elif not requirement.specifier.contains(node.version, prereleases=True):
+                    conflicts.append((str(requirement), parent.name if parent else None, node.version))
+
+                new_extras = set(requirement.extras) - node.extras
+                if new_extras and node not in chosen:
+                    # Already expanded without these extras; queue only what they add
+                    next_frontier.append((node, new_extras))
+                node.extras |= new_extras
+
+                if parent is None:
+                    if node not in roots:
+                        roots.append(node)
+                else:
+                    parent.children.append((requirement, node))
+
+            list(self.executor.map(lambda node: self._load_requirements(node.name, node.version), chosen))
+            frontier = []
+            for node in chosen:
+                if (normalize_name(node.name), node.version) not in self.requirements:
+                    # Without its metadata the pin's own dependencies are unknown
+                    missing.append(f"{node.name}=={node.version}")
+                    continue
+                frontier.extend((node, r) for r in self._active_requirements(node, node.extras, include_base=True))
+            for node, extras in next_frontier:
+                frontier.extend((node, r) for r in self._active_requirements(node, extras, include_base=False))
+
+        return Resolution(roots, nodes, conflicts, missing)
+
+    def _load_releases(self, key):
+        with self.lock:
+            if key in self.releases:
+                return
+        metadata = self.cache.get_package_json(key)
+        if metadata is None:
+            return
+        index = index_for(key, metadata)
+        requires_python = {}
+        for version_string, files in metadata.get('releases', {}).items():
+            if not files or all(file.get('yanked') for file in files):
+                requires_python[version_string] = False  # nothing installable
+            else:
+                requires_python[version_string] = next(
+                    (file.get('requires_python') for file in files if file.get('requires_python')), None)
+        with self.lock:
+            self.releases[key] = (index, requires_python)
+
+    def _choose(self, key, specifier):
+        index, requires_python = self.releases.get(key, (None, {}))
+        if index is None:
+            return None
+        # Stable releases first, pre-releases only if nothing else fits (or they were asked for)
+        prereleases = True if self.allow_prereleases else None
+        for version in index.matching(specifier, prereleases=prereleases):
+            python_spec = requires_python.get(version)
+            if python_spec is False or not self._supports_python(python_spec):
+                continue
+            return version
+        return None
+
+    def _supports_python(self, requires_python):
+        if not requires_python:
+            return True
+        try:
+            return SpecifierSet(requires_python).contains(self.environment['python_full_version'], prereleases=True)
+        except InvalidSpecifier:
+            return True
+
+    def _load_requirements(self, name, version):
+        key = (normalize_name(name), version)
+        with self.lock:
+            if key in self.requirements:
+                return
+        metadata = self.cache.get_release_json(name, version)
+        if metadata is None:
+            # The project's own document describes its latest release, which is the usual pin
+            metadata = self.cache.get_package_json(name)
+            if metadata is None or metadata.get('info', {}).get('version') != version:
+                return
+        parsed = []
+        for line in (metadata.get('info', {}).get('requires_dist') or []):
+            try:
+                parsed.append(Requirement(line))
+            except InvalidRequirement:
+                print(f"Ignoring invalid requirement {line!r} of {name} {version}")
+        with self.lock:
+            self.requirements[key] = parsed
+
+    def _active_requirements(self, node, extras, include_base):
+        active = []
+        for requirement in self.requirements.get((normalize_name(node.name), node.version), []):
+            if requirement.marker is None:
+                if include_base:
+                    active.append(requirement)
+                continue
+            contexts = [""] if include_base else []
+            contexts.extend(sorted(extras))
+            if any(requirement.marker.evaluate(dict(self.environment, extra=extra)) for extra in contexts):
+                # An unconditional marker (say python_version) matches in every context; only count it once
+                if include_base or not requirement.marker.evaluate(dict(self.environment, extra="")):
+                    active.append(requirement)
+        return active
+
+
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+
+
+def resolver_for(python_version=None):
+    # One memoizing resolver per target Python, shared by everything in the process
+    with _resolvers_lock:
+        resolver = _resolvers.get(python_version)
+        if resolver is None:
+            resolver = _resolvers[python_version] = Resolver(python_version)
+        return resolver
@@ -0,0 +1,65 @@
+import threading
+from metadata_cache import default_cache
+
+PAGE_SIZE = 100
+
+
+def parse_search_page(html):
+    # Yields one result per package snippet as soon as it has been extracted
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for project in soup.find_all('a', class_='package-snippet'):
+        name_element = project.find('span', class_='package-snippet__name')
+        if name_element is None:
+            continue
+        summary_element = project.find('span', class_='package-snippet__description')
+        yield {
+            'name': name_element.text.strip(),
+            'summary': summary_element.text.strip() if summary_element else "",
+            'url': project.get('href', ''),
+        }
+
+
+class SearchStream:
+    # Pages through the results of one search term, either from the local package index
+    # (LIMIT/OFFSET) or from PyPI's HTML search pages (?page=N). Pages are only fetched
+    # when asked for, so a broad query costs one page until the user scrolls for more.
+    def __init__(self, search_term, index=None, page_size=PAGE_SIZE, cache=None):
+        self.search_term = search_term
+        self.index = index
+        self.page_size = page_size
+        self.cache = cache or default_cache()
+        self.pages_read = 0
+        self.exhausted = False
+        self.lock = threading.Lock()
+
+    def iter_next_page(self):
+        # Generator over the next page; the remote source yields rows while parsing
+        with self.lock:
+            if self.exhausted:
+                return
+            self.pages_read += 1
+            page = self.pages_read
+
+        if self.index is not None:
+            rows = self.index.search(self.search_term, limit=self.page_size, offset=(page - 1) * self.page_size)
+            if len(rows) < self.page_size:
+                self.exhausted = True
+            yield from rows
+            return
+
+        html = self.cache.get_search_page(self.search_term, page)
+        if html is None:
+            # PyPI answers 404 past the last page
+            self.exhausted = True
+            return
+        count = 0
+        for result in parse_search_page(html):
+            count += 1
+            yield result
+        if count == 0:
+            self.exhausted = True
+
+    def next_page(self):
+        return list(self.iter_next_page())
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import pytest
+import batch_fetch
+from batch_fetch import BatchFetcher
+
+WAIT = 5
+
+
+class FakeCache:
+    # get_package_json answers {'name': name}; names in held block until release is set
+    def __init__(self, held=()):
+        self.held = set(held)
+        self.started = {name: threading.Event() for name in self.held}
+        self.release = threading.Event()
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def get_package_json(self, name):
+        with self.lock:
+            self.requested.append(name)
+        if name in self.held:
+            self.started[name].set()
+            self.release.wait(WAIT)
+        if name == "broken":
+            raise ValueError("bad document")
+        return {'name': name}
+
+
+@pytest.fixture
+def fetchers():
+    started = []
+    yield started
+    for fetcher in started:
+        fetcher.close()
+        fetcher.thread.join(WAIT)
+        fetcher.loop.close()
+
+
+def make_fetcher(fetchers, cache, concurrency=4):
+    fetcher = BatchFetcher(cache=cache, concurrency=concurrency)
+    fetchers.append(fetcher)
+    return fetcher
+
+
+def test_fetch_batch_yields_every_name_once(fetchers):
+    cache = FakeCache()
+    fetcher = make_fetcher(fetchers, cache)
+    results = dict(fetcher.fetch_batch(["a", "b", "a", "broken"]))
+    assert results == {'a': {'name': "a"}, 'b': {'name': "b"}, 'broken': None}
+    assert sorted(cache.requested) == ["a", "b", "broken"]
+
+
+def test_batch_shares_a_prefetch_already_running(fetchers):
+    cache = FakeCache(held=["a"])
+    fetcher = make_fetcher(fetchers, cache)
+    fetcher.prefetch(["a"])
+    assert cache.started["a"].wait(WAIT)
+    cache.release.set()
+    assert dict(fetcher.fetch_batch(["a"])) == {'a': {'name': "a"}}
+    assert cache.requested == ["a"]
+
+
+def test_newer_prefetch_cancels_queued_names(fetchers):
+    cache = FakeCache(held=["a"])
+    fetcher = make_fetcher(fetchers, cache, concurrency=1)
+    fetcher.prefetch(["a", "b"])
+    assert cache.started["a"].wait(WAIT)
+    fetcher.prefetch(["c"])
+    cache.release.set()
+    assert dict(fetcher.fetch_batch(["c"])) == {'c': {'name': "c"}}
+    assert "b" not in cache.requested
+
+
+def test_batch_survives_a_prefetch_cancelling_its_name(fetchers):
+    # Regression: "c" is queued speculatively; a batch asks for it and a newer prefetch lands
+    # before the batch's fetch coroutine runs. The batch must not get the cancelled task.
+    cache = FakeCache(held=["a"])
+    fetcher = make_fetcher(fetchers, cache, concurrency=1)
+    fetcher.prefetch(["a", "c"])
+    assert cache.started["a"].wait(WAIT)
+
+    async def race():
+        batch = asyncio.ensure_future(fetcher.fetch("c"))
+        fetcher._schedule_prefetch(["y"])
+        cache.release.set()
+        return await batch
+
+    result = asyncio.run_coroutine_threadsafe(race(), fetcher.loop).result(WAIT)
+    assert result == ("c", {'name': "c"})
+
+
+@pytest.mark.filterwarnings("ignore:coroutine .* was never awaited:RuntimeWarning")
+def test_closed_fetcher_raises_instead_of_hanging(fetchers, monkeypatch):
+    monkeypatch.setattr(batch_fetch, 'POLL_INTERVAL', 0.01)
+    cache = FakeCache(held=["a"])
+    fetcher = make_fetcher(fetchers, cache)
+    fetcher.close()
+    fetcher.thread.join(WAIT)
+    with pytest.raises(RuntimeError):
+        list(fetcher.fetch_batch(["a"]))
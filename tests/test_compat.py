@@ -0,0 +1,70 @@
+import pytest
+from packaging.tags import Tag
+from compat import parse_python_version, format_python_version, tag_ranks, best_release_file
+
+LINUX = ("manylinux_2_17_x86_64", "linux_x86_64")
+
+
+def wheel(filename, **extra):
+    return dict({'filename': filename, 'packagetype': 'bdist_wheel'}, **extra)
+
+
+def sdist(filename, **extra):
+    return dict({'filename': filename, 'packagetype': 'sdist'}, **extra)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("3.12", (3, 12)),
+    ("3.12.1", (3, 12)),
+    ("3.12rc1", (3, 12)),
+    ("py3.12", (3, 12)),
+    (" python 3.9", (3, 9)),
+    ("Any", None),
+    ("", None),
+    (None, None),
+    ("3", None),
+    ("3.x", None),
+    ("py3", None),
+])
+def test_parse_python_version(text, expected):
+    assert parse_python_version(text) == expected
+
+
+def test_format_python_version():
+    assert format_python_version("py3.12.1") == "3.12"
+    assert format_python_version("3.x") == "Any"
+
+
+def test_specific_tags_rank_before_generic_ones():
+    ranks = tag_ranks((3, 11), LINUX)
+    assert ranks[Tag("cp311", "cp311", "manylinux_2_17_x86_64")] < ranks[Tag("cp311", "abi3", "manylinux_2_17_x86_64")]
+    assert ranks[Tag("cp311", "abi3", "manylinux_2_17_x86_64")] < ranks[Tag("py3", "none", "any")]
+    assert ranks[Tag("cp311", "cp311", "manylinux_2_17_x86_64")] < ranks[Tag("cp311", "cp311", "linux_x86_64")]
+    assert Tag("cp312", "cp312", "manylinux_2_17_x86_64") not in ranks
+
+
+def test_best_release_file_prefers_the_most_specific_wheel():
+    files = [
+        sdist("lib-1.0.tar.gz"),
+        wheel("lib-1.0-py3-none-any.whl"),
+        wheel("lib-1.0-cp311-abi3-manylinux_2_17_x86_64.whl"),
+        wheel("lib-1.0-cp311-cp311-manylinux_2_17_x86_64.whl"),
+        wheel("lib-1.0-cp312-cp312-manylinux_2_17_x86_64.whl"),
+    ]
+    assert best_release_file(files, "3.11", LINUX)['filename'] == "lib-1.0-cp311-cp311-manylinux_2_17_x86_64.whl"
+    assert best_release_file(files, "3.10", LINUX)['filename'] == "lib-1.0-py3-none-any.whl"
+
+
+def test_best_release_file_falls_back_to_the_sdist():
+    files = [wheel("lib-1.0-cp312-cp312-win_amd64.whl"), sdist("lib-1.0.tar.gz")]
+    assert best_release_file(files, "3.12", LINUX)['filename'] == "lib-1.0.tar.gz"
+
+
+def test_best_release_file_skips_yanked_and_invalid_files():
+    files = [
+        wheel("lib-1.0-cp311-cp311-manylinux_2_17_x86_64.whl", yanked=True),
+        wheel("not a wheel name.whl"),
+        wheel("lib-1.0-py3-none-any.whl"),
+    ]
+    assert best_release_file(files, "3.11", LINUX)['filename'] == "lib-1.0-py3-none-any.whl"
+    assert best_release_file([sdist("lib-1.0.tar.gz", yanked=True)], "3.11", LINUX) is None
@@ -0,0 +1,84 @@
+import os
+import pytest
+from dist_scanner import InstalledSet, scan, scan_path
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(text)
+
+
+def dist_info(site, name, version, extra=""):
+    path = os.path.join(site, f"{name}-{version}.dist-info")
+    write(os.path.join(path, "METADATA"), f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n{extra}\nLong description")
+    write(os.path.join(path, "RECORD"), f"{name}/__init__.py,,\n{name}-{version}.dist-info/METADATA,,\n")
+    return path
+
+
+def bump(path):
+    # Directory mtimes can be too coarse to see two changes in a row
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def site(tmp_path):
+    site = str(tmp_path / "site-packages")
+    dist_info(site, "requests", "2.31.0", "Summary: HTTP\nRequires-Dist: idna\nRequires-Dist: urllib3")
+    egg = os.path.join(site, "legacy.egg-info")
+    write(os.path.join(egg, "PKG-INFO"), "Name: legacy\nVersion: 0.1\n")
+    write(os.path.join(egg, "installed-files.txt"), "../legacy.py\nPKG-INFO\n")
+    write(os.path.join(site, "flat-1.0.egg-info"), "Name: flat\nVersion: 1.0\n")
+    os.makedirs(os.path.join(site, "broken-2.0.dist-info"))
+    os.makedirs(os.path.join(site, "requests"))
+    return site
+
+
+def test_scan_reads_every_metadata_layout(site):
+    distributions = scan([site])
+    assert {name: distribution.version for name, distribution in distributions.items()} == {
+        "requests": "2.31.0", "legacy": "0.1", "flat": "1.0", "broken": "2.0"}
+
+
+def test_details_are_parsed_on_demand(site):
+    requests = scan([site])["requests"]
+    assert requests.summary == "HTTP"
+    assert requests.requires == ["idna", "urllib3"]
+    assert requests.files == ["requests/__init__.py", "requests-2.31.0.dist-info/METADATA"]
+    assert scan([site])["legacy"].files == ["legacy.py", os.path.join("legacy.egg-info", "PKG-INFO")]
+    assert scan([site])["broken"].files == []
+
+
+def test_unchanged_entries_are_reused(site):
+    first = scan_path(site)
+    second = scan_path(site, first)
+    assert all(second[name] is first[name] for name in first)
+    assert scan_path(os.path.join(site, "missing")) == {}
+
+
+def test_first_path_wins(tmp_path, site):
+    user_site = str(tmp_path / "user")
+    dist_info(user_site, "Requests", "3.0.0")
+    assert scan([user_site, site])["Requests"].version == "3.0.0"
+    assert "requests" not in scan([user_site, site])
+
+
+def test_refresh_reports_what_changed(site):
+    installed = InstalledSet([site])
+    assert installed.refresh() == ({"requests", "legacy", "flat", "broken"}, set(), set())
+    assert not installed.has_changed()
+    assert installed.refresh() == (set(), set(), set())
+
+    stamp = installed.stamp()
+    dist_info(site, "idna", "3.4")
+    os.remove(os.path.join(site, "flat-1.0.egg-info"))
+    bump(site)
+    assert installed.stamp() != stamp
+    assert installed.has_changed()
+    assert installed.refresh() == ({"idna"}, {"flat"}, set())
+
+    metadata = os.path.join(site, "requests-2.31.0.dist-info")
+    bump(metadata)
+    bump(site)
+    assert installed.refresh() == (set(), set(), {"requests"})
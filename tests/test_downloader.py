@@ -0,0 +1,174 @@
+import os
+import hashlib
+import pytest
+import requests
+import downloader
+from downloader import ReleaseFile, download_files, PART_SUFFIX
+from install_scheduler import DONE, FAILED
+from pip_runner import ERROR, FINISHED
+from wheelhouse import Wheelhouse
+
+BASE_URL = "https://files.example/packages/"
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", drop_after=None):
+        self.status_code = status_code
+        self.body = body
+        self.drop_after = drop_after
+        self.url = BASE_URL
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Client Error")
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            if self.drop_after is not None and start >= self.drop_after:
+                raise requests.ConnectionError("connection reset")
+            yield self.body[start:start + chunk_size]
+
+
+class FakeServer:
+    # Stands in for pypi_http.get. Serves files by URL and honours Range headers; failures
+    # queues per-URL status codes or ("drop", n) to cut the connection after n bytes.
+    def __init__(self, monkeypatch):
+        self.files = {}
+        self.failures = {}
+        self.ignore_range = False
+        self.requests = []
+        monkeypatch.setattr(downloader.pypi_http, 'get', self.get)
+        monkeypatch.setattr(downloader.time, 'sleep', lambda seconds: None)
+
+    def add(self, filename, content, size=True, sha256=True):
+        self.files[BASE_URL + filename] = content
+        return ReleaseFile(filename, BASE_URL + filename, len(content) if size else None,
+                           hashlib.sha256(content).hexdigest() if sha256 else None)
+
+    def get(self, url, headers=None, stream=False):
+        self.requests.append((url, dict(headers or {})))
+        failure = self.failures.get(url, []) and self.failures[url].pop(0)
+        if isinstance(failure, int):
+            return FakeResponse(failure)
+        body = self.files.get(url)
+        if body is None:
+            return FakeResponse(404)
+        range_header = (headers or {}).get('Range')
+        status = 200
+        if range_header and not self.ignore_range:
+            start = int(range_header[len("bytes="):-1])
+            if start >= len(body):
+                return FakeResponse(416)
+            body, status = body[start:], 206
+        return FakeResponse(status, body, drop_after=failure[1] if failure else None)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(downloader, 'CHUNK_SIZE', 10)
+    return FakeServer(monkeypatch)
+
+
+CONTENT = bytes(range(256)) * 4
+
+
+def read(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def test_release_file_from_pypi_resolves_relative_urls():
+    entry = {'filename': "six-1.16.0.tar.gz", 'url': "../../packages/six.tar.gz", 'size': 5,
+             'digests': {'sha256': "abc"}}
+    file = ReleaseFile.from_pypi(entry, "https://mirror.example/pypi/six/json", "six", "1.16.0")
+    assert file.url == "https://mirror.example/packages/six.tar.gz"
+    assert (file.size, file.sha256, file.project, file.version) == (5, "abc", "six", "1.16.0")
+
+
+def test_files_are_downloaded_and_verified(tmp_path, server):
+    files = [server.add(f"pkg{i}-1.0.tar.gz", CONTENT[i:]) for i in range(3)]
+    events = []
+    jobs = download_files(files, str(tmp_path), max_workers=2, on_event=events.append)
+    assert [job.status for job in jobs] == [DONE] * 3
+    assert read(jobs[1].path) == CONTENT[1:]
+    assert not os.path.exists(jobs[1].path + PART_SUFFIX)
+    assert [event.text.split()[0] for event in events if event.phase == FINISHED] == ["Saved"] * 3
+
+
+def test_existing_files_are_not_downloaded_again(tmp_path, server):
+    file = server.add("pkg-1.0.tar.gz", CONTENT)
+    download_files([file], str(tmp_path))
+    download_files([file], str(tmp_path))
+    assert len(server.requests) == 1
+
+
+def test_dropped_connections_resume_with_a_range_request(tmp_path, server):
+    file = server.add("pkg-1.0.tar.gz", CONTENT)
+    server.failures[file.url] = [503, ("drop", 300), ("drop", 200)]
+    [job] = download_files([file], str(tmp_path))
+    assert job.status == DONE
+    assert read(job.path) == CONTENT
+    assert [headers.get('Range') for _, headers in server.requests] == [None, None, "bytes=300-", "bytes=500-"]
+
+
+def test_a_part_file_from_an_earlier_run_is_resumed(tmp_path, server):
+    file = server.add("pkg-1.0.tar.gz", CONTENT)
+    with open(tmp_path / ("pkg-1.0.tar.gz" + PART_SUFFIX), 'wb') as part:
+        part.write(CONTENT[:400])
+    [job] = download_files([file], str(tmp_path))
+    assert job.status == DONE and job.resumed_from == 400
+    assert read(job.path) == CONTENT
+    assert server.requests[0][1]['Range'] == "bytes=400-"
+
+
+def test_servers_ignoring_range_start_over(tmp_path, server):
+    file = server.add("pkg-1.0.tar.gz", CONTENT)
+    server.ignore_range = True
+    server.failures[file.url] = [("drop", 300)]
+    [job] = download_files([file], str(tmp_path))
+    assert job.status == DONE
+    assert read(job.path) == CONTENT
+
+
+def test_a_complete_part_file_is_finished_on_416(tmp_path, server):
+    file = server.add("pkg-1.0.tar.gz", CONTENT)
+    with open(tmp_path / ("pkg-1.0.tar.gz" + PART_SUFFIX), 'wb') as part:
+        part.write(CONTENT)
+    [job] = download_files([file], str(tmp_path))
+    assert job.status == DONE
+    assert read(job.path) == CONTENT
+
+
+def test_mismatched_content_is_rejected(tmp_path, server):
+    file = server.add("pkg-1.0.tar.gz", CONTENT)
+    server.files[file.url] = CONTENT[::-1]
+    events = []
+    [job] = download_files([file], str(tmp_path), on_event=events.append)
+    assert job.status == FAILED
+    assert job.error == "sha256 does not match the index"
+    assert not os.path.exists(job.path) and not os.path.exists(job.path + PART_SUFFIX)
+    assert any(event.kind == ERROR for event in events)
+
+
+def test_missing_files_fail_without_retrying(tmp_path, server):
+    file = ReleaseFile("gone-1.0.tar.gz", BASE_URL + "gone-1.0.tar.gz")
+    [job] = download_files([file], str(tmp_path))
+    assert job.status == FAILED
+    assert len(server.requests) == 1
+
+
+def test_downloads_go_through_the_wheelhouse(tmp_path, server):
+    wheelhouse = Wheelhouse(str(tmp_path / "wheelhouse"))
+    file = server.add("pkg-1.0.tar.gz", CONTENT)
+    download_files([file], str(tmp_path / "first"), wheelhouse=wheelhouse)
+    events = []
+    [job] = download_files([file], str(tmp_path / "second"), wheelhouse=wheelhouse, on_event=events.append)
+    assert len(server.requests) == 1
+    assert read(job.path) == CONTENT
+    assert [event.text.startswith("Found in the wheelhouse") for event in events if event.phase == FINISHED] == [True]
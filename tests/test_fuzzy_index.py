@@ -0,0 +1,65 @@
+import pytest
+from fuzzy_index import FuzzyIndex, edit_distance, trigrams
+
+NAMES = ["requests", "requests-oauthlib", "types-requests", "beautifulsoup4", "Flask_SQLAlchemy", "flask",
+         "numpy", "numba", "pandas", "bs4", "httpx", "zope.interface"]
+
+
+@pytest.fixture
+def index():
+    return FuzzyIndex(NAMES)
+
+
+def naive_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def test_trigrams_are_padded():
+    assert trigrams("ab") == {"^ab", "ab$"}
+
+
+@pytest.mark.parametrize("a, b", [
+    ("requests", "requets"), ("numpy", "numba"), ("flask", "falsk"), ("", "abc"), ("abc", ""), ("kitten", "sitting"),
+    ("pandas", "requests"),
+])
+@pytest.mark.parametrize("limit", [0, 1, 2, 3])
+def test_banded_edit_distance_matches_the_full_one(a, b, limit):
+    assert edit_distance(a, b, limit) == min(naive_distance(a, b), limit + 1)
+
+
+def test_names_are_normalized_and_deduplicated():
+    index = FuzzyIndex(["Flask_SQLAlchemy", "flask-sqlalchemy", "six"])
+    assert len(index) == 2
+
+
+def test_prefix_and_substring(index):
+    assert index.prefix("Flask") == ["flask", "Flask_SQLAlchemy"]
+    assert index.prefix("nothing") == []
+    assert index.substring("requests") == ["requests", "requests-oauthlib", "types-requests"]
+    assert index.substring("sqlalchemy") == ["Flask_SQLAlchemy"]
+    assert index.substring("um") == ["numba", "numpy"]
+    assert index.substring("") == index.names
+
+
+def test_exact_then_prefix_then_typos(index):
+    assert index.search("requests") == ["requests", "requests-oauthlib"]
+    assert index.search("requets") == ["requests"]
+    assert index.search("beautifulsop") == ["beautifulsoup4"]
+    assert index.search("zope_interfase") == ["zope.interface"]
+
+
+def test_short_queries_do_not_get_typos(index):
+    assert index.search("bs") == ["bs4"]
+    assert index.search("nup") == []
+    assert index.search("nmpy") == ["numpy"]  # One typo from four letters on
+    assert index.search("  ") == []
+
+
+def test_limit(index):
+    assert index.search("requests", limit=1) == ["requests"]
@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import import_scanner
+from import_scanner import ImportScanner, CACHE_FORMAT, STDLIB_MODULES, imports_from_source, scan_file
+
+SOURCE = """
+import os, json
+import google.cloud.storage
+from yaml import safe_load
+from . import sibling
+from .models import Thing
+
+def load():
+    import requests.adapters
+    try:
+        from PIL import Image
+    except ImportError:
+        pass
+"""
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(text)
+    return path
+
+
+def test_imports_keep_dotted_names_and_skip_relative_ones():
+    assert imports_from_source(SOURCE) == [
+        "PIL", "PIL.Image", "google.cloud.storage", "json", "os", "requests.adapters", "yaml", "yaml.safe_load"]
+    assert imports_from_source("def broken(:\n    import os") == []
+
+
+def test_third_party_imports_are_top_level_unless_dotted(tmp_path):
+    path = write(str(tmp_path / "project" / "app.py"), SOURCE)
+    scanner = ImportScanner(None)
+    assert scanner.third_party_imports([path]) == ["PIL", "google", "requests", "yaml"]
+    assert scanner.third_party_imports([path], dotted=True) == [
+        "PIL", "PIL.Image", "google.cloud.storage", "requests.adapters", "yaml", "yaml.safe_load"]
+
+
+def test_cache_is_versioned(tmp_path):
+    cache_path = str(tmp_path / "imports.json")
+    path = write(str(tmp_path / "app.py"), "import yaml.constructor\n")
+    scan_file(path, cache_path)
+    with open(cache_path) as file:
+        data = json.load(file)
+    assert data['format'] == CACHE_FORMAT
+    assert list(data['imports'].values()) == [["yaml.constructor"]]
+
+    # Top-level names written by an older version are not trusted
+    with open(cache_path, 'w') as file:
+        json.dump({digest: ["stale"] for digest in data['imports']}, file)
+    assert scan_file(path, cache_path, dotted=True) == ["yaml.constructor"]
+
+
+def test_scan_file_counts_sibling_modules_and_packages_as_local(tmp_path):
+    project = str(tmp_path)
+    write(os.path.join(project, "helpers.py"), "")
+    write(os.path.join(project, "models", "__init__.py"), "")
+    write(os.path.join(project, "plugins", "extra", "tool.py"), "")  # A namespace package
+    write(os.path.join(project, "node_modules", "yaml", "x.py"), "")
+    script = write(os.path.join(project, "main.py"),
+                   "import helpers, models.user, plugins.extra.tool\nimport yaml\nimport json\n")
+    assert scan_file(script, None) == ["yaml"]
+
+
+def test_project_scan_skips_local_packages(tmp_path):
+    project = str(tmp_path / "project")
+    write(os.path.join(project, "app", "__init__.py"), "from app.core import run\nimport numpy\n")
+    write(os.path.join(project, "app", "core.py"), "import app.util\nimport scipy.linalg\n")
+    write(os.path.join(project, ".venv", "lib", "pkg.py"), "import should_not_be_seen\n")
+    assert ImportScanner(None).scan(project) == ["numpy", "scipy"]
+
+
+def test_stdlib_is_known_without_stdlib_module_names(monkeypatch):
+    # Python < 3.10 has no sys.stdlib_module_names; the standard library directory is listed instead
+    monkeypatch.delattr(sys, 'stdlib_module_names', raising=False)
+    names = import_scanner._stdlib_module_names()
+    assert {"os", "json", "asyncio", "sqlite3", "__future__", "sys"} <= names
+    assert "site-packages" not in names
+    assert "pytest" not in names
+    assert {"os", "json", "asyncio"} <= STDLIB_MODULES
@@ -0,0 +1,154 @@
+import threading
+import pytest
+import install_scheduler
+from install_scheduler import InstallScheduler, DONE, FAILED, CANCELLED
+
+WAIT = 5
+
+
+class FakePip:
+    # Stands in for PipRun. Requirements in failing make pip exit 1; a run containing a
+    # requirement in held blocks until release is set or it is terminated.
+    def __init__(self, monkeypatch):
+        self.failing = set()
+        self.held = set()
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.runs = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.most_active = 0
+        monkeypatch.setattr(install_scheduler, 'PipRun', self.run)
+
+    def run(self, args, on_event=None):
+        return FakeRun(self, args)
+
+
+class FakeRun:
+    def __init__(self, pip, args):
+        self.pip = pip
+        self.args = args
+        self.terminated = threading.Event()
+        self.returncode = None
+        self.error = None
+
+    def start(self):
+        with self.pip.lock:
+            self.pip.runs.append(self.args)
+            self.pip.active += 1
+            self.pip.most_active = max(self.pip.most_active, self.pip.active)
+        self.pip.started.set()
+
+    def wait(self):
+        if self.pip.held & set(self.args):
+            while not (self.pip.release.wait(0.01) or self.terminated.is_set()):
+                pass
+        with self.pip.lock:
+            self.pip.active -= 1
+        if self.terminated.is_set():
+            self.returncode = -15
+        elif self.pip.failing & set(self.args):
+            self.returncode = 1
+        else:
+            self.returncode = 0
+        if self.returncode:
+            self.error = f"pip exited with {self.returncode}"
+        return self.returncode
+
+    def terminate(self):
+        self.terminated.set()
+
+
+@pytest.fixture
+def pip(monkeypatch):
+    return FakePip(monkeypatch)
+
+
+def finish(scheduler):
+    waiter = threading.Thread(target=scheduler.wait, daemon=True)
+    waiter.start()
+    waiter.join(WAIT)
+    assert not waiter.is_alive()
+
+
+def test_jobs_for_one_target_share_a_pip_run(pip):
+    pip.held.add("first")
+    scheduler = InstallScheduler(max_workers=2)
+    scheduler.submit("first", "lib")
+    assert pip.started.wait(WAIT)
+    jobs = [scheduler.submit(name, "lib") for name in ("a", "b", "c")]
+    pip.release.set()
+    finish(scheduler)
+    assert pip.runs == [["install", "first", "--target", "lib"], ["install", "a", "b", "c", "--target", "lib"]]
+    assert [job.status for job in jobs] == [DONE] * 3
+    assert pip.most_active == 1
+
+
+def test_max_batch_splits_large_batches(pip):
+    pip.held.add("first")
+    scheduler = InstallScheduler(max_workers=1, max_batch=2)
+    scheduler.submit("first")
+    assert pip.started.wait(WAIT)
+    for name in ("a", "b", "c"):
+        scheduler.submit(name)
+    pip.release.set()
+    finish(scheduler)
+    assert pip.runs[1:] == [["install", "a", "b"], ["install", "c"]]
+
+
+def test_failed_batch_is_retried_one_by_one(pip):
+    pip.held.add("first")
+    pip.failing.add("bad")
+    progress = []
+    scheduler = InstallScheduler(max_workers=1, on_progress=lambda job: progress.append((job.requirement, job.status)))
+    scheduler.submit("first")
+    assert pip.started.wait(WAIT)
+    good, bad = scheduler.submit("good"), scheduler.submit("bad")
+    pip.release.set()
+    finish(scheduler)
+    assert (good.status, bad.status) == (DONE, FAILED)
+    assert bad.error == "pip exited with 1"
+    assert ["install", "good", "bad"] in pip.runs
+    assert ["install", "good"] in pip.runs and ["install", "bad"] in pip.runs
+    assert ("bad", FAILED) in progress
+
+
+def test_jobs_wait_for_their_prerequisites(pip):
+    pip.failing.add("broken")
+    scheduler = InstallScheduler(max_workers=2)
+    base = scheduler.submit("base", "one")
+    plugin = scheduler.submit("plugin", "two", after=[base])
+    broken = scheduler.submit("broken", "three")
+    orphan = scheduler.submit("extension", "four", after=[broken])
+    finish(scheduler)
+    assert pip.runs.index(["install", "base", "--target", "one"]) < pip.runs.index(["install", "plugin", "--target", "two"])
+    assert (base.status, plugin.status) == (DONE, DONE)
+    assert (broken.status, orphan.status) == (FAILED, FAILED)
+    assert orphan.error == "a prerequisite did not install"
+    assert ["install", "extension", "--target", "four"] not in pip.runs
+
+
+def test_cancel_queued_and_running_jobs(pip):
+    pip.held.add("slow")
+    scheduler = InstallScheduler(max_workers=1)
+    slow = scheduler.submit("slow")
+    assert pip.started.wait(WAIT)
+    queued = scheduler.submit("queued")
+    scheduler.cancel(queued)
+    assert queued.status == CANCELLED
+    scheduler.cancel(slow)
+    finish(scheduler)
+    assert slow.status == CANCELLED
+    assert pip.runs == [["install", "slow"]]
+
+
+def test_install_errors_fail_the_job_instead_of_the_worker(pip, monkeypatch):
+    def broken(args, on_event=None):
+        raise OSError("no python")
+
+    monkeypatch.setattr(install_scheduler, 'PipRun', broken)
+    scheduler = InstallScheduler(max_workers=1)
+    job = scheduler.submit("anything")
+    finish(scheduler)
+    assert job.status == FAILED
+    assert job.error == "Could not install: no python"
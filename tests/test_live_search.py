@@ -0,0 +1,79 @@
+import threading
+from live_search import LatestSearchRunner, PrefixResultCache
+
+WAIT = 5
+
+
+class BlockingSearch:
+    # Records each term; the first search blocks until release is set
+    def __init__(self):
+        self.terms = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.finished = threading.Event()
+        self.results = {}
+
+    def __call__(self, term, generation):
+        self.terms.append(term)
+        self.started.set()
+        if len(self.terms) == 1:
+            self.release.wait(WAIT)
+        self.results[term] = generation
+        if term == "final":
+            self.finished.set()
+
+
+def test_terms_typed_during_a_search_collapse_into_the_latest():
+    search = BlockingSearch()
+    runner = LatestSearchRunner(search)
+    first = runner.submit("r")
+    assert search.started.wait(WAIT)
+    for term in ("re", "req", "final"):
+        latest = runner.submit(term)
+    assert not runner.is_current(first)
+    search.release.set()
+    assert search.finished.wait(WAIT)
+    assert search.terms == ["r", "final"]
+    assert runner.is_current(search.results["final"]) and search.results["final"] == latest
+
+
+def test_cancel_drops_the_waiting_term_and_staleness_of_the_running_one():
+    search = BlockingSearch()
+    runner = LatestSearchRunner(search)
+    running = runner.submit("r")
+    assert search.started.wait(WAIT)
+    runner.submit("re")
+    runner.cancel()
+    assert not runner.is_current(running)
+    search.release.set()
+    runner.submit("final")
+    assert search.finished.wait(WAIT)
+    assert search.terms == ["r", "final"]
+
+
+def test_a_failing_search_does_not_stop_the_worker(capsys):
+    failed, done = threading.Event(), threading.Event()
+
+    def run(term, generation):
+        if term == "bad":
+            failed.set()
+            raise ValueError("backend down")
+        done.set()
+
+    runner = LatestSearchRunner(run)
+    runner.submit("bad")
+    assert failed.wait(WAIT)
+    runner.submit("good")
+    assert done.wait(WAIT)
+    assert "Search failed: backend down" in capsys.readouterr().out
+
+
+def test_prefix_cache_narrows_only_complete_results():
+    cache = PrefixResultCache()
+    results = [{'name': "requests"}, {'name': "requests-oauthlib"}]
+    cache.remember("Reque", results, complete=True)
+    assert cache.candidates("requests") is results
+    assert cache.candidates("requ") is None
+    assert cache.candidates("flask") is None
+    cache.remember("reques", results[:1], complete=False)
+    assert cache.candidates("requests") is None
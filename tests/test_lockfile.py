@@ -0,0 +1,79 @@
+import json
+import pytest
+from downloader import ReleaseFile
+from lockfile import Lockfile, LOCK_FORMAT, incompatibility, install_locked
+
+LINUX = ("manylinux_2_17_x86_64", "linux_x86_64")
+
+
+def sample_lock():
+    files = [
+        ReleaseFile("six-1.16.0-py2.py3-none-any.whl", "https://files.example/six.whl", 11053, "a" * 64, "six", "1.16.0"),
+        ReleaseFile("Attrs-23.1.0-py3-none-any.whl", "https://files.example/attrs.whl", 61160, "b" * 64, "Attrs", "23.1.0"),
+    ]
+    return Lockfile.from_files(["six", "attrs>=23"], "3.11", files)
+
+
+def test_packages_are_sorted_case_insensitively():
+    assert sample_lock().pins() == ["Attrs==23.1.0", "six==1.16.0"]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "pipsearch.lock"
+    lock = sample_lock()
+    lock.save(str(path))
+    loaded = Lockfile.load(str(path))
+    assert loaded.requested == lock.requested
+    assert loaded.python_version == "3.11"
+    assert loaded.packages == lock.packages
+    assert [(file.filename, file.url, file.size, file.sha256, file.project, file.version)
+            for file in loaded.release_files()] == \
+           [(file.filename, file.url, file.size, file.sha256, file.project, file.version)
+            for file in lock.release_files()]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_saved_file_is_stable(tmp_path):
+    first, second = tmp_path / "first.lock", tmp_path / "second.lock"
+    sample_lock().save(str(first))
+    Lockfile.load(str(first)).save(str(second))
+    assert first.read_bytes() == second.read_bytes()
+    assert json.loads(first.read_text())['format'] == LOCK_FORMAT
+
+
+def test_other_formats_are_refused(tmp_path):
+    path = tmp_path / "old.lock"
+    path.write_text(json.dumps({'format': LOCK_FORMAT + 1, 'requested': [], 'packages': []}))
+    with pytest.raises(ValueError):
+        Lockfile.load(str(path))
+
+
+def lock_of(python_version, *filenames):
+    files = [ReleaseFile(filename, f"https://files.example/{filename}", 1, "c" * 64, filename.split('-')[0], "1.0")
+             for filename in filenames]
+    return Lockfile.from_files(["x"], python_version, files)
+
+
+def test_compatible_lock_has_no_incompatibility():
+    lock = lock_of("3.12", "pure-1.0-py3-none-any.whl", "native-1.0-cp312-cp312-manylinux_2_17_x86_64.whl",
+                   "source-1.0.tar.gz")
+    assert incompatibility(lock, (3, 12), LINUX) is None
+
+
+def test_lock_for_another_python_is_refused():
+    lock = lock_of("3.12", "pure-1.0-py3-none-any.whl")
+    assert "3.12" in incompatibility(lock, (3, 8), LINUX)
+
+
+def test_wheels_for_another_platform_are_refused():
+    lock = lock_of(None, "native-1.0-cp312-cp312-win_amd64.whl", "pure-1.0-py3-none-any.whl")
+    assert incompatibility(lock, (3, 12), LINUX) == "Not installable on this platform: native-1.0-cp312-cp312-win_amd64.whl"
+
+
+def test_install_locked_refuses_before_touching_the_wheelhouse():
+    class Untouchable:
+        def __getattr__(self, name):
+            raise AssertionError(f"wheelhouse.{name} used")
+
+    lock = lock_of("2.7", "pure-1.0-py3-none-any.whl")
+    assert install_locked(lock, wheelhouse=Untouchable()).startswith("The lockfile was made for Python 2.7")
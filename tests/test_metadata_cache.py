@@ -0,0 +1,130 @@
+import json
+import pytest
+import requests
+import metadata_cache
+from metadata_cache import MetadataCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers or {}
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeServer:
+    # Stands in for pypi_http.get: answers from a list of responses (or exceptions) in order
+    def __init__(self, monkeypatch):
+        self.responses = []
+        self.requests = []
+        monkeypatch.setattr(metadata_cache.pypi_http, 'get', self.get)
+
+    def get(self, url, headers=None):
+        self.requests.append((url, dict(headers or {})))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def document(version):
+    return FakeResponse(200, json.dumps({'info': {'version': version}}).encode(), {'ETag': f'"{version}"'})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    return FakeServer(monkeypatch)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(metadata_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def make_cache(tmp_path, **options):
+    return MetadataCache(str(tmp_path / "cache"), **options)
+
+
+def test_entries_persist_across_instances(tmp_path, server):
+    server.responses.append(document("1.0"))
+    assert make_cache(tmp_path).get_package_json("Some_Project")['info']['version'] == "1.0"
+    assert make_cache(tmp_path).get_package_json("some-project")['info']['version'] == "1.0"
+    assert len(server.requests) == 1
+
+
+def test_expired_entries_are_revalidated_once_per_session(tmp_path, server, clock):
+    server.responses.append(document("1.0"))
+    make_cache(tmp_path, max_age=10).get_package_json("lib")
+    clock[0] += 60
+
+    cache = make_cache(tmp_path, max_age=10)
+    server.responses.append(FakeResponse(304))
+    assert cache.get_package_json("lib")['info']['version'] == "1.0"
+    assert server.requests[-1][1]['If-None-Match'] == '"1.0"'
+    clock[0] += 60
+    assert cache.get_package_json("lib")['info']['version'] == "1.0"
+    assert len(server.requests) == 2
+
+
+def test_server_errors_serve_stale_data_and_back_off(tmp_path, server, clock):
+    cache = make_cache(tmp_path, max_age=10, retry_after=60)
+    server.responses.append(document("1.0"))
+    cache.get_package_json("lib")
+    cache.revalidated.clear()  # A new session
+    clock[0] += 60
+
+    server.responses.append(FakeResponse(503))
+    assert cache.get_package_json("lib")['info']['version'] == "1.0"
+    clock[0] += 30
+    assert cache.get_package_json("lib")['info']['version'] == "1.0"
+    assert len(server.requests) == 2
+
+    clock[0] += 31
+    server.responses.append(document("2.0"))
+    assert cache.get_package_json("lib")['info']['version'] == "2.0"
+
+
+def test_connection_errors_serve_stale_data(tmp_path, server, clock):
+    cache = make_cache(tmp_path, max_age=10)
+    server.responses.append(document("1.0"))
+    cache.get_package_json("lib")
+    cache.revalidated.clear()
+    clock[0] += 60
+    server.responses.append(requests.ConnectionError("offline"))
+    assert cache.get_package_json("lib")['info']['version'] == "1.0"
+    server.responses.append(requests.ConnectionError("offline"))
+    assert cache.get_package_json("never-fetched") is None
+
+
+def test_non_json_answers_are_never_cached(tmp_path, server, clock):
+    cache = make_cache(tmp_path, max_age=10)
+    server.responses.append(document("1.0"))
+    cache.get_package_json("lib")
+    cache.revalidated.clear()
+    clock[0] += 60
+
+    server.responses.append(FakeResponse(200, b"<html>Sign in to the network</html>"))
+    assert cache.get_package_json("lib")['info']['version'] == "1.0"
+    assert make_cache(tmp_path).get_package_json("lib")['info']['version'] == "1.0"
+    server.responses.append(FakeResponse(200, b"<html>Sign in to the network</html>"))
+    assert cache.get_package_json("new") is None
+
+
+def test_gone_projects_return_none(tmp_path, server):
+    server.responses.append(FakeResponse(404))
+    assert make_cache(tmp_path).get_package_json("nothing") is None
+
+
+def test_search_terms_are_url_encoded(tmp_path, server):
+    server.responses.append(FakeResponse(200, b"<html></html>"))
+    assert make_cache(tmp_path).get_search_page("a&b #c", page=2) == "<html></html>"
+    assert server.requests[0][0].endswith("/search/?q=a%26b+%23c&page=2")
@@ -0,0 +1,63 @@
+import os
+import pytest
+import dist_scanner
+from package_index import PackageIndex
+from module_index import ModuleIndex, top_level_modules
+
+
+def install(site, project, files, top_level=None):
+    # A minimal .dist-info with METADATA and RECORD listing the given files
+    dist_info = os.path.join(site, f"{project.replace('-', '_')}-1.0.dist-info")
+    os.makedirs(dist_info)
+    with open(os.path.join(dist_info, "METADATA"), 'w') as file:
+        file.write(f"Name: {project}\nVersion: 1.0\n\n")
+    with open(os.path.join(dist_info, "RECORD"), 'w') as file:
+        file.writelines(f"{path},,\n" for path in files)
+    if top_level is not None:
+        with open(os.path.join(dist_info, "top_level.txt"), 'w') as file:
+            file.write("\n".join(top_level))
+
+
+@pytest.fixture
+def modules(tmp_path):
+    site = str(tmp_path / "site-packages")
+    os.makedirs(site)
+    install(site, "google-api-core", ["google/api_core/__init__.py"])
+    install(site, "google-cloud-core", ["google/cloud/client.py", "google/cloud/_helpers.py"])
+    install(site, "google-cloud-storage", ["google/cloud/storage/__init__.py", "google/cloud/storage/blob.py"])
+    install(site, "PyYAML", ["yaml/__init__.py", "_yaml/__init__.py"], top_level=["yaml", "_yaml"])
+    install(site, "six", ["six.py", "tests/test_six.py"])
+    index = PackageIndex(str(tmp_path / "index.db"))
+    index.add_many([("requests", "HTTP for Humans.", "2.31.0", "")])
+    return ModuleIndex(index, dist_scanner.InstalledSet([site]))
+
+
+def test_top_level_modules_from_top_level_txt_or_record(modules):
+    modules.refresh()
+    distributions = modules.installed.distributions
+    assert top_level_modules(distributions["PyYAML"]) == {"yaml", "_yaml"}
+    assert top_level_modules(distributions["six"]) == {"six"}  # "tests" is ignored
+
+
+def test_providers_come_from_installed_aliases_and_pypi(modules):
+    assert modules.lookup("yaml") == ["PyYAML"]
+    assert modules.lookup("PIL") == ["Pillow"]
+    assert modules.lookup("requests") == ["requests"]
+    assert modules.lookup("nothing_known") == []
+    assert modules.distribution_for("nothing_known.sub") == "nothing_known"
+
+
+def test_namespace_providers_are_ordered_by_the_deepest_match(modules):
+    assert modules.lookup("google")[0] == "google-api-core"
+    assert modules.lookup("google.cloud.storage.blob")[0] == "google-cloud-storage"
+    assert modules.lookup("google.api_core.exceptions")[0] == "google-api-core"
+
+
+def test_distributions_use_the_most_specific_dotted_names(modules):
+    imports = ["google", "google.cloud", "google.cloud.storage", "yaml", "yaml.safe_load"]
+    assert modules.distributions_for(imports) == ["google-cloud-storage", "PyYAML"]
+
+
+def test_refresh_is_skipped_while_nothing_changed(modules):
+    assert modules.refresh() is True
+    assert modules.refresh() is False
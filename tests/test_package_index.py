@@ -0,0 +1,119 @@
+import json
+import sqlite3
+import pytest
+from package_index import PackageIndex, SCHEMA, normalize_name
+
+PACKAGES = [
+    ("requests", "Python HTTP for Humans.", "2.31.0", ">=3.7"),
+    ("requests-oauthlib", "OAuthlib authentication support for Requests.", "1.3.1", ""),
+    ("types-requests", "Typing stubs for requests", "2.31.0.2", ""),
+    ("httpx", "The next generation HTTP client.", "0.25.0", ">=3.8"),
+    ("Flask_SQLAlchemy", "Add SQLAlchemy support to your Flask application.", "3.1.1", ""),
+    ("zope.interface", "Interfaces for Python", "6.1", ""),
+    ("aiohttp", "Async http client/server framework (asyncio)", "3.9.0", ""),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = PackageIndex(str(tmp_path / "index.sqlite3"))
+    index.add_many(PACKAGES)
+    yield index
+    index.close()
+
+
+def names(results):
+    return [result['name'] for result in results]
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Flask_SQLAlchemy", "flask-sqlalchemy"),
+    ("zope.interface", "zope-interface"),
+    ("Some__Odd-._Name", "some-odd-name"),
+    ("requests", "requests"),
+])
+def test_normalize_name(name, expected):
+    assert normalize_name(name) == expected
+
+
+def test_lookups_use_normalized_names(index):
+    assert index.get("flask-sqlalchemy")['name'] == "Flask_SQLAlchemy"
+    assert index.get("Zope_Interface")['version'] == "6.1"
+    assert index.get("nothing") is None
+    assert index.count() == len(PACKAGES)
+    assert not index.is_empty()
+
+
+def test_add_many_updates_existing_packages(index):
+    index.add_many([("Requests", "Renamed summary", "3.0.0", "")])
+    assert index.count() == len(PACKAGES)
+    assert index.get("requests") == {'name': "Requests", 'summary': "Renamed summary", 'version': "3.0.0",
+                                     'requires_python': ""}
+    # The full-text index follows the update
+    assert "Requests" not in names(index.search("humans"))
+    assert names(index.search("renamed")) == ["Requests"]
+
+
+def test_build_from_directory(tmp_path):
+    directory = tmp_path / "metadata"
+    directory.mkdir()
+    (directory / "six.json").write_text(json.dumps({'info': {'name': "six", 'summary': "2 and 3", 'version': "1.16.0"}}))
+    (directory / "broken.json").write_text("{not json")
+    (directory / "nameless.json").write_text(json.dumps({'info': {}}))
+    (directory / "notes.txt").write_text("ignored")
+    index = PackageIndex(str(tmp_path / "index.sqlite3"))
+    assert index.build_from_directory(str(directory)) == 1
+    assert index.get("six")['summary'] == "2 and 3"
+
+
+def test_ranking_exact_then_prefix_then_substring_then_summary(index):
+    assert names(index.search("requests")) == ["requests", "requests-oauthlib", "types-requests"]
+    assert names(index.search("http")) == ["httpx", "aiohttp", "requests"]
+
+
+def test_limit_and_offset_page_through_the_ranking(index):
+    assert names(index.search("requests", limit=2)) == ["requests", "requests-oauthlib"]
+    assert names(index.search("requests", limit=2, offset=2)) == ["types-requests"]
+
+
+def test_trigram_index_finds_substrings(index):
+    if not index.fts:
+        pytest.skip("this SQLite has no FTS5 trigram tokenizer")
+    assert names(index.search("sqlalchemy")) == ["Flask_SQLAlchemy"]
+    assert names(index.search("Flask_SQL")) == ["Flask_SQLAlchemy"]
+    assert names(index.search("interface")) == ["zope.interface"]
+    assert names(index.search("asyncio")) == ["aiohttp"]
+    assert names(index.search('"quoted')) == []
+
+
+def test_short_terms_only_match_name_prefixes(index):
+    if not index.fts:
+        pytest.skip("this SQLite has no FTS5 trigram tokenizer")
+    assert not index.matches_substrings("ht")
+    assert index.matches_substrings("htt")
+    assert names(index.search("ht")) == ["httpx"]
+
+
+def test_fallback_scan_ranks_like_the_full_text_index(index):
+    with_fts = {term: names(index.search(term)) for term in ("requests", "http", "sqlalchemy", "face", "a_b%")}
+    index.fts = False
+    assert {term: names(index.search(term)) for term in with_fts} == with_fts
+
+
+def test_refine_matches_search(index):
+    broad = index.search("req")
+    assert names(index.refine(broad, "requests")) == names(index.search("requests"))
+
+
+def test_full_text_index_is_built_for_older_databases(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    connection.execute("INSERT INTO packages (name, display_name, summary) VALUES ('left-pad', 'left-pad', 'Pads')")
+    connection.commit()
+    connection.close()
+
+    index = PackageIndex(path)
+    if not index.fts:
+        pytest.skip("this SQLite has no FTS5 trigram tokenizer")
+    assert names(index.search("pad")) == ["left-pad"]
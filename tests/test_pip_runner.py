@@ -0,0 +1,72 @@
+import pip_runner
+from pip_runner import (PipRun, parse_size, format_size, PHASE, PROGRESS, LINE, ERROR,
+                        COLLECTING, DOWNLOADING, BUILDING, INSTALLING, FINISHED)
+
+
+def parsed(lines, is_stderr=False):
+    # Feeds output lines through a PipRun that never starts pip, stripped as _read does
+    events = []
+    run = PipRun(["install", "example"], on_event=events.append)
+    for line in lines:
+        run._handle(line.strip(), is_stderr)
+    return run, events
+
+
+def test_sizes_use_decimal_units():
+    assert parse_size("62 kB") == 62000
+    assert parse_size("15.1 MB") == 15100000
+    assert parse_size("812 bytes") == 812
+    assert format_size(15100000) == "15.1 MB"
+    assert format_size(999) == "999 bytes"
+
+
+def test_phases_are_recognised():
+    run, events = parsed([
+        "Collecting requests==2.31.0",
+        "  Downloading requests-2.31.0-py3-none-any.whl (62 kB)",
+        "Building wheels for collected packages: example",
+        "  Building wheel for example (pyproject.toml) ... done",
+        "Installing collected packages: requests",
+        "Successfully installed requests-2.31.0",
+    ])
+    assert [(event.kind, event.phase, event.package) for event in events] == [
+        (PHASE, COLLECTING, "requests==2.31.0"),
+        (PHASE, DOWNLOADING, "requests-2.31.0-py3-none-any.whl"),
+        (LINE, DOWNLOADING, "requests-2.31.0-py3-none-any.whl"),
+        (PHASE, BUILDING, "example"),
+        (PHASE, INSTALLING, "requests"),
+        (PHASE, FINISHED, "requests-2.31.0"),
+    ]
+    assert events[1].total == 62000
+    assert run.phase == FINISHED
+
+
+def test_other_lines_keep_the_current_phase():
+    _, events = parsed(["Collecting six", "Requirement already satisfied: six in /site"])
+    assert (events[1].kind, events[1].phase, events[1].package) == (LINE, COLLECTING, "six")
+
+
+def test_stderr_never_changes_the_phase():
+    run, events = parsed(["Collecting six"], is_stderr=True)
+    assert events[0].kind == LINE
+    assert run.phase is None
+
+
+def test_errors_are_kept_for_the_report():
+    run, events = parsed(["Collecting nothing", "ERROR: No matching distribution found for nothing"])
+    assert events[-1].kind == ERROR
+    assert run.error == "No matching distribution found for nothing"
+    assert list(run.output) == ["Collecting nothing", "ERROR: No matching distribution found for nothing"]
+
+
+def test_raw_progress_is_throttled_but_completion_always_reported(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(pip_runner.time, 'monotonic', lambda: now[0])
+    run, events = parsed(["  Downloading big-1.0.tar.gz (1.0 MB)", "Progress 1000 of 1000000"])
+    now[0] += pip_runner.PROGRESS_INTERVAL / 2
+    run._handle("Progress 2000 of 1000000", False)
+    run._handle("Progress 1000000 of 1000000", False)
+    progress = [event for event in events if event.kind == PROGRESS]
+    assert [(event.done, event.total) for event in progress] == [(1000, 1000000), (1000000, 1000000)]
+    assert all(event.package == "big-1.0.tar.gz" for event in progress)
+    assert list(run.output) == ["Downloading big-1.0.tar.gz (1.0 MB)"]
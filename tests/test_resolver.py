@@ -0,0 +1,109 @@
+import pytest
+import version_index
+from resolver import Resolver
+
+
+@pytest.fixture(autouse=True)
+def fresh_version_indexes():
+    # index_for reuses an index while the release count is unchanged; every test has its own "lib"
+    version_index._indexes.clear()
+
+
+def release(requires_python=None, yanked=False):
+    return [{'filename': "x.tar.gz", 'packagetype': 'sdist', 'requires_python': requires_python, 'yanked': yanked}]
+
+
+class FakeCache:
+    # Stands in for MetadataCache: projects maps name -> {version: requires_dist};
+    # names in failing answer None (a failed fetch) until they are removed from it
+    def __init__(self, projects, releases=None):
+        self.projects = projects
+        self.releases = releases or {}
+        self.failing = set()
+
+    def get_package_json(self, name):
+        if name in self.failing or name not in self.projects:
+            return None
+        versions = self.projects[name]
+        latest = max(versions, key=lambda version: tuple(int(part) for part in version.split('.')))
+        return {'info': {'name': name, 'version': latest, 'requires_dist': versions[latest]},
+                'releases': self.releases.get(name) or {version: release() for version in versions}}
+
+    def get_release_json(self, name, version):
+        if name in self.failing or version not in self.projects.get(name, {}):
+            return None
+        return {'info': {'name': name, 'version': version, 'requires_dist': self.projects[name][version]}}
+
+
+def test_first_requirement_picks_the_newest_matching_version():
+    cache = FakeCache({
+        'app': {'1.0': ["lib>=1,<3", "util"]},
+        'lib': {'1.0': [], '2.0': [], '3.0': []},
+        'util': {'1.0': ["lib>=2"]},
+    })
+    resolution = Resolver(cache=cache, max_workers=2).resolve(["app"])
+    assert resolution.pins == {'app': '1.0', 'lib': '2.0', 'util': '1.0'}
+    assert resolution.conflicts == []
+    assert resolution.missing == []
+
+
+def test_later_requirement_against_an_existing_pin_is_a_conflict():
+    cache = FakeCache({
+        'app': {'1.0': ["lib<2", "util"]},
+        'lib': {'1.0': [], '2.0': []},
+        'util': {'1.0': ["lib>=2"]},
+    })
+    resolution = Resolver(cache=cache, max_workers=2).resolve(["app"])
+    assert resolution.pins['lib'] == '1.0'
+    assert resolution.conflicts == [("lib>=2", 'util', '1.0')]
+
+
+def test_yanked_and_python_incompatible_releases_are_skipped():
+    releases = {'lib': {'1.0': release(), '2.0': release(yanked=True), '3.0': release(requires_python=">=3.99")}}
+    cache = FakeCache({'lib': {'1.0': [], '2.0': [], '3.0': []}}, releases)
+    resolution = Resolver(python_version="3.11", cache=cache, max_workers=2).resolve(["lib"])
+    assert resolution.pins == {'lib': '1.0'}
+
+
+def test_unknown_project_is_missing():
+    resolution = Resolver(cache=FakeCache({}), max_workers=2).resolve(["nothing>=1"])
+    assert resolution.pins == {}
+    assert resolution.missing == ["nothing>=1"]
+
+
+def test_failed_fetches_are_not_memoized():
+    cache = FakeCache({'app': {'1.0': ["lib"]}, 'lib': {'1.0': []}})
+    cache.failing.add('lib')
+    resolver = Resolver(cache=cache, max_workers=2)
+    assert resolver.resolve(["app"]).missing == ["lib"]
+
+    cache.failing.clear()
+    resolution = resolver.resolve(["app"])
+    assert resolution.missing == []
+    assert resolution.pins == {'app': '1.0', 'lib': '1.0'}
+
+
+def test_pin_without_requirements_metadata_is_missing():
+    # The release document is gone and the project document describes another version
+    cache = FakeCache({'app': {'1.0': ["lib"]}, 'lib': {'1.0': [], '2.0': []}})
+    resolver = Resolver(cache=cache, max_workers=2)
+    del cache.projects['lib']['1.0']
+    cache.releases['lib'] = {'1.0': release()}
+    resolution = resolver.resolve(["app", "lib==1.0"])
+    assert resolution.pins['lib'] == '1.0'
+    assert resolution.missing == ["lib==1.0"]
+
+
+def test_latest_release_falls_back_to_the_project_document():
+    cache = FakeCache({'lib': {'1.0': [], '2.0': ["dep"]}, 'dep': {'1.0': []}})
+    cache.get_release_json = lambda name, version: None
+    resolution = Resolver(cache=cache, max_workers=2).resolve(["lib"])
+    assert resolution.pins == {'lib': '2.0', 'dep': '1.0'}
+    assert resolution.missing == []
+
+
+def test_extras_add_their_requirements():
+    cache = FakeCache({'app': {'1.0': ["lib", 'fast; extra == "speed"']}, 'lib': {'1.0': []}, 'fast': {'1.0': []}})
+    resolver = Resolver(cache=cache, max_workers=2)
+    assert resolver.resolve(["app"]).pins == {'app': '1.0', 'lib': '1.0'}
+    assert resolver.resolve(["app[speed]"]).pins == {'app': '1.0', 'lib': '1.0', 'fast': '1.0'}
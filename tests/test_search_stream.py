@@ -0,0 +1,58 @@
+from package_index import PackageIndex
+from search_stream import SearchStream, parse_search_page
+
+
+def snippet(name, summary=None):
+    description = f'<span class="package-snippet__description">{summary}</span>' if summary is not None else ""
+    return (f'<a class="package-snippet" href="/project/{name}/">'
+            f'<span class="package-snippet__name"> {name} </span>{description}</a>')
+
+
+class FakeCache:
+    # Answers get_search_page from a list of HTML pages; None past the last one, like PyPI's 404
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get_search_page(self, term, page):
+        self.requested.append((term, page))
+        return self.pages[page - 1] if page <= len(self.pages) else None
+
+
+def test_parse_search_page():
+    html = "<html>" + snippet("requests", "HTTP for Humans.") + snippet("nameless").replace("package-snippet__name", "x") \
+        + snippet("httpx") + "</html>"
+    assert list(parse_search_page(html)) == [
+        {'name': "requests", 'summary': "HTTP for Humans.", 'url': "/project/requests/"},
+        {'name': "httpx", 'summary': "", 'url': "/project/httpx/"},
+    ]
+
+
+def test_remote_pages_are_fetched_only_when_asked_for():
+    cache = FakeCache([snippet("a") + snippet("b"), snippet("c")])
+    stream = SearchStream("term", cache=cache)
+    assert [row['name'] for row in stream.next_page()] == ["a", "b"]
+    assert cache.requested == [("term", 1)]
+    assert [row['name'] for row in stream.next_page()] == ["c"]
+    assert stream.next_page() == []
+    assert stream.exhausted
+    assert stream.next_page() == []
+    assert cache.requested == [("term", 1), ("term", 2), ("term", 3)]
+
+
+def test_empty_remote_pages_end_the_stream():
+    stream = SearchStream("term", cache=FakeCache(["<html></html>"]))
+    assert stream.next_page() == []
+    assert stream.exhausted
+
+
+def test_local_index_is_paged_with_limit_and_offset(tmp_path):
+    index = PackageIndex(str(tmp_path / "index.sqlite3"))
+    index.add_many([(f"plugin-{i}", "", "1.0", "") for i in range(5)])
+    stream = SearchStream("plugin", index=index, page_size=2, cache=FakeCache([]))
+    pages = [[row['name'] for row in stream.next_page()] for _ in range(3)]
+    assert sorted(name for page in pages for name in page) == [f"plugin-{i}" for i in range(5)]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert stream.exhausted
+    assert stream.next_page() == []
+    index.close()
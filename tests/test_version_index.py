@@ -0,0 +1,61 @@
+import random
+import pytest
+from packaging.specifiers import SpecifierSet
+from packaging.version import Version
+import version_index
+from version_index import VersionIndex, index_for, sort_key
+
+RELEASES = ["0.9", "1.0.dev0", "1.0a1", "1.0b2", "1.0rc1", "1.0", "1.0.post1", "1.0+local.2", "1.0+local.10",
+            "1.4", "1.4.2", "1.4.10", "1.5.dev0", "2.0", "2.1a1", "1!0.1", "not-a-version"]
+
+
+@pytest.fixture(autouse=True)
+def clear_indexes():
+    version_index._indexes.clear()
+    yield
+    version_index._indexes.clear()
+
+
+def test_sort_key_orders_like_pep_440():
+    valid = [release for release in RELEASES if release != "not-a-version"] + ["1.0.0", "1.0.post1.dev1"]
+    shuffled = valid[:]
+    random.Random(0).shuffle(shuffled)
+    shuffled.sort(key=lambda release: sort_key(Version(release)))
+    assert [Version(release) for release in shuffled] == sorted(Version(release) for release in valid)
+    assert sort_key(Version("1.0")) == sort_key(Version("1.0.0"))
+
+
+def test_latest_and_latest_stable():
+    index = VersionIndex(RELEASES)
+    assert index.latest() == "1!0.1"
+    assert VersionIndex(["1.0", "2.0rc1"]).latest_stable() == "1.0"
+    assert VersionIndex(["2.0rc1"]).latest_stable() is None
+    assert VersionIndex([]).latest() is None
+    assert len(index) == len(RELEASES)
+
+
+def test_newest_first_puts_invalid_versions_last():
+    index = VersionIndex(["1.0", "junk", "2.0"])
+    assert index.newest_first() == ["2.0", "1.0", "junk"]
+    assert index.invalid == ["junk"]
+
+
+@pytest.mark.parametrize("specifier", [
+    ">=1.0", ">1.0", "<=1.0", "<1.4", "==1.0", "==1.4.*", "~=1.4", "~=1.4.2", "!=1.0", ">=1.0,<2", "==1.0+local.2",
+    ">1.0.post1", "<=1.4.2", ">=1!0", "",
+])
+@pytest.mark.parametrize("prereleases", [None, True])
+def test_matching_agrees_with_packaging(specifier, prereleases):
+    index = VersionIndex(RELEASES)
+    valid = [release for release in RELEASES if release != "not-a-version"]
+    expected = sorted(SpecifierSet(specifier).filter(valid, prereleases=prereleases), key=Version, reverse=True)
+    assert index.matching(specifier, prereleases) == expected
+    assert index.latest_matching(specifier, prereleases) == (expected[0] if expected else None)
+
+
+def test_index_is_reused_until_the_release_list_changes():
+    metadata = {'releases': {"1.0": [], "1.1": []}}
+    index = index_for("Some_Project", metadata)
+    assert index_for("some-project", metadata) is index
+    metadata['releases']["1.2"] = []
+    assert index_for("some-project", metadata).latest() == "1.2"
@@ -0,0 +1,108 @@
+import os
+import zipfile
+import pytest
+from wheelhouse import Wheelhouse, file_sha256, wheel_is_linkable
+
+
+def make_file(directory, filename, size=100):
+    path = os.path.join(directory, filename)
+    with open(path, 'wb') as file:
+        file.write(os.urandom(size))
+    return path
+
+
+def make_wheel(directory, filename, members):
+    path = os.path.join(directory, filename)
+    with zipfile.ZipFile(path, 'w') as wheel:
+        for name, data in members.items():
+            wheel.writestr(name, data)
+    return path
+
+
+@pytest.fixture
+def wheelhouse(tmp_path):
+    return Wheelhouse(str(tmp_path / "wheelhouse"), max_bytes=250)
+
+
+def stored_names(wheelhouse):
+    return sorted(name for entry in wheelhouse.entries.values() for name in entry['files'])
+
+
+def test_add_stores_content_once(wheelhouse, tmp_path):
+    path = make_file(str(tmp_path), "a-1.0.tar.gz")
+    digest = wheelhouse.add(path)
+    assert digest == file_sha256(path)
+    assert os.path.samefile(wheelhouse.file_path("a-1.0.tar.gz"), wheelhouse.object_path(digest))
+    assert wheelhouse.add(wheelhouse.file_path("a-1.0.tar.gz")) == digest
+    assert wheelhouse.entries[digest]['files'] == ["a-1.0.tar.gz"]
+    assert wheelhouse.total_bytes() == 100
+
+
+def test_index_survives_a_reopen(wheelhouse, tmp_path):
+    digest = wheelhouse.add(make_file(str(tmp_path), "a-1.0.tar.gz"))
+    wheelhouse.save()
+    reopened = Wheelhouse(wheelhouse.directory, max_bytes=wheelhouse.max_bytes)
+    assert reopened.by_name == {"a-1.0.tar.gz": digest}
+
+
+def test_evict_removes_least_recently_used_first(wheelhouse):
+    for age, name in enumerate(["old-1.0.tar.gz", "mid-1.0.tar.gz", "new-1.0.tar.gz"]):
+        digest = wheelhouse.add(make_file(wheelhouse.files_dir, name))
+        wheelhouse.entries[digest]['used'] = age
+    wheelhouse.evict()
+    assert stored_names(wheelhouse) == ["mid-1.0.tar.gz", "new-1.0.tar.gz"]
+    assert not os.path.exists(wheelhouse.file_path("old-1.0.tar.gz"))
+
+
+def test_evict_skips_kept_and_pinned_files(wheelhouse):
+    digests = {}
+    for age, name in enumerate(["kept-1.0.tar.gz", "pinned-1.0.tar.gz", "free-1.0.tar.gz", "new-1.0.tar.gz"]):
+        digests[name] = wheelhouse.add(make_file(wheelhouse.files_dir, name))
+        wheelhouse.entries[digests[name]]['used'] = age
+    with wheelhouse.in_use([wheelhouse.file_path("pinned-1.0.tar.gz")]):
+        wheelhouse.evict(keep={digests["kept-1.0.tar.gz"]})
+        assert stored_names(wheelhouse) == ["kept-1.0.tar.gz", "pinned-1.0.tar.gz"]
+    assert wheelhouse.pins == {}
+    wheelhouse.max_bytes = 150
+    wheelhouse.evict()
+    assert stored_names(wheelhouse) == ["pinned-1.0.tar.gz"]
+
+
+def test_pins_are_counted(wheelhouse):
+    paths = [wheelhouse.file_path("a-1.0.tar.gz")]
+    wheelhouse.acquire(paths)
+    with wheelhouse.in_use(paths):
+        assert wheelhouse.pins == {"a-1.0.tar.gz": 2}
+    assert wheelhouse.pins == {"a-1.0.tar.gz": 1}
+    wheelhouse.release(paths)
+    assert wheelhouse.pins == {}
+
+
+def test_wheels_with_scripts_or_other_schemes_are_not_linkable(tmp_path):
+    directory = str(tmp_path)
+    plain = make_wheel(directory, "plain-1.0-py3-none-any.whl", {
+        "plain/__init__.py": "", "plain-1.0.dist-info/METADATA": "", "plain-1.0.data/purelib/extra.py": ""})
+    scripts = make_wheel(directory, "tool-1.0-py3-none-any.whl", {
+        "tool/__init__.py": "", "tool-1.0.dist-info/entry_points.txt": "[console_scripts]\ntool = tool:main\n"})
+    headers = make_wheel(directory, "native-1.0-py3-none-any.whl", {
+        "native/__init__.py": "", "native-1.0.data/headers/native.h": ""})
+    assert wheel_is_linkable(plain)
+    assert not wheel_is_linkable(scripts)
+    assert not wheel_is_linkable(headers)
+
+
+def test_link_into_installs_a_recorded_tree(tmp_path):
+    wheelhouse = Wheelhouse(str(tmp_path / "wheelhouse"))
+    path = make_wheel(wheelhouse.files_dir, "plain-1.0-py3-none-any.whl", {
+        "plain/__init__.py": "VALUE = 1\n", "plain-1.0.dist-info/METADATA": "Name: plain\n",
+        "plain-1.0.data/purelib/extra.py": "",
+        "plain-1.0.dist-info/RECORD": "plain/__init__.py,,\nplain-1.0.dist-info/METADATA,,\n"
+                                      "plain-1.0.data/purelib/extra.py,,\nplain-1.0.dist-info/RECORD,,\n"})
+    target = str(tmp_path / "target")
+    wheelhouse.link_into([path], target)
+    assert os.path.exists(os.path.join(target, "plain", "__init__.py"))
+    assert os.path.exists(os.path.join(target, "extra.py"))
+    with open(os.path.join(target, "plain-1.0.dist-info", "RECORD")) as file:
+        recorded = {line.split(',')[0] for line in file if line.strip()}
+    assert {"plain/__init__.py", "extra.py", "plain-1.0.dist-info/INSTALLER"} <= recorded
+    assert wheelhouse.pins == {}
@@ -0,0 +1,58 @@
+import time
+import threading
+from collections import deque
+
+FRAME_MS = 16  # ~60 updates per second
+BUDGET_MS = 8  # Leave the rest of the frame for Tk's own redraws and input
+
+
+class UIDispatcher:
+    # Worker threads never touch Tk widgets themselves. They post callables here and a
+    # root.after pump runs them on the Tk thread in frame-sized batches. Consecutive
+    # inserts into the same widget are merged into one insert call, and updates posted
+    # with a key replace any earlier update with that key that has not run yet.
+    def __init__(self, root, frame_ms=FRAME_MS, budget_ms=BUDGET_MS):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.budget = budget_ms / 1000
+        self.queue = deque()
+        self.latest = {}
+        self.lock = threading.Lock()
+        self.root.after(self.frame_ms, self._pump)
+
+    def post(self, callback, *args, **kwargs):
+        self.queue.append(('call', callback, args, kwargs))
+
+    def post_latest(self, key, callback, *args, **kwargs):
+        # Only the newest value matters for things like status text and progress
+        with self.lock:
+            is_new = key not in self.latest
+            self.latest[key] = (callback, args, kwargs)
+        if is_new:
+            self.queue.append(('latest', key, None, None))
+
+    def insert(self, listbox, *items):
+        self.queue.append(('insert', listbox, items, None))
+
+    def set_status(self, label, text):
+        self.post_latest(('status', str(label)), label.config, text=text)
+
+    def _pump(self):
+        deadline = time.perf_counter() + self.budget
+        try:
+            while self.queue and time.perf_counter() < deadline:
+                kind, target, args, kwargs = self.queue.popleft()
+                if kind == 'insert':
+                    items = list(args)
+                    # Merge the run of inserts into the same widget that follows
+                    while self.queue and self.queue[0][0] == 'insert' and self.queue[0][1] is target:
+                        items.extend(self.queue.popleft()[2])
+                    target.insert('end', *items)
+                elif kind == 'latest':
+                    with self.lock:
+                        callback, args, kwargs = self.latest.pop(target)
+                    callback(*args, **kwargs)
+                else:
+                    target(*args, **kwargs)
+        finally:
+            self.root.after(self.frame_ms, self._pump)
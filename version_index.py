@@ -0,0 +1,141 @@
+import threading
+from bisect import bisect_left, bisect_right
+from packaging.specifiers import SpecifierSet
+from packaging.version import Version, InvalidVersion
+from package_index import normalize_name
+
+# Sentinel local segment that sorts after every real local version label
+_ANY_LOCAL = (2,)
+
+
+def sort_key(version, local=None):
+    # A plain tuple that orders like PEP 440, so bisect can compare keys without
+    # going through Version.__lt__ every time
+    release = version.release
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+
+    if version.pre is not None:
+        pre = ({'a': 0, 'b': 1, 'rc': 2}[version.pre[0]], version.pre[1])
+    elif version.post is None and version.dev is not None:
+        pre = (-1, 0)  # 1.0.dev0 sorts before 1.0a0
+    else:
+        pre = (3, 0)
+
+    post = -1 if version.post is None else version.post
+    dev = (1, 0) if version.dev is None else (0, version.dev)
+
+    if local is None:
+        if version.local is None:
+            local = (0,)
+        else:
+            local = (1, tuple((1, int(part), "") if part.isdigit() else (0, 0, part)
+                              for part in version.local.split(".")))
+    return (version.epoch, release, pre, post, dev, local)
+
+
+class VersionIndex:
+    # Every release string is parsed once. Keys are kept sorted so "latest", "latest stable"
+    # and the bounds of a specifier are all binary searches.
+    def __init__(self, version_strings):
+        parsed = []
+        self.invalid = []
+        for version_string in version_strings:
+            try:
+                version = Version(version_string)
+            except InvalidVersion:
+                self.invalid.append(version_string)
+                continue
+            parsed.append((sort_key(version), version_string, version))
+        parsed.sort(key=lambda item: item[0])
+
+        self.keys = [item[0] for item in parsed]
+        self.strings = [item[1] for item in parsed]
+        self.versions = [item[2] for item in parsed]
+        self.stable_positions = [i for i, version in enumerate(self.versions) if not version.is_prerelease]
+        self._newest_first = None
+
+    def __len__(self):
+        return len(self.strings) + len(self.invalid)
+
+    def latest(self):
+        return self.strings[-1] if self.strings else None
+
+    def latest_stable(self):
+        return self.strings[self.stable_positions[-1]] if self.stable_positions else None
+
+    def newest_first(self):
+        # Unparseable legacy versions go last, in their original order
+        if self._newest_first is None:
+            self._newest_first = self.strings[::-1] + self.invalid
+        return self._newest_first
+
+    def matching(self, specifier, prereleases=None):
+        if not isinstance(specifier, SpecifierSet):
+            specifier = SpecifierSet(specifier)
+        low, high = self._window(specifier)
+        window = self.versions[low:high]
+        strings = self.strings[low:high]
+        by_version = {id(version): string for version, string in zip(window, strings)}
+        matches = [by_version[id(version)] for version in specifier.filter(window, prereleases=prereleases)]
+        matches.reverse()
+        return matches
+
+    def latest_matching(self, specifier, prereleases=None):
+        matches = self.matching(specifier, prereleases)
+        return matches[0] if matches else None
+
+    def _window(self, specifier):
+        low, high = 0, len(self.keys)
+        for clause in specifier:
+            operator = clause.operator
+            if "!" in clause.version:
+                continue  # epochs are rare enough that a full scan is fine
+            if operator == "==" and clause.version.endswith(".*"):
+                prefix = clause.version[:-2]
+                low = max(low, bisect_left(self.keys, sort_key(Version(f"{prefix}.dev0"))))
+                high = min(high, bisect_left(self.keys, sort_key(_next_prefix(prefix))))
+                continue
+            try:
+                version = Version(clause.version)
+            except InvalidVersion:
+                continue
+            if operator in (">=", "~="):
+                low = max(low, bisect_left(self.keys, sort_key(version)))
+            elif operator == ">":
+                low = max(low, bisect_right(self.keys, sort_key(version, _ANY_LOCAL)))
+            elif operator == "<=":
+                high = min(high, bisect_right(self.keys, sort_key(version, _ANY_LOCAL)))
+            elif operator == "<":
+                high = min(high, bisect_left(self.keys, sort_key(version)))
+            elif operator == "==":
+                low = max(low, bisect_left(self.keys, sort_key(version)))
+                high = min(high, bisect_right(self.keys, sort_key(version, _ANY_LOCAL)))
+            if operator == "~=":
+                high = min(high, bisect_left(self.keys, sort_key(_next_prefix(".".join(map(str, version.release[:-1]))))))
+        return low, max(low, high)
+
+
+def _next_prefix(prefix):
+    # "1.4" -> Version("1.5.dev0"), the first version outside the 1.4.* family
+    parts = [int(part) for part in prefix.split(".")]
+    parts[-1] += 1
+    return Version(".".join(map(str, parts)) + ".dev0")
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def index_for(package_name, metadata):
+    # Reuse the parsed index as long as the release list has not changed
+    releases = metadata.get('releases', {})
+    key = normalize_name(package_name)
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached is not None and cached[0] == len(releases):
+            return cached[1]
+    index = VersionIndex(releases.keys())
+    with _indexes_lock:
+        _indexes[key] = (len(releases), index)
+    return index
@@ -0,0 +1,179 @@
+import tkinter as tk
+
+
+class VirtualListbox(tk.Listbox):
+    # A Listbox that holds any number of items in a Python list but only ever gives Tk the
+    # rows that fit in the window. Scrolling swaps the visible slice instead of asking Tk to
+    # lay out every row. Indices passed to get/insert/delete/curselection/see are positions
+    # in the full list, so it can replace a plain Listbox; yscrollcommand reports the
+    # position in the full list too. The selection is kept as a set of positions, so rows
+    # selected with selectmode=EXTENDED stay selected while they are scrolled out of view.
+    def __init__(self, master=None, **options):
+        self.scroll_command = options.pop('yscrollcommand', None)
+        super().__init__(master, **options)
+        self.items = []
+        self.top = 0
+        self.rendered = 0
+        self.selection = set()
+        self.cursor = None
+        self.bind('<Button-1>', self._on_click)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.bind(sequence, self._on_wheel)
+        self.bind('<Up>', lambda event: self._on_arrow(-1))
+        self.bind('<Down>', lambda event: self._on_arrow(1))
+        self.bind('<Prior>', lambda event: self._on_arrow(-self.rows()))
+        self.bind('<Next>', lambda event: self._on_arrow(self.rows()))
+
+    def configure(self, cnf=None, **options):
+        if 'yscrollcommand' in options:
+            self.scroll_command = options.pop('yscrollcommand')
+            self._notify_scroll()
+        return super().configure(cnf, **options)
+
+    config = configure
+
+    def rows(self):
+        return max(1, int(self.cget('height')))
+
+    def _index(self, index, for_insert=False):
+        if index == tk.END:
+            return len(self.items) if for_insert else len(self.items) - 1
+        if index == tk.ACTIVE:
+            self._remember_selection()
+            return self.cursor if self.cursor is not None else self.top + super().index(tk.ACTIVE)
+        return int(index)
+
+    # -- data access, in full-list positions --
+
+    def size(self):
+        return len(self.items)
+
+    def get(self, first, last=None):
+        first = self._index(first)
+        if last is None:
+            return self.items[first] if 0 <= first < len(self.items) else ""
+        return tuple(self.items[first:self._index(last) + 1])
+
+    def set_items(self, items):
+        self.items = list(items)
+        self.top = 0
+        self.selection = set()
+        self.cursor = None
+        self._render()
+
+    def insert(self, index, *items):
+        self._remember_selection()
+        position = self._index(index, for_insert=True)
+        self.items[position:position] = items
+        self.selection = {selected + len(items) if selected >= position else selected for selected in self.selection}
+        if self.cursor is not None and self.cursor >= position:
+            self.cursor += len(items)
+        self._render()
+
+    def delete(self, first, last=None):
+        self._remember_selection()
+        first = self._index(first)
+        last = first if last is None else self._index(last)
+        if last < first:
+            return
+        del self.items[first:last + 1]
+        removed = last - first + 1
+        self.selection = {selected - removed if selected > last else selected
+                          for selected in self.selection if not first <= selected <= last}
+        if self.cursor is not None and self.cursor >= first:
+            self.cursor = None if self.cursor <= last else self.cursor - removed
+        self._render()
+
+    def curselection(self):
+        self._remember_selection()
+        return tuple(sorted(self.selection))
+
+    def see(self, index):
+        index = self._index(index)
+        if index < self.top:
+            self._scroll_to(index)
+        elif index >= self.top + self.rows():
+            self._scroll_to(index - self.rows() + 1)
+
+    # -- scrolling --
+
+    def yview(self, *args):
+        if not args:
+            return self._fractions()
+        if args[0] == tk.MOVETO:
+            self._scroll_to(round(float(args[1]) * len(self.items)))
+        elif args[0] == tk.SCROLL:
+            step = self.rows() if args[2] == tk.PAGES else 1
+            self._scroll_to(self.top + int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self._scroll_to(self.top - 3)
+        else:
+            self._scroll_to(self.top + 3)
+        return "break"
+
+    def _on_click(self, event):
+        # A plain click replaces the selection, including rows that are scrolled out of view;
+        # Control- and Shift-clicks extend it and are left to the Listbox bindings
+        if not event.state & 0x0005:
+            self._remember_selection()
+            self.selection = set()
+
+    def _on_arrow(self, step):
+        if not self.items:
+            return "break"
+        self._remember_selection()
+        super().selection_clear(0, tk.END)  # Moving on; the old visible rows must not be remembered again
+        self.rendered = 0
+        target = (self.top if self.cursor is None else self.cursor) + step
+        self.cursor = max(0, min(target, len(self.items) - 1))
+        self.selection = {self.cursor}
+        self.see(self.cursor)
+        self._render()
+        self.event_generate('<<ListboxSelect>>')
+        return "break"
+
+    def _scroll_to(self, top):
+        self._remember_selection()
+        self.top = max(0, min(top, len(self.items) - self.rows()))
+        self._render()
+
+    def _fractions(self):
+        if not self.items:
+            return 0.0, 1.0
+        return self.top / len(self.items), min(1.0, (self.top + self.rows()) / len(self.items))
+
+    def _notify_scroll(self):
+        if self.scroll_command is not None:
+            self.scroll_command(*self._fractions())
+
+    # -- rendering --
+
+    def _remember_selection(self):
+        # Tk only knows about the visible rows, so translate its selection before it is replaced
+        if not self.rendered:
+            return
+        visible = set(super().curselection())
+        for row in range(self.rendered):
+            if row in visible:
+                self.selection.add(self.top + row)
+            else:
+                self.selection.discard(self.top + row)
+        active = super().index(tk.ACTIVE)
+        if visible and 0 <= active < self.rendered:
+            self.cursor = self.top + active
+
+    def _render(self):
+        self.top = max(0, min(self.top, len(self.items) - self.rows()))
+        window = self.items[self.top:self.top + self.rows()]
+        super().delete(0, tk.END)
+        if window:
+            super().insert(tk.END, *window)
+        self.rendered = len(window)
+        for selected in self.selection:
+            if self.top <= selected < self.top + self.rendered:
+                super().selection_set(selected - self.top)
+        if self.cursor is not None and self.top <= self.cursor < self.top + self.rendered:
+            super().activate(self.cursor - self.top)
+        self._notify_scroll()
@@ -0,0 +1,431 @@
+import os
+import re
+import json
+import time
+import base64
+import shutil
+import hashlib
+import zipfile
+import argparse
+import threading
+from contextlib import contextmanager
+from package_index import normalize_name
+from pip_runner import PipRun, run_pip
+
+DEFAULT_WHEELHOUSE_DIR = os.path.join(os.path.expanduser("~"), ".pipsearch", "wheelhouse")
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# pip download reports every artifact of the requirement set with one of these lines
+_FETCHED = re.compile(r'^(?:Saved|File was already downloaded) (.+)$')
+_SCRIPT_SECTION = re.compile(r'^\s*\[(?:console|gui)_scripts\]', re.MULTILINE)
+INSTALLER_NAME = "pipsearch"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(source, destination):
+    # Hard links cost no space or copying; different filesystems fall back to a copy
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def same_file(a, b):
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def only_wheels(paths):
+    # Whether a set of stored files can be installed without the index
+    return all(path.endswith('.whl') for path in paths)
+
+
+def _wheel_project(filename):
+    # "{name}-{version}(-{build})?-{python}-{abi}-{platform}.whl"
+    return normalize_name(filename.split('-')[0])
+
+
+def _record_hash(data):
+    return "sha256=" + base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b'=').decode('ascii')
+
+
+def wheel_is_linkable(path):
+    # Installing these takes nothing but copying files: every member goes to purelib/platlib
+    # and there are no console or GUI scripts to generate. Anything else is left to pip.
+    try:
+        with zipfile.ZipFile(path) as wheel:
+            for name in wheel.namelist():
+                parts = name.split('/')
+                if parts[0].endswith('.data') and len(parts) > 2 and parts[1] not in ('purelib', 'platlib'):
+                    return False
+                if len(parts) == 2 and parts[0].endswith('.dist-info') and parts[1] == 'entry_points.txt':
+                    if _SCRIPT_SECTION.search(wheel.read(name).decode('utf-8', 'replace')):
+                        return False
+    except (OSError, zipfile.BadZipFile):
+        return False
+    return True
+
+
+class Wheelhouse:
+    # A local store of release files keyed by sha256, shared by every install target.
+    #   objects/ab/<sha256>   the content, stored once
+    #   files/<filename>      hard links to the objects, which pip reads via --find-links
+    #   unpacked/<sha256>/    each wheel extracted once, hard-linked into --target directories
+    # pip download writes into files/ and skips files it finds there, so a package set is
+    # only ever downloaded once. When the store grows past max_bytes, the least recently
+    # used artifacts are evicted. Files hard-linked into a target share their inode with
+    # the store, so they must be replaced rather than edited in place.
+    def __init__(self, directory=DEFAULT_WHEELHOUSE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.files_dir = os.path.join(directory, "files")
+        self.objects_dir = os.path.join(directory, "objects")
+        self.unpacked_dir = os.path.join(directory, "unpacked")
+        self.index_path = os.path.join(directory, "index.json")
+        for path in (self.files_dir, self.objects_dir, self.unpacked_dir):
+            os.makedirs(path, exist_ok=True)
+        self.lock = threading.RLock()
+        self.entries = self._load()  # {sha256: {'files': [...], 'size': n, 'unpacked': n, 'used': t}}
+        self.by_name = {name: digest for digest, entry in self.entries.items() for name in entry['files']}
+        self.pins = {}  # filename -> downloads and installs using it right now; never evicted
+
+    def acquire(self, paths):
+        # Keeps evict() away from these files (and their unpacked trees) until release(paths)
+        with self.lock:
+            for path in paths:
+                name = os.path.basename(path)
+                self.pins[name] = self.pins.get(name, 0) + 1
+
+    def release(self, paths):
+        with self.lock:
+            for path in paths:
+                name = os.path.basename(path)
+                self.pins[name] -= 1
+                if not self.pins[name]:
+                    del self.pins[name]
+
+    @contextmanager
+    def in_use(self, paths):
+        paths = list(paths)
+        self.acquire(paths)
+        try:
+            yield
+        finally:
+            self.release(paths)
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        with self.lock:
+            temporary = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump(self.entries, file)
+            os.replace(temporary, self.index_path)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def file_path(self, filename):
+        return os.path.join(self.files_dir, filename)
+
+    def total_bytes(self):
+        with self.lock:
+            return sum(entry['size'] + entry.get('unpacked', 0) for entry in self.entries.values())
+
+    def add(self, path, digest=None):
+        # Stores the file at path (usually one pip just saved in files/) and returns its sha256.
+        # A file that is still the hard link made when it was stored is not hashed again, and
+        # neither is one whose digest the caller already computed while downloading it.
+        filename = os.path.basename(path)
+        listed = self.file_path(filename)
+        with self.lock:
+            known = self.by_name.get(filename)
+            if known is not None and same_file(path, self.object_path(known)):
+                self.entries[known]['used'] = time.time()
+                return known
+
+        digest = digest or file_sha256(path)
+        with self.lock:
+            stored = self.object_path(digest)
+            if not os.path.exists(stored):
+                os.makedirs(os.path.dirname(stored), exist_ok=True)
+                link_or_copy(path, stored)
+            if not same_file(listed, stored):
+                temporary = f"{listed}.{os.getpid()}.tmp"
+                link_or_copy(stored, temporary)
+                os.replace(temporary, listed)
+
+            previous = self.by_name.get(filename)
+            if previous is not None and previous != digest:
+                self.entries[previous]['files'].remove(filename)
+            entry = self.entries.setdefault(digest, {'files': [], 'size': os.path.getsize(stored), 'unpacked': 0})
+            if filename not in entry['files']:
+                entry['files'].append(filename)
+            entry['used'] = time.time()
+            self.by_name[filename] = digest
+            return digest
+
+    def download_args(self, requirements):
+        return ["download", "--dest", self.files_dir, "--find-links", self.files_dir] + list(requirements)
+
+    def install_args(self, requirements, target="", offline=True):
+        # pip install from the store. Building a source distribution needs its build backend
+        # (setuptools, hatchling...), which is never in the store, so sets that include one
+        # must be installed with offline=False: the index stays reachable for the build
+        # requirements while the stored files are still preferred via --find-links.
+        args = ["install"] + (["--no-index"] if offline else []) + ["--find-links", self.files_dir] + list(requirements)
+        if target:
+            args.extend(["--target", target])
+        return args
+
+    def download(self, requirements, on_event=None, start=None):
+        # Puts every artifact of the requirement set into the store and returns (run, paths in
+        # files/). start(run), if given, starts the run and may refuse, in which case run is None.
+        # The returned files are acquired for the caller, which must release(paths) once it has
+        # installed them.
+        fetched = []
+
+        def collect(event):
+            match = _FETCHED.match(event.text)
+            if match:
+                fetched.append(os.path.basename(match.group(1).strip()))
+            if on_event is not None:
+                on_event(event)
+
+        run = PipRun(self.download_args(requirements), on_event=collect)
+        if start is not None and not start(run):
+            return None, []
+        if run.wait() != 0:
+            return run, []
+        names = list(dict.fromkeys(fetched))
+        self.acquire(names)
+        try:
+            digests = {self.add(self.file_path(name)) for name in names}
+            self.evict(keep=digests)
+        except BaseException:
+            self.release(names)
+            raise
+        return run, [self.file_path(name) for name in names]
+
+    def unpacked(self, path):
+        # The extracted tree of a stored wheel, extracted the first time it is needed
+        digest = self.add(path)
+        tree = os.path.join(self.unpacked_dir, digest)
+        if os.path.isdir(tree):
+            return tree
+        temporary = f"{tree}.{os.getpid()}.{threading.get_ident()}.tmp"
+        size = 0
+        with zipfile.ZipFile(self.object_path(digest)) as wheel:
+            for member in wheel.infolist():
+                extracted = wheel.extract(member, temporary)
+                mode = member.external_attr >> 16
+                if mode and not member.is_dir():
+                    os.chmod(extracted, mode & 0o777)  # Keeps scripts executable
+                size += member.file_size
+        try:
+            os.rename(temporary, tree)
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)  # Another thread got there first
+        with self.lock:
+            self.entries[digest]['unpacked'] = size
+        return tree
+
+    def linkable(self, path):
+        # Whether link_into can install this file; remembered per stored object
+        if not path.endswith('.whl'):
+            return False
+        digest = self.add(path)
+        with self.lock:
+            known = self.entries[digest].get('linkable')
+        if known is None:
+            known = wheel_is_linkable(self.object_path(digest))
+            with self.lock:
+                if digest in self.entries:
+                    self.entries[digest]['linkable'] = known
+        return known
+
+    def link_into(self, paths, target):
+        # Installs wheels into a --target directory by hard-linking their unpacked trees.
+        # Only for wheels that linkable() accepts: those install as plain files, so the result
+        # matches pip --target apart from the INSTALLER written here and the byte-compiled
+        # files pip would add. RECORD is rewritten for the installed paths, so pip can
+        # uninstall the projects. Earlier versions of the projects are removed first.
+        with self.in_use(paths):
+            self._link_into(paths, target)
+        self.save()
+
+    def _link_into(self, paths, target):
+        refused = [os.path.basename(path) for path in paths if not self.linkable(path)]
+        if refused:
+            raise ValueError(f"pip has to install {', '.join(refused)}")
+        os.makedirs(target, exist_ok=True)
+        for path in paths:
+            tree = self.unpacked(path)
+            remove_installed(target, _wheel_project(os.path.basename(path)))
+            dist_info = None
+            for directory, _, files in os.walk(tree):
+                relative_dir = os.path.relpath(directory, tree)
+                if relative_dir.endswith('.dist-info') and os.sep not in relative_dir:
+                    dist_info = relative_dir
+                for name in files:
+                    destination = _target_path(target, os.path.join(relative_dir, name))
+                    if destination is None:
+                        continue
+                    os.makedirs(os.path.dirname(destination), exist_ok=True)
+                    if os.path.lexists(destination):
+                        os.remove(destination)
+                    link_or_copy(os.path.join(directory, name), destination)
+            if dist_info is not None:
+                _write_installer_files(target, dist_info)
+
+    def evict(self, keep=()):
+        # Least recently used first, never an artifact of the install in progress or of any
+        # other download or install still using it (see acquire)
+        with self.lock:
+            total = self.total_bytes()
+            for digest in sorted(self.entries, key=lambda digest: self.entries[digest].get('used', 0)):
+                if total <= self.max_bytes:
+                    break
+                if digest in keep or any(name in self.pins for name in self.entries[digest]['files']):
+                    continue
+                total -= self._remove(digest)
+            self.save()
+
+    def _remove(self, digest):
+        entry = self.entries.pop(digest)
+        for filename in entry['files']:
+            self.by_name.pop(filename, None)
+            try:
+                os.remove(self.file_path(filename))
+            except OSError:
+                pass
+        try:
+            os.remove(self.object_path(digest))
+        except OSError:
+            pass
+        shutil.rmtree(os.path.join(self.unpacked_dir, digest), ignore_errors=True)
+        return entry['size'] + entry.get('unpacked', 0)
+
+
+def _target_path(target, relative):
+    # Where pip --target puts a wheel member of a linkable wheel: .data/purelib and
+    # .data/platlib merge into the target; linkable() refuses wheels with other schemes
+    parts = os.path.normpath(relative).split(os.sep)
+    if parts[0].endswith('.data'):
+        if len(parts) < 3 or parts[1] not in ('purelib', 'platlib'):
+            return None
+        parts = parts[2:]
+    return os.path.join(target, *parts)
+
+
+def _write_installer_files(target, dist_info):
+    # INSTALLER and a RECORD of the installed paths, as new files: the RECORD linked in from
+    # the store is shared with every other target and must not be edited in place
+    directory = os.path.join(target, dist_info)
+    record_path = os.path.join(directory, 'RECORD')
+    installer = f"{INSTALLER_NAME}\n".encode('utf-8')
+    with open(os.path.join(directory, 'INSTALLER'), 'wb') as file:
+        file.write(installer)
+    try:
+        with open(record_path, 'r', encoding='utf-8') as file:
+            lines = [line.rstrip('\r\n') for line in file if line.strip()]
+    except OSError:
+        lines = []
+    rows = []
+    for line in lines:
+        relative, _, rest = line.partition(',')
+        if relative in (f"{dist_info}/RECORD", f"{dist_info}/INSTALLER"):
+            continue
+        installed = _target_path("", relative.replace('/', os.sep))
+        if installed is not None:
+            rows.append(f"{installed.replace(os.sep, '/')},{rest}")
+    rows.append(f"{dist_info}/INSTALLER,{_record_hash(installer)},{len(installer)}")
+    rows.append(f"{dist_info}/RECORD,,")
+    if os.path.lexists(record_path):
+        os.remove(record_path)
+    with open(record_path, 'w', encoding='utf-8') as file:
+        file.write("\n".join(rows) + "\n")
+
+
+def remove_installed(target, project_key):
+    # Deletes every file an installed version of the project recorded in its RECORD
+    try:
+        entries = list(os.scandir(target))
+    except OSError:
+        return
+    root = os.path.join(os.path.abspath(target), '')
+    for entry in entries:
+        if not entry.name.endswith('.dist-info'):
+            continue
+        if normalize_name(entry.name[:-len('.dist-info')].rpartition('-')[0]) != project_key:
+            continue
+        try:
+            with open(os.path.join(entry.path, 'RECORD'), 'r', encoding='utf-8') as file:
+                recorded = [line.split(',')[0] for line in file if line.strip()]
+        except OSError:
+            recorded = []
+        for relative in recorded:
+            path = os.path.abspath(os.path.join(target, relative))
+            if path.startswith(root):  # RECORD may list files outside the target, e.g. ../../bin
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+_default_wheelhouse = None
+_default_wheelhouse_lock = threading.Lock()
+
+
+def default_wheelhouse():
+    global _default_wheelhouse
+    with _default_wheelhouse_lock:
+        if _default_wheelhouse is None:
+            max_mb = os.environ.get("PIPSEARCH_WHEELHOUSE_MAX_MB")
+            _default_wheelhouse = Wheelhouse(os.environ.get("PIPSEARCH_WHEELHOUSE", DEFAULT_WHEELHOUSE_DIR),
+                                             int(max_mb) * 1024 * 1024 if max_mb else DEFAULT_MAX_BYTES)
+        return _default_wheelhouse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the local wheelhouse, or install from it into target directories.")
+    parser.add_argument("requirements", nargs="+", help="requirements to download (and install)")
+    parser.add_argument("--target", action="append", default=[], help="install into this directory; may be repeated")
+    args = parser.parse_args()
+
+    wheelhouse = default_wheelhouse()
+    run, paths = wheelhouse.download(args.requirements)
+    if run.returncode != 0:
+        print(f"Download failed: {run.error}")
+        return
+    print(f"{len(paths)} files in the wheelhouse ({wheelhouse.total_bytes() // (1024 * 1024)} MB used).")
+    try:
+        for target in args.target:
+            if all(wheelhouse.linkable(path) for path in paths):
+                wheelhouse.link_into(paths, target)
+                print(f"Linked {len(paths)} wheels into {target}")
+            else:
+                run = run_pip(wheelhouse.install_args(args.requirements, target, offline=only_wheels(paths)))
+                print(f"Installed into {target}" if run.returncode == 0 else f"{target}: {run.error}")
+    finally:
+        wheelhouse.release(paths)
+
+
+if __name__ == "__main__":
+    main()